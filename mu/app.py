@@ -45,6 +45,8 @@ from . import i18n
 from .virtual_environment import venv, logger as vlogger
 from . import __version__
 from .logic import Editor, LOG_FILE, LOG_DIR, ENCODING
+from .config import CACHE_DIR
+from .contrib import uflash
 from .interface import Window
 from .resources import load_icon, load_movie, load_pixmap
 from .modes import (
@@ -377,6 +379,10 @@ def run():
     #
     settings.init()
 
+    # Keep the layout of the parsed micro:bit runtime between runs of Mu, so
+    # the first flash doesn't have to parse it again.
+    uflash.RUNTIME_CACHE_DIR = os.path.join(CACHE_DIR, "microbit_runtimes")
+
     # Images (such as toolbar icons) aren't scaled nicely on retina/4k displays
     # unless this flag is set
     os.environ["QT_AUTO_SCREEN_SCALE_FACTOR"] = "1"
@@ -5,6 +5,9 @@ import platformdirs
 # The default directory for application data (i.e., configuration).
 DATA_DIR = platformdirs.user_data_dir(appname="mu", appauthor="python")
 
+# The directory for files Mu can recreate if they're lost (e.g. caches).
+CACHE_DIR = platformdirs.user_cache_dir(appname="mu", appauthor="python")
+
 # The name of the default virtual environment used by Mu.
 VENV_NAME = "mu_venv"
 
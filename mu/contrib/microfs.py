@@ -13,7 +13,10 @@ You may:
 from __future__ import print_function
 import ast
 import argparse
+import binascii
+import struct
 import sys
+import zlib
 import os
 import time
 import os.path
@@ -24,7 +27,7 @@ from serial import Serial
 PY2 = sys.version_info < (3,)
 
 
-__all__ = ["ls", "rm", "put", "get", "get_serial"]
+__all__ = ["ls", "ls_tree", "rm", "put", "get", "hashes", "get_serial"]
 
 
 #: The help text to be shown when requested.
@@ -44,6 +47,28 @@ For example, 'ufs ls' will list the files on a connected BBC micro:bit.
 COMMAND_LINE_FLAG = False  # Indicates running from the command line.
 SERIAL_BAUD_RATE = 115200
 
+#: Number of bytes of a file sent by the device in each chunk by get.
+GET_CHUNK_SIZE = 256
+
+#: Serial connections with a session in progress (see start_session), and
+#: whether the device has already been put in raw mode for it.
+_SESSIONS = {}
+
+#: Window size (as a power of 2) used to compress files for put. It's small
+#: since the device needs a buffer this big to decompress them.
+COMPRESSION_WBITS = 10
+
+#: Number of compressed bytes sent to the device in each command by put.
+COMPRESSED_CHUNK_SIZE = 384
+
+#: The decompression supported by the device on each serial port: "deflate",
+#: "zlib" or "" (none), only known after the first put.
+_COMPRESSION_SUPPORT = {}
+
+#: Whether the device on each serial port supports raw-paste mode (only known
+#: after the first attempt to use it).
+_RAW_PASTE_SUPPORT = {}
+
 
 def find_microbit():
     """
@@ -58,9 +83,9 @@ def find_microbit():
     return (None, None)
 
 
-def raw_on(serial):
+def raw_on(serial, soft_reset=True):
     """
-    Puts the device into raw mode.
+    Puts the device into raw mode, soft rebooting it unless told otherwise.
     """
 
     def flush_to_msg(serial, msg):
@@ -89,15 +114,17 @@ def raw_on(serial):
     # Go into raw mode with CTRL-A.
     serial.write(b"\r\x01")
     flush_to_msg(serial, raw_repl_msg)
-    # Soft Reset with CTRL-D
-    serial.write(b"\x04")
-    flush_to_msg(serial, b"soft reboot\r\n")
-    # Some MicroPython versions/ports/forks provide a different message after
-    # a Soft Reset, check if we are in raw REPL, if not send a CTRL-A again
-    data = serial.read_until(raw_repl_msg)
-    if not data.endswith(raw_repl_msg):
-        serial.write(b"\r\x01")
-        flush_to_msg(serial, raw_repl_msg)
+    if soft_reset:
+        # Soft Reset with CTRL-D
+        serial.write(b"\x04")
+        flush_to_msg(serial, b"soft reboot\r\n")
+        # Some MicroPython versions/ports/forks provide a different message
+        # after a Soft Reset, check if we are in raw REPL, if not send a
+        # CTRL-A again
+        data = serial.read_until(raw_repl_msg)
+        if not data.endswith(raw_repl_msg):
+            serial.write(b"\r\x01")
+            flush_to_msg(serial, raw_repl_msg)
     flush(serial)
 
 
@@ -108,6 +135,136 @@ def raw_off(serial):
     serial.write(b"\x02")  # Send CTRL-B to get out of raw mode.
 
 
+def start_session(serial):
+    """
+    Starts a session on the serial connection. Until end_session is called,
+    the functions in this module keep the device in raw mode (entered the
+    first time it's needed, without a soft reboot) instead of entering and
+    leaving raw mode for each command. Since the device isn't rebooted,
+    anything imported or defined by a command is still there for the next.
+    """
+    _SESSIONS.setdefault(serial, False)
+
+
+def end_session(serial):
+    """
+    Ends the session on the serial connection, taking the device out of raw
+    mode if needed.
+    """
+    if _SESSIONS.pop(serial, False):
+        raw_off(serial)
+
+
+def reset_session(serial):
+    """
+    After a failed operation the device's state is unknown, so have the
+    session in progress (if any) put it into raw mode again for the next
+    command, and drop whatever it was still sending.
+    """
+    if serial in _SESSIONS:
+        _SESSIONS[serial] = False
+    serial.reset_input_buffer()
+
+
+def _enter_raw(serial):
+    """
+    Puts the device into raw mode to run commands, unless a session in
+    progress already did.
+
+    Returns True if the device has to be taken out of raw mode afterwards.
+    """
+    if serial in _SESSIONS:
+        if not _SESSIONS[serial]:
+            raw_on(serial, soft_reset=False)
+            _SESSIONS[serial] = True
+        return False
+    raw_on(serial)
+    time.sleep(0.1)
+    return True
+
+
+def raw_paste_on(serial):
+    """
+    Attempts to put the device (already in raw mode) into raw-paste mode, so
+    the next command can be sent at full speed.
+
+    Returns the flow control window size if the device supports raw-paste
+    mode, or None otherwise, in which case the device is left in raw mode.
+    The answer is remembered so devices without support aren't asked again.
+    """
+    port = getattr(serial, "port", None)
+    if _RAW_PASTE_SUPPORT.get(port) is False:
+        return None
+    serial.write(b"\x05A\x01")
+    data = serial.read(2)
+    if data == b"R\x01":
+        _RAW_PASTE_SUPPORT[port] = True
+        return struct.unpack("<H", serial.read(2))[0]
+    if data != b"R\x00":
+        # The device doesn't know about raw-paste mode, and took the CTRL-A
+        # as a request to enter raw mode again, so wait for the prompt.
+        raw_repl_msg = b"w REPL; CTRL-B to exit\r\n>"
+        data = serial.read_until(raw_repl_msg)
+        if not data.endswith(raw_repl_msg):
+            if COMMAND_LINE_FLAG:
+                print(data)
+            raise IOError("Could not enter raw REPL.")
+    _RAW_PASTE_SUPPORT[port] = False
+    return None
+
+
+def raw_paste_write(serial, command_bytes, window_size):
+    """
+    Sends the command to a device in raw-paste mode, as fast as its flow
+    control allows: the device asks for more data (with a \x01) each time it
+    has room for another window_size bytes.
+    """
+    window_remain = window_size
+    i = 0
+    while i < len(command_bytes):
+        while window_remain == 0 or serial.inWaiting():
+            data = serial.read(1)
+            if data == b"\x01":
+                # The device can take another window of data.
+                window_remain += window_size
+            elif data == b"\x04":
+                # The device ended the transfer early, acknowledge it.
+                serial.write(b"\x04")
+                return
+            else:
+                raise IOError(
+                    "Unexpected read during raw paste: {}".format(data)
+                )
+        chunk = command_bytes[i : i + window_remain]
+        serial.write(chunk)
+        window_remain -= len(chunk)
+        i += len(chunk)
+    # Indicate the end of the data and wait for the device to acknowledge it.
+    serial.write(b"\x04")
+    data = serial.read_until(b"\x04")
+    if not data.endswith(b"\x04"):
+        raise IOError("Could not complete raw paste: {}".format(data))
+
+
+def send_command(serial, command):
+    """
+    Sends the command to a device in raw mode and gets it evaluated. Its
+    output (stdout, then stderr, each ended by \x04) can then be read from
+    the serial connection, until the \x04> prompt.
+    """
+    command_bytes = command.encode("utf-8")
+    window_size = raw_paste_on(serial)
+    if window_size:
+        raw_paste_write(serial, command_bytes, window_size)
+    else:
+        for i in range(0, len(command_bytes), 32):
+            serial.write(command_bytes[i : min(i + 32, len(command_bytes))])
+            time.sleep(0.01)
+        # Send CTRL-D to evaluate, and skip the OK acknowledging it.
+        serial.write(b"\x04")
+        serial.read(2)
+
+
 def get_serial():
     """
     Detect if a micro:bit is connected and return a serial object to talk to
@@ -128,6 +285,9 @@ def execute(commands, serial=None):
     For this to work correctly, a particular sequence of commands needs to be
     sent to put the device into a good state to process the incoming command.
 
+    Commands are sent in raw-paste mode if the device supports it, otherwise
+    they're trickled in small slices so the device can keep up.
+
     Returns the stdout and stderr output from the micro:bit.
     """
     close_serial = False
@@ -136,25 +296,26 @@ def execute(commands, serial=None):
         close_serial = True
         time.sleep(0.1)
     result = b""
-    raw_on(serial)
-    time.sleep(0.1)
-    # Write the actual command and send CTRL-D to evaluate.
-    for command in commands:
-        command_bytes = command.encode("utf-8")
-        for i in range(0, len(command_bytes), 32):
-            serial.write(command_bytes[i : min(i + 32, len(command_bytes))])
-            time.sleep(0.01)
-        serial.write(b"\x04")
-        response = serial.read_until(b"\x04>")  # Read until prompt.
-        out, err = response[2:-2].split(b"\x04", 1)  # Split stdout, stderr
-        result += out
-        if err:
-            return b"", err
-    time.sleep(0.1)
-    raw_off(serial)
-    if close_serial:
-        serial.close()
-        time.sleep(0.1)
+    leave_raw = _enter_raw(serial)
+    try:
+        for command in commands:
+            send_command(serial, command)
+            response = serial.read_until(b"\x04>")  # Read until prompt.
+            try:
+                # Split stdout, stderr
+                out, err = response[:-2].split(b"\x04", 1)
+            except ValueError:
+                raise IOError("Timed out waiting for the device.")
+            result += out
+            if err:
+                return b"", err
+    finally:
+        if leave_raw:
+            time.sleep(0.1)
+            raw_off(serial)
+        if close_serial:
+            serial.close()
+            time.sleep(0.1)
     return result, err
 
 
@@ -188,6 +349,59 @@ def ls(serial=None):
     return ast.literal_eval(out.decode("utf-8"))
 
 
+def ls_tree(serial=None):
+    """
+    Recursively list the contents of the device's file system in a single
+    round trip, walking into any sub-directories (e.g. lib/).
+
+    If no serial object is supplied, microfs will attempt to detect the
+    connection itself.
+
+    Returns a list of (path, is_directory, size) tuples, with paths relative
+    to the root of the file system (e.g. "lib/foo.py"), or raises an IOError
+    if there's a problem. Devices without os.ilistdir (e.g. the BBC
+    micro:bit) have no directories, so their flat listing is returned.
+
+    The sizes of the files come from os.ilistdir, so a file is only stat'ed
+    when the device doesn't list its size.
+    """
+    commands = [
+        "\n".join(
+            [
+                "import os",
+                "def s(p):",
+                " try:",
+                "  return os.stat(p)[6]",
+                " except Exception:",
+                "  return os.size(p)",
+                "def w(d):",
+                " r = []",
+                " try:",
+                "  es = os.ilistdir(d) if d else os.ilistdir()",
+                " except AttributeError:",
+                "  es = [(n, 0x8000, 0, -1) for n in os.listdir()]",
+                " for e in es:",
+                "  p = d + '/' + e[0] if d else e[0]",
+                "  t = e[1] == 0x4000",
+                "  z = e[3] if len(e) > 3 else -1",
+                "  if t:",
+                "   z = 0",
+                "  elif z < 0:",
+                "   z = s(p)",
+                "  r.append((p, t, z))",
+                "  if t:",
+                "   r.extend(w(p))",
+                " return r",
+            ]
+        ),
+        "print(w(''))",
+    ]
+    out, err = execute(commands, serial)
+    if err:
+        raise IOError(clean_error(err))
+    return ast.literal_eval(out.decode("utf-8"))
+
+
 def rm(filename, serial=None):
     """
     Removes a referenced file on the micro:bit.
@@ -204,7 +418,107 @@ def rm(filename, serial=None):
     return True
 
 
-def put(filename, target=None, serial=None):
+def compression_support(serial):
+    """
+    Returns the decompression supported by the device: "deflate" (the
+    deflate module of MicroPython 1.21 and later), "zlib" (zlib.decompress,
+    as in CircuitPython and older MicroPython) or "" if none. Base64 decoding
+    is also required. The answer is remembered for each serial port.
+    """
+    port = getattr(serial, "port", None)
+    if port not in _COMPRESSION_SUPPORT:
+        command = "\n".join(
+            [
+                "try:",
+                " try:",
+                "  from ubinascii import a2b_base64",
+                " except ImportError:",
+                "  from binascii import a2b_base64",
+                " try:",
+                "  import deflate",
+                "  print('deflate')",
+                " except ImportError:",
+                "  from zlib import decompress",
+                "  print('zlib')",
+                "except ImportError:",
+                " print('')",
+            ]
+        )
+        out, err = execute([command], serial)
+        support = out.decode("utf-8").strip()
+        if err or support not in ("deflate", "zlib"):
+            support = ""
+        _COMPRESSION_SUPPORT[port] = support
+    return _COMPRESSION_SUPPORT[port]
+
+
+def _compressed_put_commands(content, target, support):
+    """
+    Returns the commands to send the compressed content to the device, in
+    base64 encoded chunks, and decompress it into the target file.
+    """
+    compressor = zlib.compressobj(9, zlib.DEFLATED, COMPRESSION_WBITS)
+    compressed = compressor.compress(content) + compressor.flush()
+    temp = target + ".z"
+    commands = [
+        "\n".join(
+            [
+                "try:",
+                " from ubinascii import a2b_base64 as a",
+                "except ImportError:",
+                " from binascii import a2b_base64 as a",
+            ]
+        ),
+        "fd = open('{}', 'wb')".format(temp),
+        "f = fd.write",
+    ]
+    for i in range(0, len(compressed), COMPRESSED_CHUNK_SIZE):
+        chunk = compressed[i : i + COMPRESSED_CHUNK_SIZE]
+        commands.append(
+            "f(a('{}'))".format(binascii.b2a_base64(chunk).decode().strip())
+        )
+    commands.append("fd.close()")
+    if support == "deflate":
+        decompress = [
+            "import deflate",
+            "s = open('{}', 'rb')".format(temp),
+            "d = deflate.DeflateIO(s, deflate.ZLIB)",
+            "fd = open('{}', 'wb')".format(target),
+            "while True:",
+            " b = d.read(256)",
+            " if not b:",
+            "  break",
+            " fd.write(b)",
+        ]
+    else:
+        # Stream the data through zlib.DecompIO where there is one (older
+        # MicroPython), only CircuitPython needs it all in memory at once.
+        decompress = [
+            "import zlib",
+            "s = open('{}', 'rb')".format(temp),
+            "fd = open('{}', 'wb')".format(target),
+            "try:",
+            " r = zlib.DecompIO(s, {}).read".format(COMPRESSION_WBITS),
+            "except AttributeError:",
+            " r = None",
+            "if r:",
+            " while True:",
+            "  b = r(256)",
+            "  if not b:",
+            "   break",
+            "  fd.write(b)",
+            "else:",
+            " fd.write(zlib.decompress(s.read(), {}))".format(
+                COMPRESSION_WBITS
+            ),
+        ]
+    decompress += ["fd.close()", "s.close()", "import os"]
+    decompress.append("os.remove('{}')".format(temp))
+    commands.append("\n".join(decompress))
+    return commands
+
+
+def put(filename, target=None, serial=None, compress=None):
     """
     Puts a referenced file on the LOCAL file system onto the
     file system on the BBC micro:bit.
@@ -212,6 +526,12 @@ def put(filename, target=None, serial=None):
     If no serial object is supplied, microfs will attempt to detect the
     connection itself.
 
+    If compress is True, or None (the default) and a serial object is
+    supplied for a device that can decompress data, the file is sent
+    compressed (and decompressed on the device), otherwise it's sent as is.
+    If the device fails to decompress the file (e.g. it runs out of memory),
+    it's sent again as is.
+
     Returns True for success or raises an IOError if there's a problem.
     """
     if not os.path.isfile(filename):
@@ -221,7 +541,34 @@ def put(filename, target=None, serial=None):
     filename = os.path.basename(filename)
     if target is None:
         target = filename
-    commands = ["fd = open('{}', 'wb')".format(target), "f = fd.write"]
+    support = ""
+    if content and (compress or (compress is None and serial is not None)):
+        support = compression_support(serial)
+    commands = []
+    if support:
+        out, err = execute(
+            _compressed_put_commands(content, target, support), serial
+        )
+        if not err:
+            return True
+        # Tidy up the compressed copy before sending the file as is.
+        commands.append(
+            "\n".join(
+                [
+                    "import os",
+                    "try:",
+                    " fd.close()",
+                    " s.close()",
+                    "except Exception:",
+                    " pass",
+                    "try:",
+                    " os.remove('{}.z')".format(target),
+                    "except OSError:",
+                    " pass",
+                ]
+            )
+        )
+    commands += ["fd = open('{}', 'wb')".format(target), "f = fd.write"]
     while content:
         line = content[:64]
         if PY2:
@@ -236,7 +583,7 @@ def put(filename, target=None, serial=None):
     return True
 
 
-def get(filename, target=None, serial=None):
+def get(filename, target=None, serial=None, callback=None):
     """
     Gets a referenced file on the device's file system and copies it to the
     target (or current working directory if unspecified).
@@ -244,6 +591,11 @@ def get(filename, target=None, serial=None):
     If no serial object is supplied, microfs will attempt to detect the
     connection itself.
 
+    The device sends the file in hex encoded chunks, each one with its length
+    and checksum, which are checked and written to the target as they
+    arrive. If given, the callback is called with the number of bytes
+    received so far and the size of the file, as the chunks arrive.
+
     Returns True for success or raises an IOError if there's a problem.
     """
     if target is None:
@@ -251,32 +603,149 @@ def get(filename, target=None, serial=None):
     commands = [
         "\n".join(
             [
+                "import os",
                 "try:",
-                " from microbit import uart as u",
+                " from ubinascii import hexlify",
                 "except ImportError:",
                 " try:",
-                "  from machine import UART",
-                "  u = UART(0, {})".format(SERIAL_BAUD_RATE),
-                " except Exception:",
-                "  try:",
-                "   from sys import stdout as u",
-                "  except Exception:",
-                "   raise Exception('Could not find UART module in device.')",
+                "  from binascii import hexlify",
+                " except ImportError:",
+                "  hexlify = None",
+                "def h(b):",
+                " if hexlify:",
+                "  return str(hexlify(b), 'ascii')",
+                " return ''.join('%02x' % i for i in b)",
+                "try:",
+                " print(os.stat('{}')[6])".format(filename),
+                "except AttributeError:",
+                " print(os.size('{}'))".format(filename),
+                "f = open('{}', 'rb')".format(filename),
+                "r = f.read",
+                "while True:",
+                " b = r({})".format(GET_CHUNK_SIZE),
+                " if not b:",
+                "  break",
+                " print(len(b), sum(b), h(b))",
+                "f.close()",
+                "print('end')",
+            ]
+        )
+    ]
+    close_serial = False
+    if serial is None:
+        serial = get_serial()
+        close_serial = True
+        time.sleep(0.1)
+    leave_raw = _enter_raw(serial)
+    try:
+        with open(target, "wb") as local:
+            try:
+                err = _receive_chunks(serial, commands[0], local, callback)
+            except IOError:
+                # Don't leave a truncated or corrupted copy of the file.
+                local.close()
+                os.remove(target)
+                raise
+        if err:
+            os.remove(target)
+            raise IOError(clean_error(err))
+    finally:
+        if leave_raw:
+            time.sleep(0.1)
+            raw_off(serial)
+        if close_serial:
+            serial.close()
+            time.sleep(0.1)
+    return True
+
+
+def _receive_chunks(serial, command, local, callback=None):
+    """
+    Runs the command sending a file from the device (see get) and writes
+    the received chunks into the local file object.
+
+    Returns the stderr output from the device, or raises an IOError if a
+    chunk is corrupted or incomplete, or the file is truncated.
+    """
+    send_command(serial, command)
+    size = None
+    received = 0
+    while True:
+        line = serial.readline()
+        if b"\x04" in line:
+            # The output has ended early, most likely with an error.
+            response = line + serial.read_until(b"\x04>")
+            if b"\x04" not in response[:-2]:
+                raise IOError("Could not read the file from the device.")
+            return response[:-2].split(b"\x04", 1)[1]
+        if not line.endswith(b"\n"):
+            # The read timed out part way through a line.
+            raise IOError("Timed out reading the file from the device.")
+        fields = line.split()
+        if fields == [b"end"]:
+            response = serial.read_until(b"\x04>")
+            err = response[:-2].split(b"\x04", 1)[-1]
+            if not err and received != size:
+                raise IOError("The file from the device is incomplete.")
+            return err
+        if size is None:
+            size = int(fields[0])
+        else:
+            length, checksum = int(fields[0]), int(fields[1])
+            data = binascii.unhexlify(fields[2]) if length else b""
+            if len(data) != length or sum(bytearray(data)) != checksum:
+                raise IOError("Corrupted data received from the device.")
+            local.write(data)
+            received += length
+        if callback:
+            callback(received, size)
+
+
+def hashes(filenames, serial=None):
+    """
+    Calculates, on the device, the SHA-256 hash of each of the referenced
+    files on its file system.
+
+    If no serial object is supplied, microfs will attempt to detect the
+    connection itself.
+
+    Returns a dictionary of filename -> hex digest (or None if the file
+    doesn't exist), or raises an IOError if there's a problem (e.g. the
+    device has no hashlib).
+    """
+    commands = [
+        "\n".join(
+            [
+                "try:",
+                " from uhashlib import sha256",
+                "except ImportError:",
+                " from hashlib import sha256",
+                "def d(n):",
+                " try:",
+                "  f = open(n, 'rb')",
+                " except OSError:",
+                "  return None",
+                " h = sha256()",
+                " r = f.read",
+                " while True:",
+                "  b = r(256)",
+                "  if not b:",
+                "   break",
+                "  h.update(b)",
+                " f.close()",
+                " return h.digest()",
             ]
         ),
-        "f = open('{}', 'rb')".format(filename),
-        "r = f.read",
-        "result = True",
-        "while result:\n result = r(32)\n if result:\n  u.write(result)\n",
-        "f.close()",
+        "print([d(n) for n in {!r}])".format(list(filenames)),
     ]
     out, err = execute(commands, serial)
     if err:
         raise IOError(clean_error(err))
-    # Recombine the bytes while removing "b'" from start and "'" from end.
-    with open(target, "wb") as f:
-        f.write(out)
-    return True
+    digests = ast.literal_eval(out.decode("utf-8"))
+    return {
+        filename: binascii.hexlify(digest).decode("ascii") if digest else None
+        for filename, digest in zip(filenames, digests)
+    }
 
 
 def version(serial=None):
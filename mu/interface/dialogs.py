@@ -180,15 +180,29 @@ class MicrobitSettingsWidget(QWidget):
     Used for configuring how to interact with the micro:bit:
 
     * Minification flag.
+    * Flag to flash all the attached micro:bits at once.
+    * Flag to flash the script again each time it's saved.
     * Override runtime version to use.
     """
 
-    def setup(self, minify, custom_runtime_path):
+    def setup(
+        self, minify, custom_runtime_path, flash_all=False, autoflash=False
+    ):
         widget_layout = QVBoxLayout()
         self.setLayout(widget_layout)
         self.minify = QCheckBox(_("Minify Python code before flashing?"))
         self.minify.setChecked(minify)
         widget_layout.addWidget(self.minify)
+        self.flash_all = QCheckBox(
+            _("Flash all the attached micro:bits at the same time?")
+        )
+        self.flash_all.setChecked(flash_all)
+        widget_layout.addWidget(self.flash_all)
+        self.autoflash = QCheckBox(
+            _("Flash the script again each time it's saved?")
+        )
+        self.autoflash.setChecked(autoflash)
+        widget_layout.addWidget(self.autoflash)
         label = QLabel(
             _(
                 "Override the built-in MicroPython runtime with "
@@ -593,6 +607,8 @@ class AdminDialog(QDialog):
             self.microbit_widget.setup(
                 settings.get("minify", False),
                 settings.get("microbit_runtime", ""),
+                settings.get("microbit_flash_all", False),
+                settings.get("microbit_autoflash", False),
             )
             self.tabs.addTab(self.microbit_widget, _("BBC micro:bit Settings"))
         if mode.short_name in ["python", "web", "pygamezero"]:
@@ -632,6 +648,12 @@ class AdminDialog(QDialog):
             settings["envars"] = self.envar_widget.text_area.toPlainText()
         if self.microbit_widget:
             settings["minify"] = self.microbit_widget.minify.isChecked()
+            settings[
+                "microbit_flash_all"
+            ] = self.microbit_widget.flash_all.isChecked()
+            settings[
+                "microbit_autoflash"
+            ] = self.microbit_widget.autoflash.isChecked()
             settings[
                 "microbit_runtime"
             ] = self.microbit_widget.runtime_path.text()
@@ -623,15 +623,26 @@ class Window(QMainWindow):
         self.fs_pane.setFocus()
         file_manager.on_list_files.connect(self.fs_pane.on_ls)
         self.fs_pane.list_files.connect(file_manager.ls)
+        self.fs_pane.sync.connect(file_manager.sync_files)
         self.fs_pane.microbit_fs.put.connect(file_manager.put)
+        self.fs_pane.microbit_fs.put_files.connect(file_manager.put_files)
         self.fs_pane.microbit_fs.delete.connect(file_manager.delete)
         self.fs_pane.microbit_fs.list_files.connect(file_manager.ls)
         self.fs_pane.local_fs.get.connect(file_manager.get)
+        self.fs_pane.local_fs.get_files.connect(file_manager.get_files)
         self.fs_pane.local_fs.put.connect(file_manager.put)
         self.fs_pane.local_fs.list_files.connect(file_manager.ls)
         file_manager.on_put_file.connect(self.fs_pane.microbit_fs.on_put)
         file_manager.on_delete_file.connect(self.fs_pane.microbit_fs.on_delete)
         file_manager.on_get_file.connect(self.fs_pane.local_fs.on_get)
+        file_manager.on_get_progress.connect(
+            self.fs_pane.local_fs.on_get_progress
+        )
+        file_manager.on_transfer_file.connect(self.fs_pane.on_transfer_file)
+        file_manager.on_sync_files.connect(self.fs_pane.on_sync_files)
+        file_manager.on_transfer_progress.connect(
+            self.fs_pane.on_transfer_progress
+        )
         file_manager.on_list_fail.connect(self.fs_pane.on_ls_fail)
         file_manager.on_put_fail.connect(self.fs_pane.on_put_fail)
         file_manager.on_delete_fail.connect(self.fs_pane.on_delete_fail)
@@ -657,13 +668,12 @@ class Window(QMainWindow):
         connection.data_received.connect(repl_pane.process_bytes)
         self.add_repl(repl_pane, name)
 
-    def add_micropython_plotter(self, name, connection, data_flood_handler):
+    def add_micropython_plotter(self, name, connection):
         """
         Adds a plotter that reads data from a serial connection.
         """
         plotter_pane = PlotterPane()
         connection.data_received.connect(plotter_pane.process_tty_data)
-        plotter_pane.data_flood.connect(data_flood_handler)
         self.add_plotter(plotter_pane, name)
 
     def add_python3_plotter(self, mode):
@@ -675,7 +685,6 @@ class Window(QMainWindow):
         """
         plotter_pane = PlotterPane()
         self.data_received.connect(plotter_pane.process_tty_data)
-        plotter_pane.data_flood.connect(mode.on_data_flood)
         self.add_plotter(plotter_pane, _("Python3 data tuple"))
 
     def add_jupyter_repl(self, kernel_manager, kernel_client):
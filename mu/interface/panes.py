@@ -26,9 +26,15 @@ import string
 import bisect
 import os.path
 import codecs
+import itertools
+import math
+import shutil
+import tempfile
+from array import array
 
 from PyQt5.QtCore import (
     Qt,
+    QPointF,
     QProcess,
     QProcessEnvironment,
     pyqtSignal,
@@ -39,22 +45,28 @@ from collections import deque
 from PyQt5.QtWidgets import (
     QMessageBox,
     QTextEdit,
+    QFileDialog,
     QFrame,
     QListWidget,
+    QListWidgetItem,
     QGridLayout,
     QLabel,
     QMenu,
     QTreeView,
+    QProgressBar,
+    QPushButton,
 )
 from PyQt5.QtGui import (
     QKeySequence,
     QTextCursor,
     QCursor,
+    QGuiApplication,
     QPainter,
     QDesktopServices,
     QStandardItem,
 )
 from qtconsole.rich_jupyter_widget import RichJupyterWidget
+from .. import settings
 from ..i18n import language_code
 from mu.interface.themes import Font, DEFAULT_FONT_SIZE
 from mu.interface.themes import DAY_STYLE, NIGHT_STYLE, CONTRAST_STYLE
@@ -82,6 +94,95 @@ PANE_ZOOM_SIZES = {
     "xxxl": 28,
 }
 
+#: Default maximum number of lines kept in the REPL and output panes.
+SCROLLBACK_LINES = 10000
+#: Default maximum size of the text in the REPL and output panes, in MB.
+SCROLLBACK_SIZE = 4
+
+
+class Scrollback:
+    """
+    Bounds the text in a pane's document to the most recent max_lines lines
+    and max_size megabytes of characters by removing the oldest blocks.
+
+    If spool is true, the removed text is written to a temporary file so the
+    pane's whole output can still be saved.
+    """
+
+    def __init__(self, document, max_lines=None, max_size=None, spool=None):
+        self.document = document
+        if max_lines is None:
+            max_lines = settings.settings.get(
+                "scrollback_lines", SCROLLBACK_LINES
+            )
+        if max_size is None:
+            max_size = settings.settings.get(
+                "scrollback_size", SCROLLBACK_SIZE
+            )
+        if spool is None:
+            spool = settings.settings.get("scrollback_spool", False)
+        self.max_lines = max_lines
+        self.max_chars = int(max_size * 1024 * 1024)
+        self.spool = spool
+        self.spool_file = None
+
+    def trim(self):
+        """
+        Remove the oldest blocks of text over the limits (the current, last,
+        block is always kept). Returns the number of characters removed, so
+        positions held elsewhere can be adjusted.
+        """
+        excess_blocks = 0
+        excess_chars = 0
+        if self.max_lines:
+            excess_blocks = self.document.blockCount() - self.max_lines
+        if self.max_chars:
+            excess_chars = self.document.characterCount() - self.max_chars
+        if excess_blocks <= 0 and excess_chars <= 0:
+            return 0
+        last_block = self.document.lastBlock()
+        block = self.document.firstBlock()
+        removed_blocks = 0
+        removed_chars = 0
+        while block != last_block and (
+            removed_blocks < excess_blocks or removed_chars < excess_chars
+        ):
+            removed_blocks += 1
+            removed_chars += block.length()
+            block = block.next()
+        if not removed_chars:
+            return 0
+        cursor = QTextCursor(self.document)
+        cursor.setPosition(removed_chars, QTextCursor.KeepAnchor)
+        if self.spool:
+            if self.spool_file is None:
+                self.spool_file = tempfile.TemporaryFile(
+                    "w+", encoding="utf-8", prefix="mu-scrollback-"
+                )
+            self.spool_file.write(cursor.selection().toPlainText())
+        cursor.removeSelectedText()
+        return removed_chars
+
+    def save(self, path):
+        """
+        Save all the text, including any spooled text that was trimmed from
+        the document, to the referenced path.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            if self.spool_file:
+                self.spool_file.seek(0)
+                shutil.copyfileobj(self.spool_file, f)
+                self.spool_file.seek(0, os.SEEK_END)
+            f.write(self.document.toPlainText())
+
+    def clear(self):
+        """
+        Forget any spooled text.
+        """
+        if self.spool_file:
+            self.spool_file.close()
+            self.spool_file = None
+
 
 class JupyterREPLPane(RichJupyterWidget):
     """
@@ -175,6 +276,7 @@ class MicroPythonREPLPane(QTextEdit):
         # the device cursor is placed. It is initialized to the beginning
         # of the QTextEdit (i.e. equal to the Qt cursor position)
         self.device_cursor_position = self.textCursor().position()
+        self.scrollback = Scrollback(self.document())
         self.setObjectName("replpane")
         self.set_theme(theme)
         self.unprocessed_input = b""  # used by process_bytes
@@ -185,6 +287,9 @@ class MicroPythonREPLPane(QTextEdit):
         self.osc_regex = re.compile(
             r"\x1B\](?P<command>[\d]*);(?P<string>[^\x1B]*)\x1B\\"
         )
+        # Runs of text containing no control characters, which are written
+        # to the widget in one go.
+        self.plain_text_regex = re.compile(r"[^\x08\r\n\x1B]+")
 
     def insertFromMimeData(self, source):
         """
@@ -216,8 +321,19 @@ class MicroPythonREPLPane(QTextEdit):
 
         menu.addAction("Copy", self.copy, copy_keys)
         menu.addAction("Paste", self.paste, paste_keys)
+        if self.scrollback.spool:
+            menu.addAction(_("Save output"), self.save_output)
         menu.exec_(QCursor.pos())
 
+    def save_output(self):
+        """
+        Save all the output, including any trimmed from the scrollback, to a
+        file chosen by the user.
+        """
+        path, _filter = QFileDialog.getSaveFileName(self, _("Save output"))
+        if path:
+            self.scrollback.save(path)
+
     def set_theme(self, theme):
         self.set_font_size(self.font_size)
 
@@ -382,6 +498,10 @@ class MicroPythonREPLPane(QTextEdit):
 
         Updates the self.device_cursor_position to match that of the device
         for every input received.
+
+        Runs of plain text between control characters are written in one go
+        (see overwrite_text), so a device printing at full speed doesn't
+        cost several Qt calls per character.
         """
         i = 0
         data = self.decoder.decode(data)
@@ -398,6 +518,11 @@ class MicroPythonREPLPane(QTextEdit):
         tc = self.textCursor()
 
         while i < len(data):
+            run = self.plain_text_regex.match(data, i)
+            if run:
+                self.overwrite_text(tc, run.group())
+                i = run.end()
+                continue
             if data[i] == "\b":
                 tc.movePosition(QTextCursor.Left)
                 self.device_cursor_position = tc.position()
@@ -409,11 +534,11 @@ class MicroPythonREPLPane(QTextEdit):
                 # Escape
                 if len(data) > i + 1 and data[i + 1] == "[":
                     # VT100 cursor detected: <Esc>[
-                    match = self.vt100_regex.search(data[i:])
+                    match = self.vt100_regex.match(data, i)
                     if match:
                         # move to (almost) after control seq
                         # (will ++ at end of loop)
-                        i += match.end() - 1
+                        i = match.end() - 1
                         count_string = match.group("count")
                         count = 1 if count_string == "" else int(count_string)
                         action = match.group("action")
@@ -449,11 +574,11 @@ class MicroPythonREPLPane(QTextEdit):
                         break
                 elif len(data) > i + 1 and data[i + 1] == "]":
                     # OSC cursor detected: <Esc>]
-                    match = self.osc_regex.search(data[i:])
+                    match = self.osc_regex.match(data, i)
                     if match:
                         # move to (almost) after control seq
                         # (will ++ at end of loop)
-                        i += match.end() - 1
+                        i = match.end() - 1
                         command = match.group("command")
                         string = match.group("string")
                         if command == "0":  # Set window title and icon name
@@ -479,22 +604,44 @@ class MicroPythonREPLPane(QTextEdit):
                 self.device_cursor_position = tc.position() + 1
                 self.setTextCursor(tc)
                 self.insertPlainText(data[i])
-            else:
-                # Char received, with VT100 that should be interpreted
-                # as overwrite the char in front of the cursor
-                tc.deleteChar()
-                self.device_cursor_position = tc.position() + 1
-                self.insertPlainText(data[i])
             self.setTextCursor(tc)
             i += 1
+        self.setTextCursor(tc)
+        self.trim_scrollback()
         # Scroll textarea if necessary to see cursor
         self.ensureCursorVisible()
 
+    def trim_scrollback(self):
+        """
+        Trim the oldest output over the scrollback limits, keeping the device
+        cursor position in step with the remaining text.
+        """
+        removed = self.scrollback.trim()
+        if removed:
+            self.device_cursor_position = max(
+                0, self.device_cursor_position - removed
+            )
+
+    def overwrite_text(self, tc, text):
+        """
+        Write the run of plain text at the given text cursor. As with VT100,
+        each character overwrites the one in front of the cursor, so the
+        same number of characters are replaced in a single edit.
+        """
+        tc.beginEditBlock()
+        tc.movePosition(
+            QTextCursor.NextCharacter, QTextCursor.KeepAnchor, len(text)
+        )
+        tc.insertText(text)
+        tc.endEditBlock()
+        self.device_cursor_position = tc.position()
+
     def clear(self):
         """
         Clears the text of the REPL.
         """
         self.setText("")
+        self.scrollback.clear()
 
     def set_font_size(self, new_size=DEFAULT_FONT_SIZE):
         """
@@ -671,6 +818,7 @@ class SnekREPLPane(MicroPythonREPLPane):
                         self.setTextCursor(tc)
                         self.insertPlainText(chr(data[i]))
             i += 1
+        self.trim_scrollback()
         self.ensureCursorVisible()
 
 
@@ -680,8 +828,10 @@ class MuFileList(QListWidget):
     """
 
     disable = pyqtSignal()
+    enable = pyqtSignal()
     list_files = pyqtSignal()
     set_message = pyqtSignal(str)
+    set_progress = pyqtSignal(int, int)
 
     def show_confirm_overwrite_dialog(self):
         """
@@ -700,19 +850,69 @@ class MuFileList(QListWidget):
 class MicroPythonDeviceFileList(MuFileList):
     """
     Represents a list of files on a MicroPython device.
+
+    The device's file system is cached in the files dictionary, which maps
+    each path (e.g. "lib/foo.py") to its (is_directory, size). Once
+    listed, the cache and list are updated in place as files are put onto or
+    deleted from the device, rather than listing the device again.
     """
 
     put = pyqtSignal(str)
+    put_files = pyqtSignal(list)
     delete = pyqtSignal(str)
 
     def __init__(self, home):
         super().__init__()
         self.home = home
+        self.files = {}
         self.setDragDropMode(QListWidget.DragDrop)
+        self.setSelectionMode(QListWidget.ExtendedSelection)
+
+    def update_files(self, entries):
+        """
+        Update the cache from the (path, is_directory, size) entries
+        listed on the device, only touching the items in the list that have
+        changed.
+        """
+        files = {entry[0]: tuple(entry[1:]) for entry in entries}
+        for path in set(self.files) - set(files):
+            self.remove_file(path)
+        for path, (is_dir, size) in files.items():
+            if self.files.get(path) != (is_dir, size):
+                self.add_file(path, size, is_dir)
+
+    def add_file(self, path, size=None, is_dir=False):
+        """
+        Add (or update) the referenced path in the cache and, if it's a file,
+        the list.
+        """
+        self.files[path] = (is_dir, size)
+        if is_dir:
+            return
+        items = self.findItems(path, Qt.MatchExactly)
+        if items:
+            item = items[0]
+        else:
+            item = QListWidgetItem(path)
+            self.addItem(item)
+            self.sortItems()
+        item.setToolTip(_("{} bytes").format(size) if size is not None else "")
+
+    def remove_file(self, path):
+        """
+        Remove the referenced path from the cache and the list.
+        """
+        self.files.pop(path, None)
+        for item in self.findItems(path, Qt.MatchExactly):
+            self.takeItem(self.row(item))
 
     def dropEvent(self, event):
         source = event.source()
         if isinstance(source, LocalFileList):
+            filenames = [item.text() for item in source.selectedItems()]
+            if len(filenames) > 1:
+                self.drop_files(filenames)
+                return
             file_exists = self.findItems(
                 source.currentItem().text(), Qt.MatchExactly
             )
@@ -730,13 +930,32 @@ class MicroPythonDeviceFileList(MuFileList):
                 self.set_message.emit(msg)
                 self.put.emit(local_filename)
 
+    def drop_files(self, filenames):
+        """
+        Copy several local files onto the device as a single batch.
+        """
+        files_exist = any(
+            self.findItems(filename, Qt.MatchExactly) for filename in filenames
+        )
+        if not files_exist or self.show_confirm_overwrite_dialog():
+            self.disable.emit()
+            files = [
+                (os.path.join(self.home, filename), filename)
+                for filename in filenames
+            ]
+            msg = _("Copying {} files to device.").format(len(files))
+            logger.info(msg)
+            self.set_message.emit(msg)
+            self.put_files.emit(files)
+
     def on_put(self, microbit_file):
         """
         Fired when the put event is completed for the given filename.
         """
         msg = _("'{}' successfully copied to device.").format(microbit_file)
+        self.add_file(microbit_file)
         self.set_message.emit(msg)
-        self.list_files.emit()
+        self.enable.emit()
 
     def contextMenuEvent(self, event):
         menu_current_item = self.currentItem()
@@ -759,8 +978,9 @@ class MicroPythonDeviceFileList(MuFileList):
         Fired when the delete event is completed for the given filename.
         """
         msg = _("'{}' successfully deleted from device.").format(microbit_file)
+        self.remove_file(microbit_file)
         self.set_message.emit(msg)
-        self.list_files.emit()
+        self.enable.emit()
 
 
 class LocalFileList(MuFileList):
@@ -769,6 +989,7 @@ class LocalFileList(MuFileList):
     """
 
     get = pyqtSignal(str, str)
+    get_files = pyqtSignal(list)
     put = pyqtSignal(str, str)
     open_file = pyqtSignal(str)
 
@@ -776,12 +997,18 @@ class LocalFileList(MuFileList):
         super().__init__()
         self.home = home
         self.setDragDropMode(QListWidget.DragDrop)
+        self.setSelectionMode(QListWidget.ExtendedSelection)
 
     def dropEvent(self, event):
         source = event.source()
         if isinstance(source, MicroPythonDeviceFileList):
+            filenames = [item.text() for item in source.selectedItems()]
+            if len(filenames) > 1:
+                self.drop_files(filenames)
+                return
+            microbit_filename = source.currentItem().text()
             file_exists = self.findItems(
-                source.currentItem().text(), Qt.MatchExactly
+                os.path.basename(microbit_filename), Qt.MatchExactly
             )
             if (
                 not file_exists
@@ -789,8 +1016,9 @@ class LocalFileList(MuFileList):
                 and self.show_confirm_overwrite_dialog()
             ):
                 self.disable.emit()
-                microbit_filename = source.currentItem().text()
-                local_filename = os.path.join(self.home, microbit_filename)
+                local_filename = os.path.join(
+                    self.home, os.path.basename(microbit_filename)
+                )
                 msg = _(
                     "Getting '{}' from device. " "Copying to '{}'."
                 ).format(microbit_filename, local_filename)
@@ -798,6 +1026,26 @@ class LocalFileList(MuFileList):
                 self.set_message.emit(msg)
                 self.get.emit(microbit_filename, local_filename)
 
+    def drop_files(self, filenames):
+        """
+        Copy several files from the device to the computer as a single
+        batch.
+        """
+        files_exist = any(
+            self.findItems(os.path.basename(filename), Qt.MatchExactly)
+            for filename in filenames
+        )
+        if not files_exist or self.show_confirm_overwrite_dialog():
+            self.disable.emit()
+            files = [
+                (filename, os.path.join(self.home, os.path.basename(filename)))
+                for filename in filenames
+            ]
+            msg = _("Getting {} files from device.").format(len(files))
+            logger.info(msg)
+            self.set_message.emit(msg)
+            self.get_files.emit(files)
+
     def on_get(self, microbit_file):
         """
         Fired when the get event is completed for the given filename.
@@ -805,8 +1053,18 @@ class LocalFileList(MuFileList):
         msg = _(
             "Successfully copied '{}' " "from the device to your computer."
         ).format(microbit_file)
+        local_filename = os.path.basename(microbit_file)
+        if not self.findItems(local_filename, Qt.MatchExactly):
+            self.addItem(local_filename)
+            self.sortItems()
         self.set_message.emit(msg)
-        self.list_files.emit()
+        self.enable.emit()
+
+    def on_get_progress(self, microbit_file, received, size):
+        """
+        Fired as the file with the given filename is got from the device.
+        """
+        self.set_progress.emit(received, size)
 
     def contextMenuEvent(self, event):
         menu_current_item = self.currentItem()
@@ -858,6 +1116,7 @@ class FileSystemPane(QFrame):
     set_warning = pyqtSignal(str)
     list_files = pyqtSignal()
     open_file = pyqtSignal(str)
+    sync = pyqtSignal(list)
 
     def __init__(self, home):
         super().__init__()
@@ -886,10 +1145,22 @@ class FileSystemPane(QFrame):
         layout.addWidget(local_label, 0, 1)
         layout.addWidget(microbit_fs, 1, 0)
         layout.addWidget(local_fs, 1, 1)
+        self.sync_button = QPushButton(_("Sync to device"))
+        self.sync_button.setToolTip(
+            _("Copy the files on your computer that changed onto the device.")
+        )
+        self.sync_button.clicked.connect(self.sync_folder)
+        layout.addWidget(self.sync_button, 2, 1)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.hide()
+        layout.addWidget(self.progress_bar, 3, 0, 1, 2)
         self.microbit_fs.disable.connect(self.disable)
+        self.microbit_fs.enable.connect(self.enable)
         self.microbit_fs.set_message.connect(self.show_message)
         self.local_fs.disable.connect(self.disable)
+        self.local_fs.enable.connect(self.enable)
         self.local_fs.set_message.connect(self.show_message)
+        self.local_fs.set_progress.connect(self.show_progress)
 
     def disable(self):
         """
@@ -899,6 +1170,7 @@ class FileSystemPane(QFrame):
         self.local_fs.setDisabled(True)
         self.microbit_fs.setAcceptDrops(False)
         self.local_fs.setAcceptDrops(False)
+        self.sync_button.setDisabled(True)
 
     def enable(self):
         """
@@ -908,6 +1180,8 @@ class FileSystemPane(QFrame):
         self.local_fs.setDisabled(False)
         self.microbit_fs.setAcceptDrops(True)
         self.local_fs.setAcceptDrops(True)
+        self.sync_button.setDisabled(False)
+        self.progress_bar.hide()
 
     def show_message(self, message):
         """
@@ -921,27 +1195,76 @@ class FileSystemPane(QFrame):
         """
         self.set_warning.emit(message)
 
+    def show_progress(self, value, maximum):
+        """
+        Shows the progress of a file transfer.
+        """
+        self.progress_bar.setMaximum(maximum)
+        self.progress_bar.setValue(value)
+        self.progress_bar.show()
+
     def on_ls(self, microbit_files):
         """
-        Displays a list of the files on the micro:bit.
+        Displays the (path, is_directory, size) entries listed on the
+        micro:bit, updating only what changed since the last listing.
 
-        Since listing files is always the final event in any interaction
+        Since listing files is the final event in any batch interaction
         between Mu and the micro:bit, this enables the controls again for
         further interactions to take place.
         """
-        self.microbit_fs.clear()
+        self.microbit_fs.update_files(microbit_files)
         self.local_fs.clear()
-        for f in microbit_files:
-            self.microbit_fs.addItem(f)
+        for f in self.local_files():
+            self.local_fs.addItem(f)
+        self.enable()
+
+    def local_files(self):
+        """
+        Returns the sorted list of the files in the local directory.
+        """
         local_files = [
             f
             for f in os.listdir(self.home)
             if os.path.isfile(os.path.join(self.home, f))
         ]
         local_files.sort()
-        for f in local_files:
-            self.local_fs.addItem(f)
-        self.enable()
+        return local_files
+
+    def sync_folder(self):
+        """
+        Copy the files in the local directory that aren't already on the
+        device onto it.
+        """
+        files = [(os.path.join(self.home, f), f) for f in self.local_files()]
+        self.disable()
+        self.show_message(_("Syncing files onto the device."))
+        self.sync.emit(files)
+
+    def on_sync_files(self, changed, total):
+        """
+        Fired when it's known how many of the synced files changed.
+        """
+        self.show_message(
+            _("Copying {} of {} files onto the device.").format(changed, total)
+        )
+
+    def on_transfer_file(self, filename):
+        """
+        Fired as each file in a batch is transferred.
+        """
+        self.show_message(_("'{}' successfully copied.").format(filename))
+
+    def on_transfer_progress(self, done, total, rate):
+        """
+        Fired as a batch of files is transferred, with the bytes transferred
+        so far, the total bytes and the bytes per second.
+        """
+        self.show_progress(done, total)
+        self.show_message(
+            _("Copied {} of {} bytes ({:.1f} KB/s).").format(
+                done, total, rate / 1024
+            )
+        )
 
     def on_ls_fail(self):
         """
@@ -986,6 +1309,7 @@ class FileSystemPane(QFrame):
         """
         Fired when getting the referenced file on the device failed.
         """
+        self.progress_bar.hide()
         self.show_warning(
             _(
                 "There was a problem getting '{}' from the "
@@ -1040,6 +1364,7 @@ class PythonProcessPane(QTextEdit):
         self.stdout_buffer = b""  # contains non-decoded bytes from stdout.
         self.reading_stdout = False  # flag showing if already reading stdout.
         self.is_interactive = False  # flag if the process is interactive mode.
+        self.scrollback = Scrollback(self.document())
 
     def start_process(
         self,
@@ -1189,8 +1514,19 @@ class PythonProcessPane(QTextEdit):
             paste_keys = QKeySequence(Qt.CTRL + Qt.SHIFT + Qt.Key_V)
         menu.addAction("Copy", self.copy, copy_keys)
         menu.addAction("Paste", self.paste, paste_keys)
+        if self.scrollback.spool:
+            menu.addAction(_("Save output"), self.save_output)
         menu.exec_(QCursor.pos())
 
+    def save_output(self):
+        """
+        Save all the output, including any trimmed from the scrollback, to a
+        file chosen by the user.
+        """
+        path, _filter = QFileDialog.getSaveFileName(self, _("Save output"))
+        if path:
+            self.scrollback.save(path)
+
     def insertFromMimeData(self, source):
         """
         Insert mime data by sending it to the REPL
@@ -1414,6 +1750,7 @@ class PythonProcessPane(QTextEdit):
             try:
                 self.append(data)
                 self.on_append_text.emit(data)
+                self.scrollback.trim()
                 self.set_start_of_current_line()
                 self.stdout_buffer = b""
             except UnicodeDecodeError:
@@ -1562,6 +1899,300 @@ class DebugInspector(QTreeView):
         pass
 
 
+class RingBuffer:
+    """
+    Holds the most recent capacity values of a series of plotted data in a
+    preallocated array, keeping track of their minimum and maximum as values
+    are added (so they needn't be searched for each time they're drawn).
+    """
+
+    def __init__(self, capacity, fill=0):
+        self.capacity = capacity
+        self.values = array("d", [fill] * capacity)
+        self.count = capacity  # Number of values ever appended.
+        # Candidates for the maximum and minimum as (count, value), in the
+        # order they were appended. Each candidate is greater (or less) than
+        # those appended after it, so the first is the current max (or min).
+        self._max = deque([(capacity, fill)])
+        self._min = deque([(capacity, fill)])
+
+    def __len__(self):
+        return self.capacity
+
+    def append(self, value):
+        """
+        Add a value, replacing the oldest.
+        """
+        self.values[self.count % self.capacity] = value
+        self.count += 1
+        oldest = self.count - self.capacity
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((self.count, value))
+        if self._max[0][0] <= oldest:
+            self._max.popleft()
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((self.count, value))
+        if self._min[0][0] <= oldest:
+            self._min.popleft()
+
+    def max(self):
+        return self._max[0][1]
+
+    def min(self):
+        return self._min[0][1]
+
+    def latest(self, n):
+        """
+        Return the most recent n values, oldest first.
+        """
+        end = self.count % self.capacity
+        if n <= end:
+            return self.values[end - n : end]
+        return self.values[self.capacity - (n - end) :] + self.values[:end]
+
+
+class PlotHistory:
+    """
+    Holds every tuple of data plotted in a session, with a column of values
+    for each position in the tuples, in compact typed arrays. Once
+    block_rows rows are held in memory they're spilled to a temporary file,
+    so a long session doesn't use ever more memory.
+
+    As rows arrive, the minimum and maximum of each column are summarised
+    for blocks of summary_size rows, summary_size of those blocks and so on.
+    This means envelope() can quickly decimate any range of rows, however
+    large, for display.
+
+    It otherwise behaves as a sequence of the tuples that were appended.
+    """
+
+    #: Rows held in memory before they're spilled to disk (a multiple of
+    #: summary_size).
+    block_rows = 65536
+    #: Rows (or summaries) combined in each summary.
+    summary_size = 64
+
+    def __init__(self):
+        self.rows = 0
+        # The rows in memory: a column of values for each position in the
+        # tuples (NaN where a tuple had no value), the number of values in
+        # each tuple and a bit mask of which of those were ints.
+        self.columns = []
+        self.widths = array("H")
+        self.int_masks = array("Q")
+        # For each column, the (minimums, maximums) of each level of
+        # summaries, from blocks of summary_size rows upwards.
+        self.summaries = []
+        self.spill_file = None
+        # The (file offset, rows, columns) of each block spilled to disk.
+        self.spilled = []
+        self.spilled_rows = 0
+
+    def __len__(self):
+        return self.rows
+
+    def __iter__(self):
+        for block in range(len(self.spilled)):
+            yield from self._tuples(*self._load_block(block))
+        yield from self._tuples(self.widths, self.int_masks, self.columns)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.rows
+        if not 0 <= index < self.rows:
+            raise IndexError("plot history index out of range")
+        if index < self.spilled_rows:
+            block, index = divmod(index, self.block_rows)
+            widths, int_masks, columns = self._load_block(block)
+        else:
+            index -= self.spilled_rows
+            widths, int_masks, columns = (
+                self.widths,
+                self.int_masks,
+                self.columns,
+            )
+        return next(
+            self._tuples(
+                widths[index : index + 1],
+                int_masks[index : index + 1],
+                [column[index : index + 1] for column in columns],
+            )
+        )
+
+    def append(self, values):
+        """
+        Add a tuple of numeric values to the end of the history.
+        """
+        width = len(values)
+        while len(self.columns) < width:
+            self._add_column()
+        int_mask = 0
+        for i, column in enumerate(self.columns):
+            if i < width:
+                column.append(values[i])
+                if i < 64 and isinstance(values[i], int):
+                    int_mask |= 1 << i
+            else:
+                column.append(math.nan)
+        self.widths.append(width)
+        self.int_masks.append(int_mask)
+        self.rows += 1
+        if self.rows % self.summary_size == 0:
+            self._summarise()
+        if len(self.widths) >= self.block_rows:
+            self._spill()
+
+    def envelope(self, column, start, end, buckets):
+        """
+        Return the values of the referenced column in the rows from start to
+        end, decimated to about the given number of buckets, as a list of
+        (first row, minimum, maximum) for each bucket.
+        """
+        if column >= len(self.columns) or end <= start or buckets < 1:
+            return []
+        step = (end - start) / buckets
+        # Use the coarsest summaries that still fit in a bucket.
+        size = 1
+        level = -1
+        levels = self.summaries[column]
+        while level + 1 < len(levels) and size * self.summary_size <= step:
+            size *= self.summary_size
+            level += 1
+        per_bucket = max(1, int(step // size))
+        result = []
+        if level < 0:
+            values = self._read_column(column, start, end)
+            for i in range(0, len(values), per_bucket):
+                bucket = [v for v in values[i : i + per_bucket] if v == v]
+                if bucket:
+                    result.append((start + i, min(bucket), max(bucket)))
+            return result
+        minimums, maximums = levels[level]
+        stop = min(-(-end // size), len(minimums))
+        for i in range(start // size, stop, per_bucket):
+            low = min(minimums[i : min(i + per_bucket, stop)])
+            high = max(maximums[i : min(i + per_bucket, stop)])
+            if low <= high:  # Otherwise the column has no values here.
+                result.append((i * size, low, high))
+        # The most recent rows aren't yet summarised at this level.
+        rest = max(stop * size, start)
+        if rest < end:
+            buckets = max(1, round((end - rest) / step))
+            result.extend(self.envelope(column, rest, end, buckets))
+        return result
+
+    def _add_column(self):
+        self.columns.append(array("d", [math.nan]) * len(self.widths))
+        levels = []
+        if self.summaries:
+            for minimums, maximums in self.summaries[0]:
+                levels.append(
+                    (
+                        array("d", [math.inf]) * len(minimums),
+                        array("d", [-math.inf]) * len(maximums),
+                    )
+                )
+        self.summaries.append(levels)
+
+    def _summarise(self):
+        """
+        Summarise the last summary_size rows, and any coarser summaries now
+        complete.
+        """
+        size = self.summary_size
+        for column, levels in zip(self.columns, self.summaries):
+            values = [v for v in column[-size:] if v == v]
+            low = min(values, default=math.inf)
+            high = max(values, default=-math.inf)
+            for level in itertools.count():
+                if level == len(levels):
+                    levels.append((array("d"), array("d")))
+                minimums, maximums = levels[level]
+                minimums.append(low)
+                maximums.append(high)
+                if len(minimums) % size:
+                    break
+                low = min(minimums[-size:])
+                high = max(maximums[-size:])
+
+    def _spill(self):
+        """
+        Move the rows in memory to the end of the spill file.
+        """
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(prefix="mu-plotter-")
+        self.spill_file.seek(0, os.SEEK_END)
+        self.spilled.append(
+            (self.spill_file.tell(), len(self.widths), len(self.columns))
+        )
+        self.widths.tofile(self.spill_file)
+        self.int_masks.tofile(self.spill_file)
+        for column in self.columns:
+            column.tofile(self.spill_file)
+        self.spilled_rows += len(self.widths)
+        self.widths = array("H")
+        self.int_masks = array("Q")
+        self.columns = [array("d") for column in self.columns]
+
+    def _load_block(self, block):
+        """
+        Return the widths, int masks and columns of a block spilled to disk.
+        """
+        offset, rows, width = self.spilled[block]
+        self.spill_file.seek(offset)
+        widths = array("H")
+        widths.fromfile(self.spill_file, rows)
+        int_masks = array("Q")
+        int_masks.fromfile(self.spill_file, rows)
+        columns = []
+        for i in range(width):
+            columns.append(array("d"))
+            columns[i].fromfile(self.spill_file, rows)
+        return widths, int_masks, columns
+
+    def _read_column(self, column, start, end):
+        """
+        Return the values of the referenced column in rows start to end.
+        """
+        values = array("d")
+        first_row = 0
+        for offset, rows, width in self.spilled:
+            begin = max(start, first_row)
+            stop = min(end, first_row + rows)
+            if begin < stop:
+                if column < width:
+                    header = rows * (
+                        self.widths.itemsize + self.int_masks.itemsize
+                    )
+                    position = column * rows + begin - first_row
+                    self.spill_file.seek(
+                        offset + header + position * values.itemsize
+                    )
+                    values.fromfile(self.spill_file, stop - begin)
+                else:
+                    values.extend(array("d", [math.nan]) * (stop - begin))
+            first_row += rows
+        begin = max(start, first_row)
+        if begin < end:
+            values.extend(
+                self.columns[column][begin - first_row : end - first_row]
+            )
+        return values
+
+    def _tuples(self, widths, int_masks, columns):
+        """
+        Yield the tuple of values in each of the referenced rows.
+        """
+        for row, width in enumerate(widths):
+            int_mask = int_masks[row]
+            yield tuple(
+                int(columns[i][row]) if int_mask >> i & 1 else columns[i][row]
+                for i in range(width)
+            )
+
+
 class PlotterPane(QChartView):
     """
     This plotter widget makes viewing sensor data easy!
@@ -1569,30 +2200,98 @@ class PlotterPane(QChartView):
     This widget represents a chart that will look for tuple data from
     the MicroPython REPL, Python 3 REPL or Python 3 code runner and will
     auto-generate a graph.
+
+    Data may also be sent as a dict of named channels, such as
+    {"temp": 21.5, "humidity": 40}. If the plotter_timestamps setting is on,
+    the first value of each tuple is the time it was measured (in seconds),
+    plotted along the x axis. Once a dict has had a channel named "t", that
+    channel is the time of the dicts that follow, but tuples still follow the
+    setting.
+
+    In history mode the whole session is plotted, rather than the most
+    recent data, and can be zoomed (with the mouse wheel) and panned (by
+    dragging).
     """
 
-    data_flood = pyqtSignal()
+    # Emitted with a list of the tuples of data each time some are recorded.
+    data_recorded = pyqtSignal(list)
+
+    #: Minimum milliseconds between redraws of the chart (about one display
+    #: frame).
+    frame_interval = 16
+    #: Fewest rows of data shown when zoomed in, in history mode.
+    min_view_span = 10
+    #: Bytes of incoming data parsed at a time.
+    slice_size = 65536
+    #: Longest incomplete line (in bytes) kept while waiting for its end.
+    max_line_length = 4096
+    #: A y axis of its own shrinks once the data spans less than this
+    #: fraction of it.
+    shrink_ratio = 0.25
+    #: Fraction of the data's span left above and below it on its own y axis.
+    axis_margin = 0.1
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        # Holds the raw input to be checked for actionable data to display.
-        self.input_buffer = []
-        # Holds the raw actionable data detected while plotting.
-        self.raw_data = []
+        # Holds the incomplete last line of input, still to be checked for
+        # actionable data to display.
+        self.input_buffer = b""
+        # Matches a line containing a Python tuple or dict, capturing its
+        # values or items.
+        self.tuple_regex = re.compile(
+            rb"^(?:\((.*)\)|\{(.*)\})\r?$", re.MULTILINE
+        )
+        # Matches an item in a dict of named channels, capturing its name and
+        # value (quoted values may contain commas).
+        self.item_regex = re.compile(
+            rb"""\s*(["'])(.*?)\1\s*:\s*("[^"]*"|'[^']*'|[^,]*)"""
+        )
+        # Names of the channels of data sent as dicts, in the order they were
+        # first seen.
+        self.channels = []
+        # Whether the first value of each tuple is the time.
+        self.timestamp_tuples = settings.settings.get(
+            "plotter_timestamps", False
+        )
+        # Whether the dicts of named channels have a time channel ("t").
+        self.timestamp_channels = False
+        # Whether the data being plotted is timestamped.
+        self.timestamps = self.timestamp_tuples
+        # Whether each series has its own y axis (held in series_axes).
+        self.separate_axes = False
+        self.series_axes = []
+        self.use_opengl = settings.settings.get(
+            "plotter_opengl", True
+        ) and QGuiApplication.platformName() not in ("offscreen", "minimal")
+        # Holds the raw actionable data detected while plotting (unless the
+        # plotter_history setting is turned off).
+        self.raw_data = None
+        if settings.settings.get("plotter_history", True):
+            self.raw_data = PlotHistory()
+        # Whether the whole session is plotted and, if so, how many rows are
+        # shown up to which row (None for the whole session and the latest
+        # row).
+        self.history_mode = False
+        self.view_span = None
+        self.view_end = None
+        self.drag_start = None  # Position and view when dragging started.
         self.setObjectName("plotterpane")
         # Number of datapoints to show (caps at self.max_x)
         self.num_datapoints = 0
-        self.lookback = 500
-        self.max_x = 100  # Maximum value along x axis
+        self.max_x = settings.settings.get("plotter_window", 100)
+        self.lookback = max(500, self.max_x)
         self.max_y = 1000  # Maximum value +/- along y axis
         self.min_y = -1000
-        self.flooded = False  # Flag to indicate if data flooding is happening.
 
-        # Holds dequeues for each slot of incoming data (assumes 1 to start with)
-        self.data = [deque([0] * self.lookback)]
+        # Holds ring buffers for each slot of incoming data (assumes 1 to start
+        # with).
+        self.data = [RingBuffer(self.lookback)]
+        # Holds the time of each datapoint, if the data is timestamped.
+        self.times = RingBuffer(self.lookback)
         # Holds line series for each slot of incoming data (assumes 1 to start
         # with).
         self.series = [QLineSeries()]
+        self.series[0].setUseOpenGL(self.use_opengl)
 
         # Ranges used for the Y axis (up to 1000, after which we just double
         # the range).
@@ -1612,55 +2311,102 @@ class PlotterPane(QChartView):
         self.chart.setAxisY(self.axis_y, self.series[0])
         self.setChart(self.chart)
         self.setRenderHint(QPainter.Antialiasing)
+        if self.timestamps:
+            self.reset_x_axis()
+        # Limits redrawing the chart to once per frame.
+        self.redraw_timer = QTimer(self)
+        self.redraw_timer.setSingleShot(True)
+        self.redraw_timer.setInterval(self.frame_interval)
+        self.redraw_timer.timeout.connect(self.on_redraw_timer)
+        self.redraw_pending = False
 
     def process_tty_data(self, data):
         """
-        Takes raw bytes and, if a valid tuple is detected, adds the data to
+        Takes raw bytes and, if valid tuples are detected, adds the data to
         the plotter.
 
-        The the length of the bytes data > 1024 then a data_flood signal is
-        emitted to ensure Mu can take action to remain responsive.
-        """
-        # Data flooding guards.
-        if self.flooded:
-            return
-        if len(data) > 1024:
-            self.flooded = True
-            self.data_flood.emit()
-            return
-        data = data.replace(b"\r\n", b"\n")
-        self.input_buffer.append(data)
-        # Check if the data contains a Python tuple, containing numbers, on a
-        # single line (i.e. ends with \n).
-        input_bytes = b"".join(self.input_buffer)
-        lines = input_bytes.split(b"\n")
-        for line in lines:
-            if line.startswith(b"(") and line.endswith(b")"):
-                # Candidate tuple. Extract the raw bytes into a numeric tuple.
-                raw_values = [val.strip() for val in line[1:-1].split(b",")]
-                numeric_values = []
-                for raw in raw_values:
-                    try:
-                        numeric_values.append(int(raw))
-                        # It worked, so move onto the next value.
-                        continue
-                    except ValueError:
-                        # Try again as a float.
-                        pass
-                    try:
-                        numeric_values.append(float(raw))
-                    except ValueError:
-                        # Not an int or float, so ignore this value.
-                        continue
+        However much data arrives at once, every tuple is recorded but the
+        chart is only redrawn once, so a flood of data degrades to showing
+        the latest values rather than making Mu unresponsive.
+        """
+        recorded = []
+        for i in range(0, len(data), self.slice_size):
+            input_bytes = self.input_buffer + data[i : i + self.slice_size]
+            # Only complete lines (ending with \n) are parsed. Any bytes
+            # after the last one are kept for next time.
+            end = input_bytes.rfind(b"\n") + 1
+            self.input_buffer = input_bytes[end:]
+            if len(self.input_buffer) > self.max_line_length:
+                # Too long to be a tuple of data worth plotting.
+                self.input_buffer = b""
+            for match in self.tuple_regex.finditer(input_bytes, 0, end):
+                if match.group(1) is not None:
+                    self.set_timestamps(self.timestamp_tuples)
+                    numeric_values = self.parse_values(match.group(1))
+                else:
+                    numeric_values = self.parse_channels(match.group(2))
+                if self.timestamps and len(numeric_values) < 2:
+                    continue  # There's nothing to plot against the time.
                 if numeric_values:
                     # There were numeric values in the tuple, so use them!
-                    self.add_data(tuple(numeric_values))
-        # Reset the input buffer.
-        self.input_buffer = []
-        if lines[-1]:
-            # Append any bytes that are not yet at the end of a line, for
-            # processing next time we read data from self.connection.
-            self.input_buffer.append(lines[-1])
+                    self.record_data(numeric_values)
+                    recorded.append(numeric_values)
+        if recorded:
+            self.data_recorded.emit(recorded)
+            self.request_redraw()
+
+    def parse_values(self, raw_values):
+        """
+        Given the raw bytes of the values in a tuple, returns a tuple of those
+        that are numbers (as ints, or floats if they're not whole numbers).
+        """
+        numeric_values = []
+        for raw in raw_values.split(b","):
+            raw = raw.strip()
+            try:
+                if raw.lstrip(b"+-").replace(b"_", b"").isdigit():
+                    numeric_values.append(int(raw))
+                else:
+                    numeric_values.append(float(raw))
+            except ValueError:
+                # Not an int or float, so ignore this value.
+                continue
+        return tuple(numeric_values)
+
+    def parse_channels(self, raw_items):
+        """
+        Given the raw bytes of the items in a dict of named channels, returns
+        a tuple of the values of all the channels seen so far (in the order
+        they were first seen, after the time if there is one). Channels
+        missing from the dict keep their last value.
+        """
+        items = {}
+        for match in self.item_regex.finditer(raw_items):
+            value = self.parse_values(match.group(3))
+            if value:
+                items[match.group(2).decode("utf-8", "replace")] = value[0]
+        if "t" in items:
+            self.timestamp_channels = True
+        self.set_timestamps(self.timestamp_tuples or self.timestamp_channels)
+        for name in items:
+            if name != "t" and name not in self.channels:
+                if len(self.channels) < len(self.series):
+                    self.series[len(self.channels)].setName(name)
+                self.channels.append(name)
+                self.chart.legend().show()
+        if not items.keys() - {"t"}:
+            return ()
+        values = []
+        if self.timestamps:
+            values.append(items.get("t", self.times.latest(1)[0]))
+        for i, name in enumerate(self.channels):
+            if name in items:
+                values.append(items[name])
+            elif i < len(self.data):
+                values.append(self.data[i].latest(1)[0])
+            else:
+                values.append(0)
+        return tuple(values)
 
     def add_data(self, values):
         """
@@ -1668,8 +2414,39 @@ class PlotterPane(QChartView):
         series, add the data to the line series, update the range of the chart
         so the chart displays nicely.
         """
-        # Store incoming data to dump as CSV at the end of the session.
-        self.raw_data.append(values)
+        self.record_data(values)
+        self.data_recorded.emit([values])
+        self.request_redraw()
+
+    def request_redraw(self):
+        """
+        Redraw the chart now, or (if it was redrawn less than a frame ago)
+        at the end of the frame, however often data arrives.
+        """
+        if self.redraw_timer.isActive():
+            self.redraw_pending = True
+        else:
+            self.redraw()
+            self.redraw_timer.start()
+
+    def on_redraw_timer(self):
+        if self.redraw_pending:
+            self.redraw_pending = False
+            self.redraw()
+            self.redraw_timer.start()
+
+    def record_data(self, values):
+        """
+        Given a tuple of values, ensures there are the required number of line
+        series and adds the values to the data to be displayed, without
+        redrawing the chart.
+        """
+        # Store incoming data for history mode.
+        if self.raw_data is not None:
+            self.raw_data.append(values)
+        if self.timestamps:
+            self.times.append(values[0])
+            values = values[1:]
         # Check the number of incoming values.
         if len(values) != len(self.series):
             # Adjust the number of line series.
@@ -1679,32 +2456,115 @@ class PlotterPane(QChartView):
                 # Add new line series.
                 for i in range(value_len - series_len):
                     new_series = QLineSeries()
+                    new_series.setUseOpenGL(self.use_opengl)
+                    if len(self.series) < len(self.channels):
+                        new_series.setName(self.channels[len(self.series)])
                     self.chart.addSeries(new_series)
                     self.chart.setAxisX(self.axis_x, new_series)
                     self.chart.setAxisY(self.axis_y, new_series)
                     self.series.append(new_series)
-                    self.data.append(deque([0] * self.lookback))
+                    self.data.append(RingBuffer(self.lookback))
+                    if self.separate_axes:
+                        self.add_series_axis(new_series)
             else:
                 # Remove old line series.
                 for old_series in self.series[value_len:]:
                     self.chart.removeSeries(old_series)
+                for old_axis in self.series_axes[value_len:]:
+                    self.chart.removeAxis(old_axis)
                 self.series = self.series[:value_len]
+                self.series_axes = self.series_axes[:value_len]
                 self.data = self.data[:value_len]
 
-        # Add the incoming values to the data to be displayed, and compute
-        # max range.
-        max_ranges = []
-        min_ranges = []
+        # Add the incoming values to the data to be displayed.
         for i, value in enumerate(values):
-            self.data[i].appendleft(value)
-            max_ranges.append(max(self.data[i]))
-            min_ranges.append(min(self.data[i]))
-            if len(self.data[i]) > self.lookback:
-                self.data[i].pop()
-            self.num_datapoints = min(self.num_datapoints + 1, self.max_x)
-
-        # Re-scale y-axis.
-        max_y_range = max(max_ranges)
+            self.data[i].append(value)
+        self.num_datapoints = min(self.num_datapoints + 1, self.max_x)
+
+    def redraw(self):
+        """
+        Update the range of the chart so it displays nicely, and the line
+        series with the data.
+        """
+        if self.history_mode:
+            self.redraw_history()
+            return
+        if self.separate_axes:
+            for data, axis in zip(self.data, self.series_axes):
+                self.rescale_axis(axis, data.min(), data.max())
+        else:
+            max_ranges = [data.max() for data in self.data]
+            min_ranges = [data.min() for data in self.data]
+            self.scale_y(min(min_ranges), max(max_ranges))
+
+        # Plot against the time, if there is one, or the datapoint.
+        x_values = range(self.num_datapoints)
+        if self.timestamps and self.num_datapoints:
+            x_values = self.times.latest(self.num_datapoints)
+            self.axis_x.setRange(
+                x_values[0], max(x_values[-1], x_values[0] + 0.001)
+            )
+
+        # Update each line series with the data in a single call.
+        for i, line_series in enumerate(self.series):
+            values = self.data[i].latest(self.num_datapoints)
+            line_series.replace(self.line_points(x_values, values))
+
+    def line_points(self, x_values, y_values):
+        """
+        Return the points of a line through the given values. If there are
+        more than two for each pixel across the chart, they're decimated to
+        the minimum and maximum for each pixel.
+        """
+        buckets = int(self.chart.plotArea().width()) or self.width()
+        if len(y_values) <= 2 * buckets:
+            return [QPointF(x, y) for x, y in zip(x_values, y_values)]
+        points = []
+        step = len(y_values) / buckets
+        for bucket in range(buckets):
+            start = int(bucket * step)
+            values = y_values[start : int((bucket + 1) * step)]
+            points.append(QPointF(x_values[start], min(values)))
+            points.append(QPointF(x_values[start], max(values)))
+        return points
+
+    def redraw_history(self):
+        """
+        Update the line series with an envelope of the minimum and maximum
+        values for each pixel across the part of the session in view.
+        """
+        start, end = self.history_range()
+        buckets = int(self.chart.plotArea().width()) or self.width()
+        # The time, if there is one, is the first column of the data.
+        first_column = 1 if self.timestamps else 0
+        lows = []
+        highs = []
+        for i, line_series in enumerate(self.series):
+            points = []
+            low = math.inf
+            high = -math.inf
+            for x, minimum, maximum in self.raw_data.envelope(
+                first_column + i, start, end, buckets
+            ):
+                points.append(QPointF(x, minimum))
+                if maximum != minimum:
+                    points.append(QPointF(x, maximum))
+                low = min(low, minimum)
+                high = max(high, maximum)
+            line_series.replace(points)
+            lows.append(low)
+            highs.append(high)
+            if self.separate_axes and low <= high:
+                self.rescale_axis(self.series_axes[i], low, high)
+        if not self.separate_axes and min(lows) <= max(highs):
+            self.scale_y(min(lows), max(highs))
+        self.axis_x.setRange(start, max(end - 1, start + 1))
+
+    def scale_y(self, min_y_range, max_y_range):
+        """
+        Re-scale the y axis to fit data between the given minimum and
+        maximum.
+        """
         y_range = bisect.bisect_left(self.y_ranges, max_y_range)
         if y_range < len(self.y_ranges):
             self.max_y = self.y_ranges[y_range]
@@ -1713,7 +2573,6 @@ class PlotterPane(QChartView):
         elif max_y_range < self.max_y / 2:
             self.max_y = self.max_y / 2
 
-        min_y_range = min(min_ranges)
         y_range = bisect.bisect_left(self.y_ranges, abs(min_y_range))
         if y_range < len(self.y_ranges):
             self.min_y = -self.y_ranges[y_range]
@@ -1730,15 +2589,187 @@ class PlotterPane(QChartView):
         else:
             self.axis_y.setLabelFormat("%d")
 
-        # Update the line series with the data.
-        for i, line_series in enumerate(self.series):
-            line_series.clear()
-            xy_vals = []
-            for j in range(self.num_datapoints):
-                val = self.data[i][self.num_datapoints - 1 - j]
-                xy_vals.append((j, val))
-            for point in xy_vals:
-                line_series.append(*point)
+    def rescale_axis(self, axis, low, high):
+        """
+        Fit a series' own y axis to its data, between low and high. The axis
+        grows as soon as the data falls outside it, but only shrinks once the
+        data spans less than shrink_ratio of it (rather than changing with
+        every datapoint).
+        """
+        span = axis.max() - axis.min()
+        if (
+            low < axis.min()
+            or high > axis.max()
+            or high - low < span * self.shrink_ratio
+        ):
+            margin = (high - low) * self.axis_margin
+            margin = margin or abs(high) * self.axis_margin or 1
+            axis.setRange(low - margin, high + margin)
+            if high - low + 2 * margin <= 10:
+                axis.setLabelFormat("%2.2f")
+            else:
+                axis.setLabelFormat("%d")
+
+    def add_series_axis(self, series):
+        """
+        Give the series a y axis of its own, in the series' colour.
+        """
+        axis = QValueAxis()
+        color = series.pen().color()
+        axis.setLinePenColor(color)
+        axis.setLabelsColor(color)
+        alignment = (
+            Qt.AlignLeft if len(self.series_axes) % 2 else Qt.AlignRight
+        )
+        self.chart.addAxis(axis, alignment)
+        series.detachAxis(self.axis_y)
+        series.attachAxis(axis)
+        self.series_axes.append(axis)
+
+    def set_separate_axes(self, enabled):
+        """
+        Switch between each series having its own y axis, and all of them
+        sharing one.
+        """
+        if enabled == self.separate_axes:
+            return
+        self.separate_axes = enabled
+        if enabled:
+            for series in self.series:
+                self.add_series_axis(series)
+        else:
+            for series, axis in zip(self.series, self.series_axes):
+                series.detachAxis(axis)
+                self.chart.removeAxis(axis)
+                series.attachAxis(self.axis_y)
+            self.series_axes = []
+        self.axis_y.setVisible(not enabled)
+        self.redraw()
+
+    def set_timestamps(self, enabled):
+        """
+        Switch between plotting the data against time, and against the
+        number of the datapoint.
+        """
+        if enabled != self.timestamps:
+            self.timestamps = enabled
+            if not self.history_mode:
+                self.reset_x_axis()
+
+    def reset_x_axis(self):
+        """
+        Set up the x axis for the latest data, against time if the data is
+        timestamped.
+        """
+        if self.timestamps:
+            self.axis_x.setLabelFormat("%.2f")
+            self.axis_x.setTitleText(_("Time (seconds)"))
+        else:
+            self.axis_x.setRange(0, self.max_x)
+            self.axis_x.setLabelFormat("time")
+            self.axis_x.setTitleText("")
+
+    def history_range(self):
+        """
+        Return the (start, end) rows of the session in view in history mode.
+        """
+        total = len(self.raw_data)
+        span = total if self.view_span is None else self.view_span
+        end = total if self.view_end is None else min(self.view_end, total)
+        return max(0, end - span), end
+
+    def set_view(self, end, span):
+        """
+        Show span rows up to the given end row, in history mode. Showing the
+        latest row follows the data as it arrives.
+        """
+        total = len(self.raw_data)
+        if span >= total:
+            self.view_span = None
+        else:
+            self.view_span = max(self.min_view_span, span)
+        if end >= total:
+            self.view_end = None
+        else:
+            self.view_end = max(end, self.view_span or total)
+        self.request_redraw()
+
+    def set_history_mode(self, enabled):
+        """
+        Switch between plotting the whole session and the latest data.
+        """
+        self.history_mode = enabled
+        self.view_span = None
+        self.view_end = None
+        if enabled:
+            self.axis_x.setLabelFormat("%d")
+            self.axis_x.setTitleText("")
+        else:
+            self.reset_x_axis()
+        self.redraw()
+
+    def contextMenuEvent(self, event):
+        menu = QMenu(self)
+        axes_action = menu.addAction(_("Separate y axes"))
+        axes_action.setCheckable(True)
+        axes_action.setChecked(self.separate_axes)
+        history_action = None
+        whole_session_action = None
+        if self.raw_data is not None:
+            history_action = menu.addAction(_("Show history"))
+            history_action.setCheckable(True)
+            history_action.setChecked(self.history_mode)
+            if self.history_mode:
+                whole_session_action = menu.addAction(_("Show whole session"))
+        action = menu.exec_(self.mapToGlobal(event.pos()))
+        if action == axes_action:
+            self.set_separate_axes(not self.separate_axes)
+        elif action and action == history_action:
+            self.set_history_mode(not self.history_mode)
+        elif action and action == whole_session_action:
+            total = len(self.raw_data)
+            self.set_view(total, total)
+
+    def wheelEvent(self, event):
+        """
+        Zoom in or out around the mouse pointer, in history mode.
+        """
+        if not (self.history_mode and self.raw_data):
+            super().wheelEvent(event)
+            return
+        start, end = self.history_range()
+        span = end - start
+        area = self.chart.plotArea()
+        fraction = 1
+        if area.width():
+            fraction = (event.pos().x() - area.left()) / area.width()
+            fraction = min(1, max(0, fraction))
+        if event.angleDelta().y() > 0:
+            new_span = int(span * 0.8)
+        else:
+            new_span = int(span * 1.25) + 1
+        anchor = start + fraction * span
+        self.set_view(round(anchor + (1 - fraction) * new_span), new_span)
+
+    def mousePressEvent(self, event):
+        if self.history_mode and event.button() == Qt.LeftButton:
+            self.drag_start = (event.pos().x(), self.history_range())
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        """
+        Pan the session when dragged, in history mode.
+        """
+        if self.drag_start:
+            x, (start, end) = self.drag_start
+            width = self.chart.plotArea().width() or self.width()
+            shift = round((x - event.pos().x()) * (end - start) / width)
+            self.set_view(end + shift, end - start)
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        self.drag_start = None
+        super().mouseReleaseEvent(event)
 
     def set_theme(self, theme):
         """
@@ -798,6 +798,8 @@ class Editor(QObject):
         self.pa_token = ""
         self.pa_instance = "www"
         self.microbit_runtime = ""
+        self.microbit_flash_all = False
+        self.microbit_autoflash = False
         self.user_locale = ""  # user defined language locale
         self.connected_devices = DeviceList(self.modes, parent=self)
         self.current_device = None
@@ -934,6 +936,18 @@ class Editor(QObject):
             logger.info(
                 "Minify scripts on micro:bit? " "{}".format(self.minify)
             )
+        if "microbit_flash_all" in old_session:
+            self.microbit_flash_all = old_session["microbit_flash_all"]
+            logger.info(
+                "Flash all attached micro:bits? "
+                "{}".format(self.microbit_flash_all)
+            )
+        if "microbit_autoflash" in old_session:
+            self.microbit_autoflash = old_session["microbit_autoflash"]
+            logger.info(
+                "Flash micro:bit scripts when saved? "
+                "{}".format(self.microbit_autoflash)
+            )
         if "microbit_runtime" in old_session:
             self.microbit_runtime = old_session["microbit_runtime"]
             if self.microbit_runtime:
@@ -1423,6 +1437,8 @@ class Editor(QObject):
             "envars": self.envars,
             "minify": self.minify,
             "microbit_runtime": self.microbit_runtime,
+            "microbit_flash_all": self.microbit_flash_all,
+            "microbit_autoflash": self.microbit_autoflash,
             "zoom_level": self._view.zoom_position,
             "window": {
                 "x": self._view.x(),
@@ -1458,6 +1474,8 @@ class Editor(QObject):
             "envars": envars,
             "minify": self.minify,
             "microbit_runtime": self.microbit_runtime,
+            "microbit_flash_all": self.microbit_flash_all,
+            "microbit_autoflash": self.microbit_autoflash,
             "locale": self.user_locale,
             "pa_username": self.pa_username,
             "pa_token": self.pa_token,
@@ -1478,6 +1496,10 @@ class Editor(QObject):
                 self.envars = extract_envars(new_settings["envars"])
             if "minify" in new_settings:
                 self.minify = new_settings["minify"]
+            if "microbit_flash_all" in new_settings:
+                self.microbit_flash_all = new_settings["microbit_flash_all"]
+            if "microbit_autoflash" in new_settings:
+                self.microbit_autoflash = new_settings["microbit_autoflash"]
             if "microbit_runtime" in new_settings:
                 runtime = new_settings["microbit_runtime"].strip()
                 if runtime and not os.path.isfile(runtime):
@@ -20,13 +20,25 @@ import sys
 import os
 import os.path
 import csv
+import hashlib
 import time
 import logging
 import pkgutil
+import struct
+import threading
+from collections import deque
 from serial import Serial
 from PyQt5.QtSerialPort import QSerialPort, QSerialPortInfo
-from PyQt5.QtCore import QObject, pyqtSignal, QIODevice, QTimer
-from mu.logic import Device
+from PyQt5.QtCore import (
+    Qt,
+    QObject,
+    pyqtSignal,
+    pyqtSlot,
+    QIODevice,
+    QTimer,
+    QThread,
+)
+from mu.logic import Device, LOG_DIR
 from mu.contrib import microfs
 from .. import config, settings
 
@@ -35,6 +47,17 @@ EXIT_RAW_MODE = b"\x02"  # CTRL-B
 KEYBOARD_INTERRUPT = b"\x03"  # CTRL-C
 SOFT_REBOOT = b"\x04"  # CTRL-C
 
+# Session captures start with CAPTURE_MAGIC, followed by a record for each
+# chunk of data: a CAPTURE_RECORD header (seconds since recording started,
+# direction, length of the data) and then the data itself.
+CAPTURE_MAGIC = b"MUCAP1\n"
+CAPTURE_RECORD = struct.Struct("<dcI")
+CAPTURE_RECEIVED = b"<"  # Data received from the device.
+CAPTURE_SENT = b">"  # Data sent to the device.
+
+#: Default size (in MB) after which plotter data is written to a new file.
+DATA_CAPTURE_MAX_SIZE = 100
+
 
 logger = logging.getLogger(__name__)
 
@@ -45,10 +68,299 @@ MODULE_NAMES.add("sys")
 MODULE_NAMES.add("builtins")
 
 
+class SerialWorker(QObject):
+    """
+    Reads and writes the serial port of a REPLConnection in a dedicated
+    thread, so neither waits on (nor is held up by) painting and editing in
+    the GUI thread.
+
+    Data passes between the threads through a deque in each direction.
+    Appending to and popping from a deque are atomic, so neither thread
+    needs to take a lock.
+    """
+
+    # Emitted when data has been added to the (previously empty) incoming
+    # deque.
+    data_ready = pyqtSignal()
+
+    def __init__(self, serial):
+        super().__init__()
+        self.serial = serial
+        self.incoming = deque()
+        self.outgoing = deque()
+        self.signalled = False  # Whether data_ready is yet to be handled.
+
+    # The worker's methods are declared as slots so that signals are
+    # delivered to them in the worker's thread.
+
+    @pyqtSlot()
+    def on_start(self):
+        """
+        Called in the worker thread when it starts.
+        """
+        self.serial.readyRead.connect(self.on_read)
+
+    @pyqtSlot()
+    def on_read(self):
+        """
+        Called (in the worker thread) when data is ready to be read from the
+        device.
+        """
+        self.incoming.append(bytes(self.serial.readAll()))
+        if not self.signalled:
+            self.signalled = True
+            self.data_ready.emit()
+
+    @pyqtSlot()
+    def on_write(self):
+        """
+        Called (in the worker thread) to write any outgoing data to the
+        device, in the order it was written.
+        """
+        while self.outgoing:
+            self.serial.write(self.outgoing.popleft())
+
+    def read(self):
+        """
+        Returns (in the GUI thread) the list of chunks of data read so far.
+        """
+        self.signalled = False
+        chunks = []
+        while self.incoming:
+            chunks.append(self.incoming.popleft())
+        return chunks
+
+    @pyqtSlot()
+    def close(self):
+        """
+        Called (in the worker thread) to write any remaining data and close
+        the serial port.
+        """
+        self.on_write()
+        self.serial.close()
+
+
+def read_capture(path):
+    """
+    Yields (timestamp, direction, data) for each record in the session
+    capture at the given path. Raises ValueError if the file isn't a capture.
+    """
+    with open(path, "rb") as capture:
+        if capture.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError("Not a session capture: {}".format(path))
+        while True:
+            header = capture.read(CAPTURE_RECORD.size)
+            if len(header) < CAPTURE_RECORD.size:
+                return  # A truncated record means recording was cut short.
+            timestamp, direction, length = CAPTURE_RECORD.unpack(header)
+            data = capture.read(length)
+            if len(data) < length:
+                return
+            yield timestamp, direction, data
+
+
+class SessionRecorder:
+    """
+    Records the bytes passing through a REPLConnection, in both directions,
+    to a timestamped capture (see read_capture and SessionReplay).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(CAPTURE_MAGIC)
+        self._start = time.monotonic()
+        # Data may be written to the connection from any thread.
+        self._lock = threading.Lock()
+
+    def record(self, direction, data):
+        """
+        Append the data, sent in the given direction, to the capture.
+        """
+        with self._lock:
+            if self._file:
+                timestamp = time.monotonic() - self._start
+                self._file.write(
+                    CAPTURE_RECORD.pack(timestamp, direction, len(data))
+                )
+                self._file.write(data)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+class SessionReplay(QObject):
+    """
+    Stands in for a REPLConnection, playing back the data received in a
+    session capture so the REPL and plotter panes can be driven without a
+    device attached. Data written to it is ignored.
+    """
+
+    data_received = pyqtSignal(bytes)
+    connection_error = pyqtSignal(str)
+    # Emitted when all the captured data has been played back.
+    finished = pyqtSignal()
+
+    def __init__(self, path, speed=1.0):
+        """
+        The speed is relative to the original session (2.0 plays back twice
+        as fast). A speed of 0 plays the data back as fast as possible.
+        """
+        super().__init__()
+        self.port = path
+        self.baudrate = None
+        self.speed = speed
+        self.records = [
+            (timestamp, data)
+            for timestamp, direction, data in read_capture(path)
+            if direction == CAPTURE_RECEIVED
+        ]
+        self._index = 0
+        self._start = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.play)
+
+    def open(self):
+        """
+        Start playing back from the beginning of the capture.
+        """
+        self._index = 0
+        self._start = time.monotonic()
+        self.play()
+
+    def play(self):
+        """
+        Emit the data that's due (or, at full speed, all of it) and schedule
+        the next call for when more is due.
+        """
+        if self.speed:
+            elapsed = (time.monotonic() - self._start) * self.speed
+        else:
+            elapsed = float("inf")
+        while self._index < len(self.records):
+            timestamp, data = self.records[self._index]
+            if timestamp > elapsed:
+                delay = (timestamp - elapsed) / self.speed
+                self.timer.start(int(delay * 1000))
+                return
+            self._index += 1
+            self.data_received.emit(data)
+        self.finished.emit()
+
+    def close(self):
+        self.timer.stop()
+        self._index = len(self.records)
+
+    def write(self, data):
+        logger.debug("Replay ignored data written: {}".format(data))
+
+    def send_interrupt(self):
+        pass
+
+    def send_commands(self, commands):
+        pass
+
+
+class CSVRecorder(QObject):
+    """
+    Streams rows of plotter data to CSV files in a directory as they arrive,
+    so a session isn't lost if Mu stops unexpectedly.
+
+    Rows are written in batches, at least every flush_interval milliseconds.
+    A new file is started each day, and whenever the current file grows
+    beyond max_size bytes.
+    """
+
+    #: Milliseconds rows are gathered for before they're written.
+    flush_interval = 1000
+    #: Rows gathered after which they're written without waiting.
+    batch_size = 1000
+
+    def __init__(self, directory, max_size=None):
+        super().__init__()
+        self.directory = directory
+        self.max_size = max_size
+        self.path = None
+        self.file = None
+        self.day = None
+        self.pending = []
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.flush_interval)
+        self.flush_timer.timeout.connect(self.flush)
+        self.rotate()
+
+    def rotate(self):
+        """
+        Start writing to a new file named with the current time.
+        """
+        if self.file:
+            self.file.close()
+        self.day = time.strftime("%Y%m%d")
+        name = time.strftime("%Y%m%d-%H%M%S")
+        self.path = os.path.join(self.directory, "{}.csv".format(name))
+        suffix = 1
+        while os.path.exists(self.path):
+            filename = "{}-{}.csv".format(name, suffix)
+            self.path = os.path.join(self.directory, filename)
+            suffix += 1
+        logger.info("Writing plotter data to: {}".format(self.path))
+        self.file = open(self.path, "w", newline="")
+        self.writer = csv.writer(self.file)
+
+    def write_rows(self, rows):
+        """
+        Add the rows to be written with the next batch.
+        """
+        self.pending.extend(rows)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        """
+        Write any pending rows to the file (rotating it first if needed).
+        """
+        self.flush_timer.stop()
+        if not (self.pending and self.file):
+            return
+        if self.day != time.strftime("%Y%m%d") or (
+            self.max_size and self.file.tell() >= self.max_size
+        ):
+            self.rotate()
+        self.writer.writerows(self.pending)
+        self.pending = []
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
 class REPLConnection(QObject):
     serial = None
     data_received = pyqtSignal(bytes)
     connection_error = pyqtSignal(str)
+    # Emitted when there's data for the worker to write to the device.
+    write_requested = pyqtSignal()
+    # Emitted to have the worker close the serial port.
+    close_requested = pyqtSignal()
+
+    #: Whether the serial port is read and written in a worker thread.
+    threaded = True
+
+    #: Milliseconds to gather incoming data for before it's delivered (about
+    #: one display frame).
+    frame_interval = 16
+    #: Bytes gathered after which they're delivered without waiting.
+    flush_threshold = 4096
 
     def __init__(self, port, baudrate=115200):
         super().__init__()
@@ -57,6 +369,15 @@ class REPLConnection(QObject):
         self._baudrate = baudrate
         self.serial.setPortName(port)
         self.serial.setBaudRate(baudrate)
+        self._received = []  # Chunks of data not yet delivered.
+        self._received_size = 0
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.frame_interval)
+        self.flush_timer.timeout.connect(self.flush)
+        self.worker = None
+        self.worker_thread = None
+        self.recorder = None
 
     @property
     def port(self):
@@ -95,28 +416,125 @@ class REPLConnection(QObject):
             pyser.dtr = True
             pyser.close()
             self.serial.open(QIODevice.ReadWrite)
-        self.serial.readyRead.connect(self._on_serial_read)
+        if self.threaded:
+            self.start_worker()
+        else:
+            self.serial.readyRead.connect(self._on_serial_read)
+        if settings.settings.get("record_sessions", False):
+            filename = "session-{}.mucap".format(
+                time.strftime("%Y%m%d-%H%M%S")
+            )
+            self.start_recording(os.path.join(LOG_DIR, filename))
 
         logger.info("Connected to REPL on port: {}".format(self.port))
 
+    def start_recording(self, path):
+        """
+        Record the data sent to and received from the device to a session
+        capture at the given path.
+        """
+        self.stop_recording()
+        try:
+            self.recorder = SessionRecorder(path)
+            logger.info("Recording session to: {}".format(path))
+        except OSError as ex:
+            logger.error("Could not record session: {}".format(ex))
+
+    def stop_recording(self):
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    def start_worker(self):
+        """
+        Hand the open serial port over to a worker in its own thread.
+        """
+        self.worker = SerialWorker(self.serial)
+        self.worker_thread = QThread(self)
+        self.serial.moveToThread(self.worker_thread)
+        self.worker.moveToThread(self.worker_thread)
+        self.worker.data_ready.connect(self._on_serial_read)
+        self.write_requested.connect(self.worker.on_write)
+        self.close_requested.connect(
+            self.worker.close, Qt.BlockingQueuedConnection
+        )
+        self.worker_thread.started.connect(self.worker.on_start)
+        self.worker_thread.start()
+
     def close(self):
         """
         Close and clean up the currently open serial link.
         """
         logger.info("Closing connection to REPL on port: {}".format(self.port))
-        if self.serial:
+        if self.worker_thread:
+            if QThread.currentThread() is self.worker_thread:
+                # Waiting for the worker from its own thread would deadlock.
+                self.worker.close()
+                self.worker_thread.quit()
+            else:
+                self.close_requested.emit()
+                self.worker_thread.quit()
+                self.worker_thread.wait()
+            # Data read but not yet delivered is delivered by flush below.
+            self._received.extend(self.worker.read())
+            self.worker = None
+            self.worker_thread = None
+        elif self.serial:
             self.serial.close()
-            self.serial = None
+        self.flush()
+        self.stop_recording()
+        self.serial = None
 
     def _on_serial_read(self):
         """
-        Called when data is ready to be send from the device
+        Called when data is ready to be send from the device.
+        """
+        if self.worker:
+            chunks = self.worker.read()
+        else:
+            chunks = [bytes(self.serial.readAll())]
+        self.receive(chunks)
+
+    def receive(self, chunks):
+        """
+        Gather the chunks of data received from the device. They're delivered
+        at most once per frame (or as soon as there's more than
+        flush_threshold bytes of them) so subscribers aren't swamped by many
+        tiny fragments.
+        """
+        self._received.extend(chunks)
+        self._received_size += sum(len(chunk) for chunk in chunks)
+        if self._received_size >= self.flush_threshold:
+            self.flush()
+        elif not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        """
+        Deliver any gathered data to subscribers via the data_received
+        signal. All the subscribers share the same bytes object.
         """
-        data = bytes(self.serial.readAll())
-        self.data_received.emit(data)
+        self.flush_timer.stop()
+        if self._received:
+            data = b"".join(self._received)
+            self._received = []
+            self._received_size = 0
+            if self.recorder:
+                self.recorder.record(CAPTURE_RECEIVED, data)
+            self.data_received.emit(data)
 
     def write(self, data):
-        self.serial.write(data)
+        """
+        Write the data to the device. When threaded this is safe to call from
+        any thread, and data is written in the order it's given.
+        """
+        if self.recorder:
+            self.recorder.record(CAPTURE_SENT, data)
+        if self.worker:
+            self.worker.outgoing.append(data)
+            self.write_requested.emit()
+        else:
+            self.serial.write(data)
 
     def send_interrupt(self):
         self.write(EXIT_RAW_MODE)  # CTRL-B
@@ -124,10 +542,20 @@ class REPLConnection(QObject):
 
     def execute(self, commands):
         """
-        Execute a series of commands over a period of time (scheduling
-        remaining commands to be run in the next iteration of the event loop).
-        """
-        if commands:
+        Execute a series of commands. When threaded, they're all handed to
+        the worker to write in one go. Otherwise they're sent over a period
+        of time (scheduling remaining commands to be run in the next
+        iteration of the event loop).
+        """
+        if self.worker:
+            for command in commands:
+                logger.info("Sending command {}".format(command))
+                if self.recorder:
+                    self.recorder.record(CAPTURE_SENT, command)
+            if commands:
+                self.worker.outgoing.extend(commands)
+                self.write_requested.emit()
+        elif commands:
             command = commands[0]
             logger.info("Sending command {}".format(command))
             self.write(command)
@@ -170,6 +598,7 @@ class BaseMode(QObject):
     icon = "help"
     repl = False
     plotter = False
+    plotter_recorder = None  #: Streams plotter data to CSV files.
     is_debugger = False
     has_debugger = False
     save_timeout = 5  #: Number of seconds to wait before saving work.
@@ -281,6 +710,36 @@ class BaseMode(QObject):
         """
         return NotImplemented
 
+    def data_capture_dir(self):
+        """
+        Return the directory called 'data_capture' in the workspace directory
+        where plotter data is saved, creating it if needed.
+        """
+        data_dir = os.path.join(self.workspace_dir(), "data_capture")
+        if not os.path.exists(data_dir):
+            logger.debug("Creating directory: {}".format(data_dir))
+            os.makedirs(data_dir)
+        return data_dir
+
+    def record_plotter_data(self):
+        """
+        Stream the data captured by the newly added plotter to CSV files in
+        the data capture directory as it arrives.
+        """
+        max_size = settings.settings.get(
+            "data_capture_max_size", DATA_CAPTURE_MAX_SIZE
+        )
+        try:
+            self.plotter_recorder = CSVRecorder(
+                self.data_capture_dir(), int(max_size * 1024 * 1024)
+            )
+        except OSError as ex:
+            logger.error("Could not record plotter data: {}".format(ex))
+            return
+        self.view.plotter_pane.data_recorded.connect(
+            self.plotter_recorder.write_rows
+        )
+
     def write_plotter_data_to_csv(self, csv_filepath):
         """Write any plotter data out to a CSV file when the
         plotter is closed
@@ -293,47 +752,24 @@ class BaseMode(QObject):
         """
         If there's an active plotter, hide it.
 
-        Save any data captured while the plotter was active into a directory
-        called 'data_capture' in the workspace directory. The file contains
-        CSV data and is named with a timestamp for easy identification.
-        """
-        # Save the raw data as CSV
-        data_dir = os.path.join(self.workspace_dir(), "data_capture")
-        if not os.path.exists(data_dir):
-            logger.debug("Creating directory: {}".format(data_dir))
-            os.makedirs(data_dir)
-        filename = "{}.csv".format(time.strftime("%Y%m%d-%H%M%S"))
-        filepath = os.path.join(data_dir, filename)
-        self.write_plotter_data_to_csv(filepath)
+        The data captured while the plotter was active is saved in a directory
+        called 'data_capture' in the workspace directory. The files contain
+        CSV data and are named with a timestamp for easy identification.
+        """
+        if self.plotter_recorder:
+            # The data has been streamed to CSV as it arrived.
+            self.plotter_recorder.close()
+            self.plotter_recorder = None
+        elif self.view.plotter_pane.raw_data is not None:
+            # Save the raw data as CSV
+            filename = "{}.csv".format(time.strftime("%Y%m%d-%H%M%S"))
+            filepath = os.path.join(self.data_capture_dir(), filename)
+            self.write_plotter_data_to_csv(filepath)
         self.view.remove_plotter()
         self.plotter = False
         logger.info("Removing plotter")
         self.return_focus_to_current_tab()
 
-    def on_data_flood(self):
-        """
-        Handle when the plotter is being flooded by data (which usually causes
-        Mu to become unresponsive). In this case, remove the plotter and
-        display a warning dialog to explain what's happened and how to fix
-        things (usually, put a time.sleep(x) into the code generating the
-        data).
-        """
-        logger.error("Plotting data flood detected.")
-        self.view.remove_plotter()
-        self.plotter = False
-        msg = _("Data Flood Detected!")
-        info = _(
-            "The plotter is flooded with data which will make Mu "
-            "unresponsive and freeze. As a safeguard, the plotter has "
-            "been stopped.\n\n"
-            "Flooding is when chunks of data of more than 1024 bytes are "
-            "repeatedly sent to the plotter.\n\n"
-            "To fix this, make sure your code prints small tuples of "
-            "data between calls to 'sleep' for a very short period of "
-            "time."
-        )
-        self.view.show_message(msg, info)
-
     def open_file(self, path):
         """
         Some files are not plain text and each mode can attempt to decode them.
@@ -472,6 +908,18 @@ class MicroPythonMode(BaseMode):
             self.add_repl()
             logger.info("Toggle REPL on.")
 
+    def stop(self):
+        """
+        Close any connection to the device (and its worker thread) when the
+        editor quits, then write out any plotter data still being gathered.
+        """
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+        if self.plotter_recorder:
+            self.plotter_recorder.close()
+            self.plotter_recorder = None
+
     def remove_repl(self):
         """
         If there's an active REPL, disconnect and hide it.
@@ -546,9 +994,8 @@ class MicroPythonMode(BaseMode):
                         device.port, self.baudrate
                     )
                     self.connection.open()
-                self.view.add_micropython_plotter(
-                    self.name, self.connection, self.on_data_flood
-                )
+                self.view.add_micropython_plotter(self.name, self.connection)
+                self.record_plotter_data()
                 logger.info("Started plotter")
                 self.plotter = True
             except IOError as ex:
@@ -573,13 +1020,6 @@ class MicroPythonMode(BaseMode):
             )
             self.view.show_message(message, information)
 
-    def on_data_flood(self):
-        """
-        Ensure the REPL is stopped if there is data flooding of the plotter.
-        """
-        self.remove_repl()
-        super().on_data_flood()
-
     def remove_plotter(self):
         """
         Remove plotter pane. Disconnects serial connection to device.
@@ -634,6 +1074,9 @@ class FileManager(QObject):
     on_list_files = pyqtSignal(tuple)
     # Emitted when the file with referenced filename is got from the device.
     on_get_file = pyqtSignal(str)
+    # Emitted with the filename, bytes received and size of the file while
+    # it's being got from the device.
+    on_get_progress = pyqtSignal(str, int, int)
     # Emitted when the file with referenced filename is put onto the device.
     on_put_file = pyqtSignal(str)
     # Emitted when the file with referenced filename is deleted from the
@@ -647,6 +1090,17 @@ class FileManager(QObject):
     on_put_fail = pyqtSignal(str)
     # Emitted when the referenced file fails to be deleted from the device.
     on_delete_fail = pyqtSignal(str)
+    # Emitted with the name of each file transferred as part of a batch.
+    on_transfer_file = pyqtSignal(str)
+    # Emitted with the bytes transferred so far, the total bytes and the
+    # bytes per second while a batch of files is transferred.
+    on_transfer_progress = pyqtSignal(int, int, float)
+    # Emitted with the number of changed files, and the total number of
+    # files, when syncing files onto the device.
+    on_sync_files = pyqtSignal(int, int)
+
+    #: Milliseconds without operations before the raw REPL session ends.
+    session_timeout = 1000
 
     def __init__(self, port):
         """
@@ -654,12 +1108,18 @@ class FileManager(QObject):
         """
         super().__init__()
         self.port = port
+        self.session_timer = None
 
     def on_start(self):
         """
         Run when the thread containing this object's instance is started so
         it can emit the list of files found on the connected device.
         """
+        # The timer must be created in the thread it's used in.
+        self.session_timer = QTimer()
+        self.session_timer.setSingleShot(True)
+        self.session_timer.setInterval(self.session_timeout)
+        self.session_timer.timeout.connect(self.end_session)
         # Create a new serial connection.
         try:
             self.serial = Serial(
@@ -673,17 +1133,56 @@ class FileManager(QObject):
             logger.exception(ex)
             self.on_list_fail.emit()
 
+    def start_session(self):
+        """
+        Keep the device in raw mode for a batch of operations, rather than
+        entering raw mode (and soft rebooting) for each of them.
+        """
+        if self.session_timer:
+            self.session_timer.stop()
+        microfs.start_session(self.serial)
+
+    def end_session_later(self):
+        """
+        End the raw REPL session once there are no further operations for a
+        while.
+        """
+        if self.session_timer:
+            self.session_timer.start()
+
+    def end_session(self):
+        """
+        Take the device out of raw mode, ending the session.
+        """
+        try:
+            microfs.end_session(self.serial)
+        except Exception as ex:
+            logger.error(ex)
+
+    def reset_session(self):
+        """
+        Called when an operation fails, so the next one doesn't rely on the
+        device being left in raw mode, or trip over output left from it.
+        """
+        try:
+            microfs.reset_session(self.serial)
+        except Exception as ex:
+            logger.error(ex)
+
     def ls(self):
         """
-        List the files on the micro:bit. Emit the resulting tuple of filenames
-        or emit a failure signal.
+        List the files (recursively) on the device. Emit the resulting tuple
+        of (path, is_directory, size) entries or emit a failure signal.
         """
         try:
-            result = tuple(microfs.ls(self.serial))
+            self.start_session()
+            result = tuple(microfs.ls_tree(self.serial))
             self.on_list_files.emit(result)
         except Exception as ex:
             logger.exception(ex)
+            self.reset_session()
             self.on_list_fail.emit()
+        self.end_session_later()
 
     def get(self, device_filename, local_filename):
         """
@@ -691,12 +1190,24 @@ class FileManager(QObject):
         filename. Emit the name of the filename when complete or emit a
         failure signal.
         """
+
+        def progress(received, size):
+            self.on_get_progress.emit(device_filename, received, size)
+
         try:
-            microfs.get(device_filename, local_filename, serial=self.serial)
+            self.start_session()
+            microfs.get(
+                device_filename,
+                local_filename,
+                serial=self.serial,
+                callback=progress,
+            )
             self.on_get_file.emit(device_filename)
         except Exception as ex:
             logger.error(ex)
+            self.reset_session()
             self.on_get_fail.emit(device_filename)
+        self.end_session_later()
 
     def put(self, local_filename, target=None):
         """
@@ -705,11 +1216,14 @@ class FileManager(QObject):
         a failure signal.
         """
         try:
+            self.start_session()
             microfs.put(local_filename, target=target, serial=self.serial)
-            self.on_put_file.emit(os.path.basename(local_filename))
+            self.on_put_file.emit(target or os.path.basename(local_filename))
         except Exception as ex:
             logger.error(ex)
+            self.reset_session()
             self.on_put_fail.emit(local_filename)
+        self.end_session_later()
 
     def delete(self, device_filename):
         """
@@ -717,8 +1231,124 @@ class FileManager(QObject):
         of the file when complete, or emit a failure signal.
         """
         try:
+            self.start_session()
             microfs.rm(device_filename, serial=self.serial)
             self.on_delete_file.emit(device_filename)
         except Exception as ex:
             logger.error(ex)
+            self.reset_session()
             self.on_delete_fail.emit(device_filename)
+        self.end_session_later()
+
+    def put_files(self, files):
+        """
+        Put a batch of local files onto the device, in a single session,
+        given a list of (local_filename, target) pairs. Emit the name of each
+        file on the device when complete, or a failure signal, and the
+        progress of the whole batch. The files on the device are listed once
+        at the end.
+        """
+        sizes = [self.local_size(local) for local, _ in files]
+        total = sum(sizes)
+        done = 0
+        started = time.monotonic()
+        for (local_filename, target), size in zip(files, sizes):
+            try:
+                self.start_session()
+                microfs.put(local_filename, target=target, serial=self.serial)
+                self.on_transfer_file.emit(
+                    target or os.path.basename(local_filename)
+                )
+            except Exception as ex:
+                logger.error(ex)
+                self.reset_session()
+                self.on_put_fail.emit(local_filename)
+            done += size
+            self.transfer_progress(done, total, started)
+        self.ls()
+
+    def get_files(self, files):
+        """
+        Get a batch of files from the device, in a single session, given a
+        list of (device_filename, local_filename) pairs. Emit the name of
+        each file when complete, or a failure signal, and the progress of
+        the whole batch. The files are listed once at the end.
+        """
+        done = 0
+        started = time.monotonic()
+        for device_filename, local_filename in files:
+
+            def progress(received, size):
+                # The size of the files still to get isn't known yet.
+                self.transfer_progress(done + received, done + size, started)
+
+            try:
+                self.start_session()
+                microfs.get(
+                    device_filename,
+                    local_filename,
+                    serial=self.serial,
+                    callback=progress,
+                )
+                self.on_transfer_file.emit(device_filename)
+            except Exception as ex:
+                logger.error(ex)
+                self.reset_session()
+                self.on_get_fail.emit(device_filename)
+            done += self.local_size(local_filename)
+        self.ls()
+
+    def sync_files(self, files):
+        """
+        Put the local files that aren't already on the device onto it, given
+        a list of (local_filename, target) pairs. The files are hashed on the
+        device so only the files that changed are transferred. Local files
+        that can't be read are always put, so the failure is reported.
+        """
+        try:
+            self.start_session()
+            device_hashes = microfs.hashes(
+                [target for _, target in files], serial=self.serial
+            )
+        except Exception as ex:
+            # The files can't be hashed on the device, so send them all.
+            logger.error(ex)
+            self.reset_session()
+            device_hashes = {}
+        changed = []
+        for local_filename, target in files:
+            local_hash = self.local_hash(local_filename)
+            if local_hash is None or local_hash != device_hashes.get(target):
+                changed.append((local_filename, target))
+        self.on_sync_files.emit(len(changed), len(files))
+        self.put_files(changed)
+
+    def transfer_progress(self, done, total, started):
+        """
+        Emit the progress of a batch of transfers started at the given time
+        (from time.monotonic).
+        """
+        elapsed = max(time.monotonic() - started, 0.001)
+        self.on_transfer_progress.emit(done, total, done / elapsed)
+
+    @staticmethod
+    def local_hash(filename):
+        """
+        Returns the SHA-256 hex digest of the local file, or None if it
+        can't be read.
+        """
+        try:
+            with open(filename, "rb") as local:
+                return hashlib.sha256(local.read()).hexdigest()
+        except OSError:
+            return None
+
+    @staticmethod
+    def local_size(filename):
+        """
+        Returns the size of the local file, or 0 if it can't be found.
+        """
+        try:
+            return os.path.getsize(filename)
+        except OSError:
+            return 0
@@ -278,14 +278,6 @@ class ESPMode(MicroPythonMode):
         self.file_manager_thread = None
         self.fs = None
 
-    def on_data_flood(self):
-        """
-        Ensure the Files button is active before the REPL is killed off when
-        a data flood of the plotter is detected.
-        """
-        self.set_buttons(files=True)
-        super().on_data_flood()
-
     def deactivate(self):
         """
         Invoked whenever the mode is deactivated.
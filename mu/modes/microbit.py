@@ -18,6 +18,7 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 import os
+import hashlib
 import logging
 import time
 from tokenize import TokenError
@@ -50,13 +51,18 @@ class DeviceFlasher(QThread):
 
     # Emitted when flashing the micro:bit fails for any reason.
     on_flash_fail = pyqtSignal(str)
+    # Emitted with the path of each micro:bit once it has been flashed.
+    on_device_flashed = pyqtSignal(str)
+    # Emitted with the path and error of each micro:bit that failed.
+    on_device_fail = pyqtSignal(str, str)
 
     def __init__(
         self, path_to_microbit, python_script=None, path_to_runtime=None
     ):
         """
         The path_to_microbit should be a filesystem path to an attached
-        micro:bit to flash. The python_script should be the text of
+        micro:bit to flash, or a list of them to flash several micro:bits at
+        the same time. The python_script should be the text of
         the script to flash onto the device. The path_to_runtime should be the
         path of the hex file for the MicroPython runtime to use. If the
         path_to_runtime is None, the default MicroPython runtime is used by
@@ -67,12 +73,33 @@ class DeviceFlasher(QThread):
         self.python_script = python_script
         self.path_to_runtime = path_to_runtime
 
+    @property
+    def paths_to_microbits(self):
+        """
+        The list of paths to the micro:bits to flash.
+        """
+        if isinstance(self.path_to_microbit, (list, tuple)):
+            return list(self.path_to_microbit)
+        return [self.path_to_microbit]
+
+    def device_done(self, hex_path, error):
+        """
+        Called (from the flashing threads) as each micro:bit is flashed, to
+        report its progress via the per-device signals.
+        """
+        path = os.path.dirname(hex_path)
+        if error is None:
+            self.on_device_flashed.emit(path)
+        else:
+            self.on_device_fail.emit(path, str(error))
+
     def run(self):
         """
         Flash the device.
         If we are sending a custom hex we need to manually read it and copy it
         into the micro:bit drive otherwise use uFlash.
         """
+        paths = self.paths_to_microbits
         try:
             if self.path_to_runtime:
                 if self.python_script:
@@ -81,16 +108,39 @@ class DeviceFlasher(QThread):
                     )
                 with open(self.path_to_runtime, "rb") as f_input:
                     rt_bytes = f_input.read()
-                with open(
-                    os.path.join(self.path_to_microbit, "micropython.hex"),
-                    "wb",
-                ) as f_output:
-                    f_output.write(rt_bytes)
-                    f_output.flush()
-                    os.fsync(f_output.fileno())
+                if len(paths) > 1:
+                    hex_paths = [
+                        os.path.join(path, "micropython.hex") for path in paths
+                    ]
+                    failures = uflash.save_hexes(
+                        rt_bytes.decode("ascii"),
+                        hex_paths,
+                        callback=self.device_done,
+                    )
+                    if failures:
+                        raise IOError(
+                            "Unable to flash {} micro:bit(s).".format(
+                                len(failures)
+                            )
+                        )
+                else:
+                    with open(
+                        os.path.join(paths[0], "micropython.hex"),
+                        "wb",
+                    ) as f_output:
+                        f_output.write(rt_bytes)
+                        f_output.flush()
+                        os.fsync(f_output.fileno())
+            elif len(paths) > 1:
+                uflash.flash(
+                    paths_to_microbits=paths,
+                    python_script=self.python_script,
+                    parallel=min(len(paths), uflash._PARALLEL_FLASH_WORKERS),
+                    callback=self.device_done,
+                )
             else:
                 uflash.flash(
-                    paths_to_microbits=[self.path_to_microbit],
+                    paths_to_microbits=paths,
                     python_script=self.python_script,
                 )
             # After flash ends DAPLink reboots the MSD, and serial might not
@@ -103,6 +153,36 @@ class DeviceFlasher(QThread):
             self.on_flash_fail.emit(str(ex))
 
 
+class AutoFlashWatcher(QThread):
+    """
+    Used to watch the file of a tab for changes in a non-blocking manner, so
+    it can be flashed again whenever it is saved.
+    """
+
+    # Emitted with the path of the file when its content has changed.
+    on_file_changed = pyqtSignal(str)
+
+    def __init__(self, path, parent=None):
+        QThread.__init__(self, parent)
+        self.path = path
+
+    def run(self):
+        """
+        Wait for changes until the thread is asked to stop.
+        """
+        try:
+            watcher = uflash.FileWatcher(self.path)
+        except Exception as ex:
+            logger.error(ex)
+            return
+        try:
+            while not self.isInterruptionRequested():
+                if watcher.wait(0.5):
+                    self.on_file_changed.emit(self.path)
+        finally:
+            watcher.close()
+
+
 class MicrobitMode(MicroPythonMode):
     """
     Represents the functionality required by the micro:bit mode.
@@ -114,6 +194,12 @@ class MicrobitMode(MicroPythonMode):
     icon = "microbit"
     fs = None  #: Reference to filesystem navigator.
     flash_thread = None
+    autoflash_thread = None  #: Watches the flashed file when auto-flashing.
+    #: Milliseconds to wait for the auto-flash watcher to stop, before leaving
+    #: it to finish in the background.
+    autoflash_stop_timeout = 100
+    #: (serial_number, runtime_hash, script) being flashed by flash_thread.
+    flash_record = None
     file_extensions = ["hex"]
 
     # Device name should only be supplied for modes
@@ -127,6 +213,16 @@ class MicrobitMode(MicroPythonMode):
 
     python_script = ""
 
+    def __init__(self, editor, view):
+        super().__init__(editor, view)
+        #: Serial number -> what Mu flashed onto that micro:bit since it was
+        #: connected (see record_flashed).
+        self.flashed = {}
+        # A micro:bit that's been unplugged may have been flashed elsewhere.
+        devices = editor.connected_devices
+        devices.device_connected.connect(self.forget_device)
+        devices.device_disconnected.connect(self.forget_device)
+
     def actions(self):
         """
         Return an ordered list of actions provided by this module. An action
@@ -237,6 +333,30 @@ class MicrobitMode(MicroPythonMode):
             logger.info("Board ID: 0x{:x}".format(board_id))
         return path_to_microbit, port, board_id
 
+    def get_device_main_size(self):
+        """
+        Returns the size of main.py on the micro:bit, or -1 if there's none.
+        Errors bubble up, so caller must catch them.
+        """
+        command = "\n".join(
+            [
+                "import os",
+                "def s(n):",
+                " try:",
+                "  return os.size(n)",
+                " except AttributeError:",
+                "  return os.stat(n)[6]",
+                "try:",
+                " print(s('main.py'))",
+                "except OSError:",
+                " print(-1)",
+            ]
+        )
+        out, err = microfs.execute([command])
+        if err:
+            raise IOError(microfs.clean_error(err))
+        return int(out.decode("utf-8").strip())
+
     def get_device_micropython_version(self):
         """
         Retrieves the MicroPython version from a micro:bit board.
@@ -271,11 +391,16 @@ class MicrobitMode(MicroPythonMode):
         cases. Ergo, it's a target for refactoring.
         """
         logger.info("Preparing to flash script.")
+        self.flash_record = None
         # The first thing to do is check the tab and script are valid.
         tab = self.view.current_tab
         if tab is None:
             # There is no active text editor. Exit.
             return
+        if tab.path and self.editor.microbit_autoflash:
+            self.start_autoflash(tab.path)
+        else:
+            self.stop_autoflash()
         python_script = tab.text().encode("utf-8")
         logger.debug("Python script from '{}' tab:".format(tab.label))
         logger.debug(python_script)
@@ -344,37 +469,77 @@ class MicrobitMode(MicroPythonMode):
                 return
             # If the user has specified a bespoke runtime hex file assume they
             # know what they're doing, always flash it, and hope for the best.
+            self.forget_flashed(self.editor.current_device.serial_number)
             self.flash_and_send(python_script, path_to_microbit, rt_hex_path)
             return
         else:
             self.editor.microbit_runtime = ""
+        # In a classroom many micro:bits can be attached at once, so flash
+        # the script onto all of them at the same time. (A custom runtime,
+        # above, is only flashed onto the current micro:bit, since the script
+        # is then sent over its serial port.) Mu's runtime is always flashed
+        # with the script in its filesystem, so there's no need to check the
+        # version of MicroPython on each of them, only that they're supported.
+        if self.editor.microbit_flash_all and not user_defined_microbit_path:
+            paths_to_microbits = uflash.find_microbits()
+            if len(paths_to_microbits) > 1:
+                board_ids = [
+                    int(device.serial_number[:4], 16)
+                    for device in self.editor.connected_devices
+                    if device.short_mode_name == self.short_name
+                ]
+                if any(i not in self.valid_board_ids for i in board_ids):
+                    self.show_unsupported_microbit()
+                    return
+                self.flash_attached(python_script, paths_to_microbits)
+                return
         # Old hex-attach flash method when there's no port (likely Windows<8.1
         # and/or old DAPLink), or when user has selected a PC location.
         if not port or user_defined_microbit_path:
             self.flash_attached(python_script, path_to_microbit)
             return
 
-        # Get the version of MicroPython on the device.
-        logger.info("Checking target device.")
+        # A record of what Mu last flashed onto this device avoids having
+        # to check its version (and maybe reflash it) over again. The device
+        # is still asked how big its main.py is, to be sure it's running
+        # MicroPython and to spot a script that's been replaced since.
+        serial_number = self.editor.current_device.serial_number
+        runtime_hash = uflash.get_runtime_image().digest
         update_micropython = False
-        try:
-            board_version = self.get_device_micropython_version()
-            # MicroPython for micro:bit V2 version starts at 2.x.x.
-            if semver.parse(board_version)["major"] < 2:
-                uflash_version = uflash.MICROPYTHON_V1_VERSION
-            else:
-                uflash_version = uflash.MICROPYTHON_V2_VERSION
-            logger.info("Mu MicroPython: {}".format(uflash_version))
-            # If there's an older version of MicroPython on the device,
-            # update it with the one packaged with Mu.
-            if semver.compare(board_version, uflash_version) < 0:
-                logger.info("Board MicroPython is older than Mu's MicroPython")
+        runtime_flashed = self.is_runtime_flashed(serial_number, runtime_hash)
+        main_size = None
+        if runtime_flashed:
+            try:
+                main_size = self.get_device_main_size()
+            except Exception as ex:
+                logger.warning("Could not check the device: {}".format(ex))
+                self.forget_flashed(serial_number)
+                runtime_flashed = False
+        if runtime_flashed:
+            logger.info("Device already has Mu's MicroPython runtime.")
+        else:
+            # Get the version of MicroPython on the device.
+            logger.info("Checking target device.")
+            try:
+                board_version = self.get_device_micropython_version()
+                # MicroPython for micro:bit V2 version starts at 2.x.x.
+                if semver.parse(board_version)["major"] < 2:
+                    uflash_version = uflash.MICROPYTHON_V1_VERSION
+                else:
+                    uflash_version = uflash.MICROPYTHON_V2_VERSION
+                logger.info("Mu MicroPython: {}".format(uflash_version))
+                # If there's an older version of MicroPython on the device,
+                # update it with the one packaged with Mu.
+                if semver.compare(board_version, uflash_version) < 0:
+                    logger.info(
+                        "Board MicroPython is older than Mu's MicroPython"
+                    )
+                    update_micropython = True
+            except Exception:
+                # Could not get version of MicroPython. This means either the
+                # device has a really old version or running something else.
+                logger.warning("Could not detect version of MicroPython.")
                 update_micropython = True
-        except Exception:
-            # Could not get version of MicroPython. This means either the
-            # device has a really old version or running something else.
-            logger.warning("Could not detect version of MicroPython.")
-            update_micropython = True
 
         if not python_script.strip():
             logger.info("Python script empty. Forcing flash.")
@@ -384,17 +549,23 @@ class MicrobitMode(MicroPythonMode):
             if board_id in self.valid_board_ids:
                 # The connected board has a serial number that indicates the
                 # MicroPython hex bundled with Mu supports it, so flash it.
+                self.flash_record = (serial_number, runtime_hash, b"")
                 self.flash_and_send(python_script, path_to_microbit)
                 return
             else:
-                message = _("Unsupported BBC micro:bit.")
-                information = _(
-                    "Your device is newer than this version of Mu. Please "
-                    "update Mu to the latest version to support this device."
-                    "\n\nhttps://codewith.mu/"
-                )
-                self.view.show_message(message, information)
+                self.show_unsupported_microbit()
                 return
+        elif main_size == len(python_script) and self.is_script_flashed(
+            serial_number, runtime_hash, python_script
+        ):
+            # The script hasn't changed since it was last flashed, so just
+            # restart it.
+            logger.info("Device already has this script as main.py.")
+            try:
+                self.reset_device()
+            except Exception as ex:
+                self.forget_flashed(serial_number)
+                self.flash_failed(ex)
         else:
             self.set_buttons(
                 flash=False, repl=False, files=False, plotter=False
@@ -408,12 +579,32 @@ class MicrobitMode(MicroPythonMode):
                 logger.warning("Could not copy file to device.")
                 logger.error(ioex)
                 logger.info("Falling back to old-style flashing.")
+                self.flash_record = (
+                    serial_number,
+                    runtime_hash,
+                    python_script,
+                )
                 self.flash_attached(python_script, path_to_microbit)
                 return
             except Exception as ex:
+                self.forget_flashed(serial_number)
                 self.flash_failed(ex)
+            else:
+                self.record_flashed(serial_number, runtime_hash, python_script)
             self.set_buttons(flash=True, repl=True, files=True, plotter=True)
 
+    def show_unsupported_microbit(self):
+        """
+        Tell the user their micro:bit is too new for this version of Mu.
+        """
+        message = _("Unsupported BBC micro:bit.")
+        information = _(
+            "Your device is newer than this version of Mu. Please "
+            "update Mu to the latest version to support this device."
+            "\n\nhttps://codewith.mu/"
+        )
+        self.view.show_message(message, information)
+
     def flash_and_send(self, script, microbit_path, rt_path=None):
         """
         Start the MicroPython hex flashing process in a new thread with a
@@ -449,8 +640,29 @@ class MicrobitMode(MicroPythonMode):
         self.flash_thread = DeviceFlasher(microbit_path, script)
         self.flash_thread.finished.connect(self.flash_finished)
         self.flash_thread.on_flash_fail.connect(self.flash_failed)
+        self.flash_thread.on_device_flashed.connect(self.device_flashed)
+        self.flash_thread.on_device_fail.connect(self.device_flash_failed)
         self.flash_thread.start()
 
+    def device_flashed(self, path):
+        """
+        Called as each micro:bit is flashed when flashing several at once.
+        """
+        logger.info("Flashed micro:bit at: {}".format(path))
+        self.editor.show_status_message(
+            _("Flashed the micro:bit at {}").format(path), 10
+        )
+
+    def device_flash_failed(self, path, error):
+        """
+        Called for each micro:bit that could not be flashed when flashing
+        several at once.
+        """
+        logger.error("Could not flash micro:bit at {}: {}".format(path, error))
+        self.editor.show_status_message(
+            _("Could not flash the micro:bit at {}").format(path), 10
+        )
+
     def flash_finished(self):
         """
         Called when the thread used to flash the micro:bit has finished.
@@ -458,11 +670,19 @@ class MicrobitMode(MicroPythonMode):
         self.editor.show_status_message(_("Finished flashing."))
         logger.info("Flashing successful.")
         self.flash_thread = None
+        flash_record, self.flash_record = self.flash_record, None
+        if flash_record:
+            self.record_flashed(*flash_record)
         if self.python_script:
             try:
                 self.copy_main(self.python_script)
             except Exception as ex:
                 self.flash_failed(ex)
+            else:
+                if flash_record:
+                    self.record_flashed(
+                        flash_record[0], flash_record[1], self.python_script
+                    )
         self.set_buttons(flash=True, repl=True, files=True, plotter=True)
 
     def copy_main(self, script):
@@ -489,6 +709,20 @@ class MicrobitMode(MicroPythonMode):
             serial.write(b"microbit.reset()\r\n")
             self.editor.show_status_message(_("Copied code onto micro:bit."))
 
+    def reset_device(self):
+        """
+        Restart the connected micro:bit (and so its main.py) without copying
+        anything onto it.
+        """
+        serial = microfs.get_serial()
+        serial.write(b"\x03\x03")  # Stop whatever's running.
+        serial.write(b"import microbit\r\n")
+        serial.write(b"microbit.reset()\r\n")
+        serial.close()
+        self.editor.show_status_message(
+            _("The micro:bit already has this code, so it was restarted.")
+        )
+
     def flash_failed(self, error):
         """
         Called when the thread used to flash the micro:bit encounters a
@@ -504,6 +738,95 @@ class MicrobitMode(MicroPythonMode):
         self.view.show_message(message, information, "Warning")
         self.set_buttons(flash=True, repl=True, files=True, plotter=True)
         self.flash_thread = None
+        if self.flash_record:
+            # Whatever is on the device now, it's not what was recorded.
+            self.forget_flashed(self.flash_record[0])
+            self.flash_record = None
+
+    def is_runtime_flashed(self, serial_number, runtime_hash):
+        """
+        Returns True if Mu last flashed the runtime with the given hash onto
+        the micro:bit with the given serial number.
+        """
+        record = self.flashed.get(serial_number)
+        return bool(record) and record.get("runtime") == runtime_hash
+
+    def is_script_flashed(self, serial_number, runtime_hash, script):
+        """
+        Returns True if Mu last flashed the runtime with the given hash, and
+        a filesystem containing the script as main.py, onto the micro:bit with
+        the given serial number.
+        """
+        record = self.flashed.get(serial_number)
+        return (
+            self.is_runtime_flashed(serial_number, runtime_hash)
+            and record.get("filesystem") == hashlib.sha256(script).hexdigest()
+        )
+
+    def record_flashed(self, serial_number, runtime_hash, script):
+        """
+        Record that the runtime with the given hash and a filesystem
+        containing the script as main.py are on the micro:bit with the given
+        serial number. The record is only kept while the micro:bit stays
+        connected.
+        """
+        self.flashed[serial_number] = {
+            "runtime": runtime_hash,
+            "filesystem": hashlib.sha256(script).hexdigest(),
+        }
+
+    def forget_flashed(self, serial_number):
+        """
+        Forget what was flashed onto the micro:bit with the given serial
+        number, so the next flash checks the device again.
+        """
+        self.flashed.pop(serial_number, None)
+
+    def forget_device(self, device):
+        """
+        Called when a device is connected or disconnected, since whatever
+        Mu flashed onto it may have changed in the meantime.
+        """
+        self.forget_flashed(device.serial_number)
+
+    def start_autoflash(self, path):
+        """
+        Start watching the file at the given path, so the micro:bit is
+        flashed again each time it is saved.
+        """
+        if self.autoflash_thread and self.autoflash_thread.path == path:
+            return
+        self.stop_autoflash()
+        logger.info("Auto-flashing {} when saved.".format(path))
+        self.autoflash_thread = AutoFlashWatcher(path, self)
+        self.autoflash_thread.finished.connect(
+            self.autoflash_thread.deleteLater
+        )
+        self.autoflash_thread.on_file_changed.connect(self.autoflash)
+        self.autoflash_thread.start()
+
+    def stop_autoflash(self):
+        """
+        Stop watching the auto-flashed file, if any.
+        """
+        if self.autoflash_thread:
+            thread, self.autoflash_thread = self.autoflash_thread, None
+            thread.on_file_changed.disconnect(self.autoflash)
+            thread.requestInterruption()
+            # The watcher stops at its next check, but don't hang the UI
+            # waiting for it (it's deleted once it has finished).
+            thread.wait(self.autoflash_stop_timeout)
+
+    def autoflash(self, path):
+        """
+        Called when the auto-flashed file has been saved. It's flashed again
+        if it's still in the current tab and the micro:bit isn't busy.
+        """
+        tab = self.view.current_tab
+        if self.flash_thread or tab is None or tab.path != path:
+            return
+        logger.info("Auto-flashing {}".format(path))
+        self.flash()
 
     def toggle_repl(self, event):
         """
@@ -593,6 +916,9 @@ class MicrobitMode(MicroPythonMode):
             )
             self.view.show_message(message, information)
             return
+        # The files on the device may be changed from here, so what's on it
+        # must be checked the next time it's flashed.
+        self.forget_flashed(device.serial_number)
         self.file_manager_thread = QThread(self)
         self.file_manager = FileManager(device.port)
         self.file_manager.moveToThread(self.file_manager_thread)
@@ -613,14 +939,6 @@ class MicrobitMode(MicroPythonMode):
         self.file_manager_thread = None
         self.fs = None
 
-    def on_data_flood(self):
-        """
-        Ensure the Files button is active before the REPL is killed off when
-        a data flood of the plotter is detected.
-        """
-        self.set_buttons(files=True)
-        super().on_data_flood()
-
     def open_file(self, path):
         """
         Tries to open a MicroPython hex file with an embedded Python script.
@@ -646,6 +964,7 @@ class MicrobitMode(MicroPythonMode):
         super().deactivate()
         if self.fs:
             self.remove_fs()
+        self.stop_autoflash()
 
     def device_changed(self, new_device):
         """
@@ -33,6 +33,10 @@ class SnekREPLConnection(REPLConnection):
     Handle Snek serial connection, including flow control
     """
 
+    # Flow control and autobaud drive the serial port directly, so it stays
+    # in the GUI thread.
+    threaded = False
+
     def __init__(
         self,
         port,
@@ -117,7 +121,7 @@ class SnekREPLConnection(REPLConnection):
             self.got_dc4 = True
             data = data.replace(b"\x14", b"")
 
-        self.data_received.emit(data)
+        self.receive([data])
 
         # if we were waiting for reset, we know the device is now
         # ready, so start transmitting
@@ -364,6 +368,7 @@ class SnekMode(MicroPythonMode):
 
     def stop(self):
         self.remove_repl()
+        super().stop()
 
     def actions(self):
         """
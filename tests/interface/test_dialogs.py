@@ -135,7 +135,12 @@ def test_MicrobitSettingsWidget_setup():
     mbsw = mu.interface.dialogs.MicrobitSettingsWidget()
     mbsw.setup(minify, custom_runtime_path)
     assert mbsw.minify.isChecked()
+    assert not mbsw.flash_all.isChecked()
     assert mbsw.runtime_path.text() == "/foo/bar"
+    assert not mbsw.autoflash.isChecked()
+    mbsw.setup(minify, custom_runtime_path, flash_all=True, autoflash=True)
+    assert mbsw.flash_all.isChecked()
+    assert mbsw.autoflash.isChecked()
 
 
 def test_PackagesWidget_setup():
@@ -372,6 +377,8 @@ def test_AdminDialog_setup_microbit_mode():
     settings = {
         "minify": True,
         "microbit_runtime": "/foo/bar",
+        "microbit_flash_all": True,
+        "microbit_autoflash": True,
         "locale": "",
     }
     packages = "foo\nbar\nbaz\n"
@@ -1018,6 +1018,10 @@ def test_Window_add_filesystem():
         mock_fs.on_ls
     )
     mock_fs.list_files.connect.assert_called_once_with(mock_file_manager.ls)
+    mock_fs.sync.connect.assert_called_once_with(mock_file_manager.sync_files)
+    mock_file_manager.on_sync_files.connect.assert_called_once_with(
+        mock_fs.on_sync_files
+    )
     mock_fs.microbit_fs.put.connect.assert_called_once_with(
         mock_file_manager.put
     )
@@ -1028,6 +1032,18 @@ def test_Window_add_filesystem():
         mock_file_manager.ls
     )
     mock_fs.local_fs.get.connect.assert_called_once_with(mock_file_manager.get)
+    mock_fs.local_fs.get_files.connect.assert_called_once_with(
+        mock_file_manager.get_files
+    )
+    mock_fs.microbit_fs.put_files.connect.assert_called_once_with(
+        mock_file_manager.put_files
+    )
+    mock_file_manager.on_transfer_file.connect.assert_called_once_with(
+        mock_fs.on_transfer_file
+    )
+    mock_file_manager.on_transfer_progress.connect.assert_called_once_with(
+        mock_fs.on_transfer_progress
+    )
     mock_fs.local_fs.list_files.connect.assert_called_once_with(
         mock_file_manager.ls
     )
@@ -1040,6 +1056,9 @@ def test_Window_add_filesystem():
     mock_file_manager.on_get_file.connect.assert_called_once_with(
         mock_fs.local_fs.on_get
     )
+    mock_file_manager.on_get_progress.connect.assert_called_once_with(
+        mock_fs.local_fs.on_get_progress
+    )
     mock_file_manager.on_list_fail.connect.assert_called_once_with(
         mock_fs.on_ls_fail
     )
@@ -1097,18 +1116,12 @@ def test_Window_add_micropython_plotter():
 
     mock_plotter = mock.MagicMock()
     mock_plotter_class = mock.MagicMock(return_value=mock_plotter)
-    mock_data_flood_handler = mock.MagicMock()
     with mock.patch("mu.interface.main.PlotterPane", mock_plotter_class):
-        w.add_micropython_plotter(
-            "MicroPython Plotter", mock_connection, mock_data_flood_handler
-        )
+        w.add_micropython_plotter("MicroPython Plotter", mock_connection)
     mock_plotter_class.assert_called_once_with()
     mock_connection.data_received.connect.assert_called_once_with(
         mock_plotter.process_tty_data
     )
-    mock_plotter.data_flood.connect.assert_called_once_with(
-        mock_data_flood_handler
-    )
     w.add_plotter.assert_called_once_with(mock_plotter, "MicroPython Plotter")
 
 
@@ -1171,9 +1184,6 @@ def test_Window_add_python3_plotter():
     w.data_received.connect.assert_called_once_with(
         mock_plotter.process_tty_data
     )
-    mock_plotter.data_flood.connect.assert_called_once_with(
-        mock_mode.on_data_flood
-    )
     w.add_plotter.assert_called_once_with(mock_plotter, "Python3 data tuple")
 
 
@@ -3,12 +3,12 @@
 Tests for the user interface elements of Mu.
 """
 from PyQt5.QtWidgets import QMessageBox, QLabel, QMenu
-from PyQt5.QtCore import Qt, QEvent, QPointF, QUrl
+from PyQt5.QtCore import Qt, QEvent, QPoint, QPointF, QRectF, QUrl
 from PyQt5.QtGui import QTextCursor, QMouseEvent
-from collections import deque
 from unittest import mock
 
 import sys
+import math
 import os
 import signal
 import pytest
@@ -598,27 +598,34 @@ def test_MicroPythonREPLPane_process_tty_data():
     Ensure bytes coming from the device to the application are processed as
     expected. Backspace is enacted, carriage-return is ignored, newline moves
     the cursor position to the end of the line before enacted and all others
-    are simply inserted.
+    are inserted as runs of text overwriting what's in front of the cursor.
     """
     mock_repl_connection = mock.MagicMock()
     mock_tc = mock.MagicMock()
     mock_tc.movePosition = mock.MagicMock(
         side_effect=[True, False, True, True]
     )
-    mock_tc.deleteChar = mock.MagicMock(return_value=None)
+    mock_tc.position.return_value = 3
     rp = mu.interface.panes.MicroPythonREPLPane(mock_repl_connection)
     rp.textCursor = mock.MagicMock(return_value=mock_tc)
     rp.setTextCursor = mock.MagicMock(return_value=None)
     rp.insertPlainText = mock.MagicMock(return_value=None)
     rp.ensureCursorVisible = mock.MagicMock(return_value=None)
-    bs = bytes([8, 13, 10, 65])  # \b, \r, \n, 'A'
+    bs = b"\b\r\nAB"
     rp.process_tty_data(bs)
-    assert mock_tc.movePosition.call_count == 2
+    assert mock_tc.movePosition.call_count == 3
     assert mock_tc.movePosition.call_args_list[0][0][0] == QTextCursor.Left
     assert mock_tc.movePosition.call_args_list[1][0][0] == QTextCursor.End
-    assert rp.insertPlainText.call_count == 2
-    assert rp.insertPlainText.call_args_list[0][0][0] == chr(10)
-    assert rp.insertPlainText.call_args_list[1][0][0] == chr(65)
+    assert mock_tc.movePosition.call_args_list[2][0] == (
+        QTextCursor.NextCharacter,
+        QTextCursor.KeepAnchor,
+        2,
+    )
+    rp.insertPlainText.assert_called_once_with(chr(10))
+    mock_tc.beginEditBlock.assert_called_once_with()
+    mock_tc.insertText.assert_called_once_with("AB")
+    mock_tc.endEditBlock.assert_called_once_with()
+    assert rp.device_cursor_position == 3
     rp.ensureCursorVisible.assert_called_once_with()
 
 
@@ -629,13 +636,12 @@ def test_MicroPythonREPLPane_process_tty_data_multibyte_sequence():
     """
     mock_repl_connection = mock.MagicMock()
     rp = mu.interface.panes.MicroPythonREPLPane(mock_repl_connection)
-    rp.insertPlainText = mock.MagicMock(return_value=None)
 
     # Copyright symbol: © (0xC2A9)
     rp.process_tty_data(b"\xc2")
     rp.process_tty_data(b"\xa9")
 
-    assert rp.insertPlainText.call_args_list[0][0][0] == "©"
+    assert rp.toPlainText() == "©"
 
 
 def test_MicroPythonREPLPane_process_tty_data_handle_malformed_unicode():
@@ -645,13 +651,12 @@ def test_MicroPythonREPLPane_process_tty_data_handle_malformed_unicode():
     """
     mock_repl_connection = mock.MagicMock()
     rp = mu.interface.panes.MicroPythonREPLPane(mock_repl_connection)
-    rp.insertPlainText = mock.MagicMock(return_value=None)
 
     rp.process_tty_data(b"foo \xd8 bar")
 
     # Test that malformed input are correctly replaced with the standard
     # unicode replacement character (�, U+FFFD)
-    assert rp.insertPlainText.call_args_list[4][0][0] == u"\uFFFD"
+    assert rp.toPlainText() == u"foo \uFFFD bar"
 
 
 def test_MicroPythonREPLPane_process_tty_data_VT100():
@@ -788,6 +793,23 @@ def test_MicroPythonREPLPane_process_tty_data_printed_chars():
     assert rp.device_cursor_position == 13
 
 
+def test_MicroPythonREPLPane_process_tty_data_overwrites_runs():
+    """
+    Runs of printed characters overwrite those in front of the cursor, as
+    they do one character at a time, including across the end of the line.
+    """
+    mock_repl_connection = mock.MagicMock()
+    rp = mu.interface.panes.MicroPythonREPLPane(mock_repl_connection)
+    rp.setPlainText("ab\ncd")
+    rp.device_cursor_position = 1
+    rp.process_tty_data(b"XYZ")
+    assert rp.toPlainText() == "aXYZd"
+    assert rp.device_cursor_position == 4
+    assert rp.textCursor().position() == 4
+    rp.process_tty_data(b"\x1b[2DQ\x1b[K")
+    assert rp.toPlainText() == "aXQ"
+
+
 def test_MicroPythonREPLPane_process_tty_data_vt100_cursor_left():
     """
     Ensure left cursor movement of several steps works correctly
@@ -965,6 +987,123 @@ def test_MicroPythonREPLPane_process_tty_data_unsupported_osc_command():
     assert rp.device_cursor_position == 5
 
 
+def test_Scrollback_trim_lines():
+    """
+    The oldest blocks over the line limit are removed, and the number of
+    characters removed is returned.
+    """
+    rp = mu.interface.panes.MicroPythonREPLPane(mock.MagicMock())
+    scrollback = mu.interface.panes.Scrollback(
+        rp.document(), max_lines=3, max_size=0, spool=False
+    )
+    rp.setPlainText("one\ntwo\nthree\nfour\nfive")
+    assert scrollback.trim() == len("one\ntwo\n")
+    assert rp.toPlainText() == "three\nfour\nfive"
+    assert scrollback.trim() == 0
+    assert scrollback.spool_file is None
+
+
+def test_Scrollback_trim_size():
+    """
+    The oldest blocks are removed until the text is within the size limit,
+    but the current (last) line is always kept.
+    """
+    rp = mu.interface.panes.MicroPythonREPLPane(mock.MagicMock())
+    scrollback = mu.interface.panes.Scrollback(
+        rp.document(), max_lines=0, max_size=10 / (1024 * 1024), spool=False
+    )
+    rp.setPlainText("aaaa\nbbbb\ncccc")
+    assert scrollback.trim() == 5
+    assert rp.toPlainText() == "bbbb\ncccc"
+    rp.setPlainText("a" * 20)
+    assert scrollback.trim() == 0
+    assert rp.toPlainText() == "a" * 20
+
+
+def test_Scrollback_settings():
+    """
+    The limits default to those in the user's settings.
+    """
+    mock_settings = {
+        "scrollback_lines": 100,
+        "scrollback_size": 2,
+        "scrollback_spool": True,
+    }
+    with mock.patch("mu.interface.panes.settings.settings", mock_settings):
+        scrollback = mu.interface.panes.Scrollback(mock.MagicMock())
+    assert scrollback.max_lines == 100
+    assert scrollback.max_chars == 2 * 1024 * 1024
+    assert scrollback.spool is True
+
+
+def test_Scrollback_spool_save(tmp_path):
+    """
+    Trimmed text is spooled to a temporary file when spooling, so saving
+    writes the whole output. Clearing forgets the spooled text.
+    """
+    rp = mu.interface.panes.MicroPythonREPLPane(mock.MagicMock())
+    scrollback = mu.interface.panes.Scrollback(
+        rp.document(), max_lines=2, max_size=0, spool=True
+    )
+    rp.setPlainText("one\ntwo\nthree")
+    scrollback.trim()
+    rp.append("four")
+    scrollback.trim()
+    path = tmp_path / "output.txt"
+    scrollback.save(str(path))
+    assert path.read_text() == "one\ntwo\nthree\nfour"
+    scrollback.clear()
+    assert scrollback.spool_file is None
+    scrollback.save(str(path))
+    assert path.read_text() == "three\nfour"
+
+
+def test_MicroPythonREPLPane_process_tty_data_trims_scrollback():
+    """
+    Output over the scrollback limit is trimmed, and the device cursor is
+    kept in step with the remaining text.
+    """
+    rp = mu.interface.panes.MicroPythonREPLPane(mock.MagicMock())
+    rp.scrollback = mu.interface.panes.Scrollback(
+        rp.document(), max_lines=3, max_size=0, spool=False
+    )
+    for i in range(10):
+        rp.process_tty_data("line {}\r\n".format(i).encode("utf-8"))
+    rp.process_tty_data(b">>> ab\x1b[D")
+    assert rp.toPlainText() == "line 8\nline 9\n>>> ab"
+    assert rp.device_cursor_position == len("line 8\nline 9\n>>> a")
+    rp.process_tty_data(b"Z")
+    assert rp.toPlainText() == "line 8\nline 9\n>>> aZ"
+
+
+def test_MicroPythonREPLPane_save_output():
+    """
+    The context menu can save all the output when spooling, via a file
+    chosen by the user.
+    """
+    rp = mu.interface.panes.MicroPythonREPLPane(mock.MagicMock())
+    rp.scrollback = mock.MagicMock()
+    mock_qmenu = mock.MagicMock()
+    with mock.patch(
+        "mu.interface.panes.QMenu", return_value=mock_qmenu
+    ), mock.patch("mu.interface.panes.QCursor"):
+        rp.context_menu()
+    save_action = mock_qmenu.addAction.call_args_list[2][0]
+    assert save_action == ("Save output", rp.save_output)
+    with mock.patch(
+        "mu.interface.panes.QFileDialog.getSaveFileName",
+        return_value=("", ""),
+    ):
+        rp.save_output()
+    assert rp.scrollback.save.call_count == 0
+    with mock.patch(
+        "mu.interface.panes.QFileDialog.getSaveFileName",
+        return_value=("output.txt", ""),
+    ):
+        rp.save_output()
+    rp.scrollback.save.assert_called_once_with("output.txt")
+
+
 def test_MicroPythonREPLPane_clear():
     """
     Ensure setText is called with an empty string.
@@ -1502,6 +1641,32 @@ def test_MicroPythonDeviceFileList_dropEvent():
     mfs.put.emit.assert_called_once_with(fn)
 
 
+def test_MicroPythonDeviceFileList_dropEvent_several_files():
+    """
+    Ensure dropping several files puts them onto the device as a batch.
+    """
+    mock_event = mock.MagicMock()
+    source = mu.interface.panes.LocalFileList("homepath")
+    source.addItem("foo.py")
+    source.addItem("bar.py")
+    source.selectAll()
+    mock_event.source.return_value = source
+    mfs = mu.interface.panes.MicroPythonDeviceFileList("homepath")
+    mfs.disable = mock.MagicMock()
+    mfs.set_message = mock.MagicMock()
+    mfs.put = mock.MagicMock()
+    mfs.put_files = mock.MagicMock()
+    mfs.dropEvent(mock_event)
+    mfs.put_files.emit.assert_called_once_with(
+        [
+            (os.path.join("homepath", "foo.py"), "foo.py"),
+            (os.path.join("homepath", "bar.py"), "bar.py"),
+        ]
+    )
+    assert mfs.put.emit.call_count == 0
+    mfs.set_message.emit.assert_called_once_with("Copying 2 files to device.")
+
+
 def test_MicroPythonDeviceFileList_dropEvent_wrong_source():
     """
     Ensure that only drop events whose origins are LocalFileList objects are
@@ -1518,10 +1683,12 @@ def test_MicroPythonDeviceFileList_dropEvent_wrong_source():
 
 def test_MicroPythonDeviceFileList_on_put():
     """
-    A message and list_files signal should be emitted.
+    The file is added to the list without listing the device again, and a
+    message and enable signal should be emitted.
     """
     mfs = mu.interface.panes.MicroPythonDeviceFileList("homepath")
     mfs.set_message = mock.MagicMock()
+    mfs.enable = mock.MagicMock()
     mfs.list_files = mock.MagicMock()
 
     mfs.on_put("my_file.py")
@@ -1529,7 +1696,13 @@ def test_MicroPythonDeviceFileList_on_put():
     mfs.set_message.emit.assert_called_once_with(
         "'my_file.py' successfully copied to device."
     )
-    mfs.list_files.emit.assert_called_once_with()
+    mfs.enable.emit.assert_called_once_with()
+    assert mfs.list_files.emit.call_count == 0
+    assert mfs.files == {"my_file.py": (False, None)}
+    assert mfs.item(0).text() == "my_file.py"
+    # Putting it again doesn't duplicate it.
+    mfs.on_put("my_file.py")
+    assert mfs.count() == 1
 
 
 def test_MicroPythonDeviceFileList_contextMenuEvent():
@@ -1576,10 +1749,13 @@ def test_MicroPythonDeviceFileList_contextMenuEvent_empty_list():
 
 def test_MicroPythonFileList_on_delete():
     """
-    On delete should emit a message and list_files signal.
+    On delete the file is removed from the list without listing the device
+    again, and a message and enable signal should be emitted.
     """
     mfs = mu.interface.panes.MicroPythonDeviceFileList("homepath")
+    mfs.update_files([("my_file.py", False, 12), ("other.py", False, 34)])
     mfs.set_message = mock.MagicMock()
+    mfs.enable = mock.MagicMock()
     mfs.list_files = mock.MagicMock()
 
     mfs.on_delete("my_file.py")
@@ -1587,7 +1763,48 @@ def test_MicroPythonFileList_on_delete():
     mfs.set_message.emit.assert_called_once_with(
         "'my_file.py' successfully deleted from device."
     )
-    mfs.list_files.emit.assert_called_once_with()
+    mfs.enable.emit.assert_called_once_with()
+    assert mfs.list_files.emit.call_count == 0
+    assert list(mfs.files) == ["other.py"]
+    assert mfs.count() == 1
+    assert mfs.item(0).text() == "other.py"
+
+
+def test_MicroPythonDeviceFileList_update_files():
+    """
+    Listing the device only touches the items that changed, shows the files
+    in nested directories by path, and keeps directories in the cache only.
+    """
+    mfs = mu.interface.panes.MicroPythonDeviceFileList("homepath")
+    mfs.update_files(
+        [
+            ("main.py", False, 10),
+            ("lib", True, 0),
+            ("lib/foo.py", False, 20),
+        ]
+    )
+    assert [mfs.item(i).text() for i in range(mfs.count())] == [
+        "lib/foo.py",
+        "main.py",
+    ]
+    assert mfs.item(0).toolTip() == "20 bytes"
+    assert mfs.files["lib"] == (True, 0)
+    main_item = mfs.item(1)
+    mfs.add_file = mock.MagicMock(wraps=mfs.add_file)
+    mfs.update_files(
+        [
+            ("main.py", False, 10),
+            ("lib", True, 0),
+            ("lib/bar.py", False, 30),
+        ]
+    )
+    mfs.add_file.assert_called_once_with("lib/bar.py", 30, False)
+    assert [mfs.item(i).text() for i in range(mfs.count())] == [
+        "lib/bar.py",
+        "main.py",
+    ]
+    assert mfs.item(1) is main_item
+    assert "lib/foo.py" not in mfs.files
 
 
 def test_LocalFileList_init():
@@ -1637,18 +1854,64 @@ def test_LocalFileList_dropEvent_wrong_source():
 
 def test_LocalFileList_on_get():
     """
-    On get should emit two signals: a message and list_files.
+    On get the file is added to the local list without listing the device
+    again, and a message and enable signal should be emitted.
     """
     lfs = mu.interface.panes.LocalFileList("homepath")
     lfs.set_message = mock.MagicMock()
+    lfs.enable = mock.MagicMock()
     lfs.list_files = mock.MagicMock()
 
-    lfs.on_get("my_file.py")
+    lfs.on_get("lib/my_file.py")
 
     lfs.set_message.emit.assert_called_once_with(
-        "Successfully copied 'my_file.py' from the device to your computer."
+        "Successfully copied 'lib/my_file.py' from the device to your "
+        "computer."
     )
-    lfs.list_files.emit.assert_called_once_with()
+    lfs.enable.emit.assert_called_once_with()
+    assert lfs.list_files.emit.call_count == 0
+    assert lfs.item(0).text() == "my_file.py"
+    lfs.on_get("my_file.py")
+    assert lfs.count() == 1
+
+
+def test_LocalFileList_dropEvent_several_files():
+    """
+    Ensure dropping several files gets them from the device as a batch,
+    after confirming existing files are overwritten.
+    """
+    mock_event = mock.MagicMock()
+    source = mu.interface.panes.MicroPythonDeviceFileList("homepath")
+    source.addItem("foo.py")
+    source.addItem("lib/bar.py")
+    source.selectAll()
+    mock_event.source.return_value = source
+    lfs = mu.interface.panes.LocalFileList("homepath")
+    lfs.addItem("foo.py")
+    lfs.disable = mock.MagicMock()
+    lfs.set_message = mock.MagicMock()
+    lfs.get_files = mock.MagicMock()
+    lfs.show_confirm_overwrite_dialog = mock.MagicMock(return_value=False)
+    lfs.dropEvent(mock_event)
+    assert lfs.get_files.emit.call_count == 0
+    lfs.show_confirm_overwrite_dialog.return_value = True
+    lfs.dropEvent(mock_event)
+    lfs.get_files.emit.assert_called_once_with(
+        [
+            ("foo.py", os.path.join("homepath", "foo.py")),
+            ("lib/bar.py", os.path.join("homepath", "bar.py")),
+        ]
+    )
+
+
+def test_LocalFileList_on_get_progress():
+    """
+    The progress of getting a file is passed on via the set_progress signal.
+    """
+    lfs = mu.interface.panes.LocalFileList("homepath")
+    lfs.set_progress = mock.MagicMock()
+    lfs.on_get_progress("my_file.py", 256, 1024)
+    lfs.set_progress.emit.assert_called_once_with(256, 1024)
 
 
 def test_LocalFileList_contextMenuEvent():
@@ -1870,6 +2133,63 @@ def test_FileSystemPane_enable():
     fsp.local_fs.setAcceptDrops.assert_called_once_with(True)
 
 
+def test_FileSystemPane_show_progress():
+    """
+    The progress bar is shown while a file is transferred, and hidden again
+    when the list widgets are enabled.
+    """
+    fsp = mu.interface.panes.FileSystemPane("homepath")
+    fsp.microbit_fs = mock.MagicMock()
+    fsp.local_fs = mock.MagicMock()
+    fsp.progress_bar = mock.MagicMock()
+    fsp.show_progress(256, 1024)
+    fsp.progress_bar.setMaximum.assert_called_once_with(1024)
+    fsp.progress_bar.setValue.assert_called_once_with(256)
+    fsp.progress_bar.show.assert_called_once_with()
+    fsp.enable()
+    fsp.progress_bar.hide.assert_called_once_with()
+
+
+def test_FileSystemPane_on_transfer():
+    """
+    The progress and status of a batch of transfers are shown.
+    """
+    fsp = mu.interface.panes.FileSystemPane("homepath")
+    fsp.show_message = mock.MagicMock()
+    fsp.show_progress = mock.MagicMock()
+    fsp.on_transfer_progress(1024, 4096, 2048.0)
+    fsp.show_progress.assert_called_once_with(1024, 4096)
+    fsp.show_message.assert_called_once_with(
+        "Copied 1024 of 4096 bytes (2.0 KB/s)."
+    )
+    fsp.on_transfer_file("foo.py")
+    fsp.show_message.assert_called_with("'foo.py' successfully copied.")
+
+
+def test_FileSystemPane_sync_folder(tmp_path):
+    """
+    Syncing emits the sync signal with all the files in the local directory.
+    """
+    (tmp_path / "foo.py").write_text("foo")
+    (tmp_path / "bar.py").write_text("bar")
+    (tmp_path / "lib").mkdir()
+    fsp = mu.interface.panes.FileSystemPane(str(tmp_path))
+    fsp.sync = mock.MagicMock()
+    fsp.show_message = mock.MagicMock()
+    fsp.sync_folder()
+    fsp.sync.emit.assert_called_once_with(
+        [
+            (str(tmp_path / "bar.py"), "bar.py"),
+            (str(tmp_path / "foo.py"), "foo.py"),
+        ]
+    )
+    assert not fsp.sync_button.isEnabled()
+    fsp.on_sync_files(1, 2)
+    fsp.show_message.assert_called_with(
+        "Copying 1 of 2 files onto the device."
+    )
+
+
 def test_FileSystemPane_set_theme():
     """
     Setting theme doesn't error
@@ -1905,7 +2225,7 @@ def test_FileSystemPane_on_ls():
     handler.
     """
     fsp = mu.interface.panes.FileSystemPane("homepath")
-    microbit_files = ["foo.py", "bar.py"]
+    microbit_files = [("foo.py", False, 1), ("bar.py", False, 2)]
     fsp.microbit_fs = mock.MagicMock()
     fsp.local_fs = mock.MagicMock()
     fsp.enable = mock.MagicMock()
@@ -1916,9 +2236,9 @@ def test_FileSystemPane_on_ls():
         "mu.interface.panes.os.path.isfile", mock_isfile
     ):
         fsp.on_ls(microbit_files)
-    fsp.microbit_fs.clear.assert_called_once_with()
+    fsp.microbit_fs.update_files.assert_called_once_with(microbit_files)
+    assert fsp.microbit_fs.clear.call_count == 0
     fsp.local_fs.clear.assert_called_once_with()
-    assert fsp.microbit_fs.addItem.call_count == 2
     assert fsp.local_fs.addItem.call_count == 2
     fsp.enable.assert_called_once_with()
 
@@ -2981,6 +3301,22 @@ def test_PythonProcessPane_read_from_stdout():
     mock_timer.singleShot.assert_called_once_with(2, ppp.read_from_stdout)
 
 
+def test_PythonProcessPane_read_from_stdout_trims_scrollback():
+    """
+    Output from the process over the scrollback limit is trimmed.
+    """
+    ppp = mu.interface.panes.PythonProcessPane()
+    ppp.scrollback = mu.interface.panes.Scrollback(
+        ppp.document(), max_lines=2, max_size=0, spool=False
+    )
+    ppp.process = mock.MagicMock()
+    ppp.process.read.return_value = b"one\ntwo\nthree\n"
+    with mock.patch("mu.interface.panes.QTimer"):
+        ppp.read_from_stdout()
+    assert ppp.toPlainText() == "three\n"
+    assert ppp.start_of_current_line == len("three\n")
+
+
 def test_PythonProcessPane_read_from_stdout_with_stdout_buffer():
     """
     Ensure incoming bytes from sub-process's stdout are processed correctly if
@@ -3260,18 +3596,132 @@ def test_DebugInspector_set_theme():
     di.set_theme("test")
 
 
+def test_RingBuffer():
+    """
+    A ring buffer holds the most recent values, oldest first, and keeps track
+    of their minimum and maximum.
+    """
+    rb = mu.interface.panes.RingBuffer(3)
+    assert len(rb) == 3
+    assert list(rb.latest(3)) == [0, 0, 0]
+    assert (rb.min(), rb.max()) == (0, 0)
+    rb.append(5)
+    rb.append(-2)
+    assert list(rb.latest(2)) == [5, -2]
+    assert (rb.min(), rb.max()) == (-2, 5)
+    rb.append(1)
+    rb.append(0.5)
+    # The 5 has been replaced.
+    assert list(rb.latest(3)) == [-2, 1, 0.5]
+    assert (rb.min(), rb.max()) == (-2, 1)
+    rb.append(3)
+    rb.append(4)
+    assert list(rb.latest(3)) == [0.5, 3, 4]
+    assert list(rb.latest(0)) == []
+    assert (rb.min(), rb.max()) == (0.5, 4)
+
+
+def test_PlotHistory():
+    """
+    The history behaves like a sequence of the tuples appended to it, with
+    ints and floats kept as they were.
+    """
+    history = mu.interface.panes.PlotHistory()
+    assert len(history) == 0
+    assert list(history) == []
+    history.append((1, 2.5))
+    history.append((3,))
+    history.append((4.0, 5, -6))
+    assert len(history) == 3
+    assert list(history) == [(1, 2.5), (3,), (4.0, 5, -6)]
+    assert [type(v) for v in history[2]] == [float, int, int]
+    assert history[-3] == (1, 2.5)
+    with pytest.raises(IndexError):
+        history[3]
+    assert (3,) in history
+
+
+def test_PlotHistory_spill():
+    """
+    Once block_rows rows are held in memory they're spilled to disk, and
+    still read back as before.
+    """
+    history = mu.interface.panes.PlotHistory()
+    history.block_rows = 8
+    history.summary_size = 2
+    rows = [(i, i / 2) if i % 5 else (i,) for i in range(20)]
+    for row in rows:
+        history.append(row)
+    assert history.spilled_rows == 16
+    assert len(history.widths) == 4
+    assert history.spill_file
+    assert list(history) == rows
+    assert history[3] == rows[3]
+    assert history[-1] == rows[-1]
+    values = history._read_column(1, 6, 12)
+    assert list(values[:4]) == [3.0, 3.5, 4.0, 4.5]
+    assert math.isnan(values[4])  # Row 10 had a single value.
+    assert values[5] == 5.5
+
+
+def test_PlotHistory_spill_new_column():
+    """
+    Columns that appear after rows were spilled to disk have no values for
+    the spilled rows.
+    """
+    history = mu.interface.panes.PlotHistory()
+    history.block_rows = 4
+    history.summary_size = 2
+    for i in range(4):
+        history.append((i,))
+    history.append((4, 40))
+    assert list(history) == [(0,), (1,), (2,), (3,), (4, 40)]
+    values = history._read_column(1, 2, 5)
+    assert math.isnan(values[0]) and math.isnan(values[1])
+    assert values[2] == 40
+    assert history.envelope(1, 0, 5, 5) == [(4, 40, 40)]
+
+
+def test_PlotHistory_envelope():
+    """
+    The envelope of values is decimated to about the number of buckets
+    asked for, from the raw values or the summaries of them, and covers the
+    minimum and maximum of each bucket.
+    """
+    history = mu.interface.panes.PlotHistory()
+    history.summary_size = 4
+    values = [(i % 10) * (-1) ** i for i in range(1000)]
+    for value in values:
+        history.append((value,))
+    assert len(history.summaries[0]) == 4  # Summaries of 4, 16, 64, 256.
+    # Few enough rows to show them all.
+    assert history.envelope(0, 10, 15, 10) == [
+        (i, values[i], values[i]) for i in range(10, 15)
+    ]
+    # Decimated from the raw values.
+    assert history.envelope(0, 0, 6, 3) == [(0, -1, 0), (2, -3, 2), (4, -5, 4)]
+    # Decimated from summaries, with the last rows from the raw values.
+    envelope = history.envelope(0, 0, 1000, 10)
+    assert len(envelope) in range(10, 20)
+    assert envelope[0] == (0, -9, 8)
+    assert [x for x, _, _ in envelope] == sorted(x for x, _, _ in envelope)
+    assert envelope[-1][0] < 1000
+    assert history.envelope(0, 500, 500, 10) == []
+    assert history.envelope(1, 0, 1000, 10) == []
+
+
 @pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
 def test_PlotterPane_init():
     """
     Ensure the plotter pane is created in the expected manner.
     """
     pp = mu.interface.panes.PlotterPane()
-    assert pp.input_buffer == []
-    assert pp.raw_data == []
+    assert pp.input_buffer == b""
+    assert len(pp.raw_data) == 0
     assert pp.max_x == 100
     assert pp.max_y == 1000
     assert len(pp.data) == 1
-    assert isinstance(pp.data[0], deque)
+    assert isinstance(pp.data[0], mu.interface.panes.RingBuffer)
     assert len(pp.series) == 1
     assert isinstance(pp.series[0], mu.interface.panes.QLineSeries)
     assert isinstance(pp.chart, mu.interface.panes.QChart)
@@ -3284,48 +3734,85 @@ def test_PlotterPane_process_tty_data():
     """
     If a byte representation of a Python tuple containing numeric values,
     starting at the beginning of a new line and terminating with a new line is
-    received, then the add_data method is called with the resulting Python
-    tuple.
+    received, then the resulting Python tuple is recorded and the chart is
+    redrawn.
     """
     pp = mu.interface.panes.PlotterPane()
-    pp.add_data = mock.MagicMock()
+    pp.record_data = mock.MagicMock()
+    pp.redraw = mock.MagicMock()
     pp.process_tty_data(b"(1, 2.3, 4)\r\n")
-    pp.add_data.assert_called_once_with((1, 2.3, 4))
+    pp.record_data.assert_called_once_with((1, 2.3, 4))
+    pp.redraw.assert_called_once_with()
 
 
 @pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
-def test_PlotterPane_process_tty_data_guards_against_data_flood():
+def test_PlotterPane_process_tty_data_flood():
+    """
+    A lot of data arriving at once is all recorded, but the chart is only
+    redrawn once to show the latest values.
     """
-    If the process_tty_data method gets data of more than 1024 bytes
-    then trigger a data_flood signal and ensure the plotter no longer
-    processes incoming bytes.
+    pp = mu.interface.panes.PlotterPane()
+    pp.redraw = mock.MagicMock(wraps=pp.redraw)
+    data = b"".join(b"(%d, %d)\r\n" % (i, -i) for i in range(1000))
+    pp.process_tty_data(data)
+    assert len(pp.raw_data) == 1000
+    assert pp.raw_data[-1] == (999, -999)
+    pp.redraw.assert_called_once_with()
+    assert pp.series[0].count() == pp.max_x
+    assert pp.series[0].at(pp.max_x - 1).y() == 999
 
-    (The assumption is that Mu will clean up once the data_flood signal is
-    emitted.)
 
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_data_recorded():
+    """
+    The tuples recorded are emitted together, once per read, for them to be
+    streamed elsewhere.
     """
     pp = mu.interface.panes.PlotterPane()
-    pp.data_flood = mock.MagicMock()
-    pp.add_data = mock.MagicMock()
-    data_flood = b"X" * 1025
-    pp.process_tty_data(data_flood)
-    assert pp.flooded is True
-    pp.data_flood.emit.assert_called_once_with()
-    assert pp.add_data.call_count == 0
-    pp.process_tty_data(data_flood)
-    assert pp.add_data.call_count == 0
+    pp.redraw = mock.MagicMock()
+    pp.data_recorded = mock.MagicMock()
+    pp.process_tty_data(b"(1, 2)\r\nfoo\r\n(3.5,)\r\n")
+    pp.data_recorded.emit.assert_called_once_with([(1, 2), (3.5,)])
+    pp.process_tty_data(b"foo\r\n")
+    assert pp.data_recorded.emit.call_count == 1
+    pp.add_data((4,))
+    pp.data_recorded.emit.assert_called_with([(4,)])
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_no_history():
+    """
+    If the plotter_history setting is off, no copy of the data is kept and
+    history mode isn't available.
+    """
+    mock_settings = {"plotter_history": False}
+    with mock.patch("mu.interface.panes.settings.settings", mock_settings):
+        pp = mu.interface.panes.PlotterPane()
+    assert pp.raw_data is None
+    pp.redraw = mock.MagicMock()
+    pp.process_tty_data(b"(1, 2)\r\n")
+    pp.redraw.assert_called_once_with()
+    mock_menu = mock.MagicMock()
+    event = mock.MagicMock()
+    event.pos.return_value = QPoint(0, 0)
+    with mock.patch("mu.interface.panes.QMenu", return_value=mock_menu):
+        pp.contextMenuEvent(event)
+    # Only the action to separate the y axes is offered.
+    assert mock_menu.addAction.call_count == 1
 
 
 @pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
 def test_PlotterPane_process_tty_data_tuple_not_numeric():
     """
     If a byte representation of a tuple is received but it doesn't contain
-    numeric values, then the add_data method MUST NOT be called.
+    numeric values, then nothing is recorded or redrawn.
     """
     pp = mu.interface.panes.PlotterPane()
-    pp.add_data = mock.MagicMock()
+    pp.record_data = mock.MagicMock()
+    pp.redraw = mock.MagicMock()
     pp.process_tty_data(b'("a", "b", "c")\r\n')
-    assert pp.add_data.call_count == 0
+    assert pp.record_data.call_count == 0
+    assert pp.redraw.call_count == 0
 
 
 @pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
@@ -3335,17 +3822,76 @@ def test_PlotterPane_process_tty_data_overrun_input_buffer():
     until the newline is detected.
     """
     pp = mu.interface.panes.PlotterPane()
-    pp.add_data = mock.MagicMock()
+    pp.record_data = mock.MagicMock()
+    pp.redraw = mock.MagicMock()
     pp.process_tty_data(b"(1, 2.3, 4)\r\n")
-    pp.add_data.assert_called_once_with((1, 2.3, 4))
-    pp.add_data.reset_mock()
+    pp.record_data.assert_called_once_with((1, 2.3, 4))
+    pp.record_data.reset_mock()
     pp.process_tty_data(b"(1, 2.")
-    assert pp.add_data.call_count == 0
+    assert pp.record_data.call_count == 0
     pp.process_tty_data(b"3, 4)\r\n")
-    pp.add_data.assert_called_once_with((1, 2.3, 4))
-    pp.add_data.reset_mock()
+    pp.record_data.assert_called_once_with((1, 2.3, 4))
+    pp.record_data.reset_mock()
     pp.process_tty_data(b"(1, 2.3, 4)\r\n")
-    pp.add_data.assert_called_once_with((1, 2.3, 4))
+    pp.record_data.assert_called_once_with((1, 2.3, 4))
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_process_tty_data_incomplete_line():
+    """
+    A tuple isn't recorded until the end of its line arrives, even if the
+    line ends with \r\n split across reads.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.record_data = mock.MagicMock()
+    pp.redraw = mock.MagicMock()
+    pp.process_tty_data(b"(1, 2)")
+    pp.process_tty_data(b"\r")
+    assert pp.record_data.call_count == 0
+    pp.process_tty_data(b"\n(3, 4)x\n")
+    pp.record_data.assert_called_once_with((1, 2))
+    assert pp.input_buffer == b""
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_process_tty_data_large_read():
+    """
+    A read larger than slice_size is parsed a slice at a time, including
+    lines spanning the slices.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.slice_size = 16
+    pp.redraw = mock.MagicMock()
+    data = b"".join(b"(%d, %d.5)\r\n" % (i, i) for i in range(100))
+    pp.process_tty_data(data)
+    assert list(pp.raw_data) == [(i, i + 0.5) for i in range(100)]
+    pp.redraw.assert_called_once_with()
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_process_tty_data_long_line():
+    """
+    An incomplete line longer than max_line_length isn't kept.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.record_data = mock.MagicMock()
+    pp.process_tty_data(b"(" + b"1, " * 2000)
+    assert pp.input_buffer == b""
+    pp.process_tty_data(b"1)\n")
+    assert pp.record_data.call_count == 0
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_parse_values():
+    """
+    Ints and floats are parsed from a tuple's values, and anything else is
+    ignored.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    values = pp.parse_values(b' 1, -2 , +3.5, 1e3, "a", , 1_000, nan')
+    assert values[:6] == (1, -2, 3.5, 1000.0, 1000, values[5])
+    assert [type(v) for v in values] == [int, int, float, float, int, float]
+    assert pp.parse_values(b'"a", "b"') == ()
 
 
 @pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
@@ -3359,8 +3905,33 @@ def test_PlotterPane_add_data():
     pp.series = [mock_line_series]
     pp.add_data((1,))
     assert (1,) in pp.raw_data
-    mock_line_series.clear.assert_called_once_with()
-    mock_line_series.append.call_args_list[0][0] == (0, 1)
+    points = mock_line_series.replace.call_args[0][0]
+    assert points == [mu.interface.panes.QPointF(0, 1)]
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_request_redraw():
+    """
+    The chart is redrawn at once, but not again until the end of the frame,
+    however much data is added in the meantime.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.redraw = mock.MagicMock()
+    pp.redraw_timer = mock.MagicMock()
+    pp.redraw_timer.isActive.return_value = False
+    pp.add_data((1,))
+    pp.redraw.assert_called_once_with()
+    pp.redraw_timer.start.assert_called_once_with()
+    pp.redraw_timer.isActive.return_value = True
+    pp.add_data((2,))
+    pp.add_data((3,))
+    assert pp.redraw.call_count == 1
+    pp.on_redraw_timer()
+    assert pp.redraw.call_count == 2
+    assert pp.redraw_timer.start.call_count == 2
+    # Nothing more was added, so there's nothing to redraw.
+    pp.on_redraw_timer()
+    assert pp.redraw.call_count == 2
 
 
 @pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
@@ -3496,6 +4067,347 @@ def test_PlotterPane_set_label_format_to_int_when_range_large():
     pp.axis_y.setLabelFormat.assert_called_once_with("%d")
 
 
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_history_mode():
+    """
+    In history mode the whole session is drawn as an envelope of values,
+    and switching back shows the latest data again.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.redraw_timer = mock.MagicMock()
+    pp.redraw_timer.isActive.return_value = False
+    for i in range(1000):
+        pp.record_data((i, -i))
+    pp.series = [mock.MagicMock(), mock.MagicMock()]
+    pp.axis_x = mock.MagicMock()
+    pp.axis_y = mock.MagicMock()
+    pp.set_history_mode(True)
+    assert pp.history_mode
+    pp.axis_x.setRange.assert_called_once_with(0, 999)
+    points = pp.series[0].replace.call_args[0][0]
+    assert points[0].x() == 0
+    assert max(point.y() for point in points) == 999
+    points = pp.series[1].replace.call_args[0][0]
+    assert min(point.y() for point in points) == -999
+    assert pp.max_y == 1000
+    assert pp.min_y == -1000
+    pp.axis_x.reset_mock()
+    pp.set_history_mode(False)
+    assert not pp.history_mode
+    pp.axis_x.setRange.assert_called_once_with(0, pp.max_x)
+    pp.axis_x.setLabelFormat.assert_called_once_with("time")
+    points = pp.series[0].replace.call_args[0][0]
+    assert len(points) == pp.num_datapoints
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_set_view():
+    """
+    The view in history mode is kept within the session, and follows the
+    latest data if it's at the end of the session.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.request_redraw = mock.MagicMock()
+    for i in range(100):
+        pp.raw_data.append((i,))
+    assert pp.history_range() == (0, 100)
+    pp.set_view(50, 20)
+    assert pp.history_range() == (30, 50)
+    pp.set_view(5, 20)
+    assert pp.history_range() == (0, 20)
+    pp.set_view(50, 2)
+    assert pp.history_range() == (40, 50)
+    pp.set_view(200, 20)
+    assert (pp.view_end, pp.view_span) == (None, 20)
+    pp.raw_data.append((100,))
+    assert pp.history_range() == (81, 101)
+    pp.set_view(101, 500)
+    assert (pp.view_end, pp.view_span) == (None, None)
+    assert pp.request_redraw.call_count == 5
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_wheelEvent():
+    """
+    In history mode the mouse wheel zooms in and out around the pointer.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.set_view = mock.MagicMock()
+    pp.chart = mock.MagicMock()
+    pp.chart.plotArea.return_value = QRectF(0, 0, 100, 10)
+    event = mock.MagicMock()
+    event.pos.return_value = QPoint(50, 5)
+    event.angleDelta.return_value.y.return_value = 120
+    with mock.patch("mu.interface.panes.QChartView.wheelEvent") as mock_wheel:
+        pp.wheelEvent(event)
+    mock_wheel.assert_called_once_with(event)
+    pp.history_mode = True
+    for i in range(1000):
+        pp.raw_data.append((i,))
+    pp.wheelEvent(event)
+    pp.set_view.assert_called_once_with(900, 800)
+    event.angleDelta.return_value.y.return_value = -120
+    pp.wheelEvent(event)
+    pp.set_view.assert_called_with(1126, 1251)
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_drag():
+    """
+    In history mode dragging the chart pans the view.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.history_mode = True
+    pp.view_span = 100
+    pp.view_end = 500
+    for i in range(1000):
+        pp.raw_data.append((i,))
+    pp.set_view = mock.MagicMock()
+    pp.chart = mock.MagicMock()
+    pp.chart.plotArea.return_value = QRectF(0, 0, 200, 10)
+    event = mock.MagicMock()
+    event.button.return_value = mu.interface.panes.Qt.LeftButton
+    event.pos.return_value = QPoint(150, 5)
+    with mock.patch("mu.interface.panes.QChartView.mousePressEvent"):
+        pp.mousePressEvent(event)
+    assert pp.drag_start == (150, (400, 500))
+    event.pos.return_value = QPoint(50, 5)
+    with mock.patch("mu.interface.panes.QChartView.mouseMoveEvent"):
+        pp.mouseMoveEvent(event)
+    pp.set_view.assert_called_once_with(550, 100)
+    with mock.patch("mu.interface.panes.QChartView.mouseReleaseEvent"):
+        pp.mouseReleaseEvent(event)
+    assert pp.drag_start is None
+    with mock.patch("mu.interface.panes.QChartView.mouseMoveEvent"):
+        pp.mouseMoveEvent(event)
+    assert pp.set_view.call_count == 1
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_context_menu():
+    """
+    The context menu switches history mode on and off, and shows the whole
+    session in history mode.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.set_history_mode = mock.MagicMock()
+    pp.set_view = mock.MagicMock()
+    mock_menu = mock.MagicMock()
+    axes_action = mock.MagicMock()
+    history_action = mock.MagicMock()
+    whole_session_action = mock.MagicMock()
+    mock_menu.addAction.side_effect = [axes_action, history_action]
+    mock_menu.exec_.return_value = history_action
+    event = mock.MagicMock()
+    event.pos.return_value = QPoint(0, 0)
+    with mock.patch("mu.interface.panes.QMenu", return_value=mock_menu):
+        pp.contextMenuEvent(event)
+    history_action.setChecked.assert_called_once_with(False)
+    pp.set_history_mode.assert_called_once_with(True)
+    pp.history_mode = True
+    pp.raw_data.append((1,))
+    mock_menu.addAction.side_effect = [
+        axes_action,
+        history_action,
+        whole_session_action,
+    ]
+    mock_menu.exec_.return_value = whole_session_action
+    with mock.patch("mu.interface.panes.QMenu", return_value=mock_menu):
+        pp.contextMenuEvent(event)
+    pp.set_view.assert_called_once_with(1, 1)
+    assert pp.set_history_mode.call_count == 1
+    pp.set_separate_axes = mock.MagicMock()
+    mock_menu.addAction.side_effect = [
+        axes_action,
+        history_action,
+        whole_session_action,
+    ]
+    mock_menu.exec_.return_value = axes_action
+    with mock.patch("mu.interface.panes.QMenu", return_value=mock_menu):
+        pp.contextMenuEvent(event)
+    pp.set_separate_axes.assert_called_once_with(True)
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_process_tty_data_channels():
+    """
+    Dicts of named channels are plotted as a series per channel, named in
+    the legend. Channels missing from a dict keep their last value.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.process_tty_data(b'{"temp": 21.5, "humidity": 40}\r\n')
+    pp.process_tty_data(b"{'temp': 22}\r\n{'light': 7, 'temp': 23}\r\n")
+    assert pp.channels == ["temp", "humidity", "light"]
+    assert [s.name() for s in pp.series] == ["temp", "humidity", "light"]
+    assert list(pp.raw_data) == [(21.5, 40), (22, 40), (23, 40, 7)]
+    assert pp.timestamps is False
+    # Nothing is plotted for an empty dict.
+    pp.process_tty_data(b"{}\r\n")
+    assert len(pp.raw_data) == 3
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_process_tty_data_channels_quoted_values():
+    """
+    Quoted values, which may contain commas, aren't plotted and don't upset
+    the parsing of the rest of the dict.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.process_tty_data(b'{"name": "x,y", "v": 7, \'s\': \'a, b\'}\r\n')
+    assert pp.channels == ["v"]
+    assert list(pp.raw_data) == [(7,)]
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_process_tty_data_channels_time():
+    """
+    A channel named "t" is the time each datapoint was measured.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.process_tty_data(b'{"t": 0.5, "a": 1}\r\n{"t": 1.5, "a": 2}\r\n')
+    assert pp.timestamps is True
+    assert pp.channels == ["a"]
+    assert list(pp.raw_data) == [(0.5, 1), (1.5, 2)]
+    assert list(pp.times.latest(2)) == [0.5, 1.5]
+    assert len(pp.series) == 1
+    assert pp.axis_x.titleText() == "Time (seconds)"
+    pp.redraw()
+    assert pp.axis_x.min() == 0.5
+    assert pp.axis_x.max() == 1.5
+    assert [(p.x(), p.y()) for p in pp.series[0].pointsVector()] == [
+        (0.5, 1),
+        (1.5, 2),
+    ]
+    # Tuples still follow the plotter_timestamps setting.
+    pp.process_tty_data(b"(3, 4)\r\n")
+    assert pp.timestamps is False
+    assert list(pp.raw_data)[-1] == (3, 4)
+    assert pp.axis_x.titleText() == ""
+    pp.process_tty_data(b'{"a": 5}\r\n')
+    assert pp.timestamps is True
+    assert list(pp.raw_data)[-1] == (1.5, 5)
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_timestamps():
+    """
+    With the plotter_timestamps setting on, the first value of each tuple is
+    the time, plotted along the x axis rather than as a series.
+    """
+    mock_settings = {"plotter_timestamps": True, "plotter_window": 1000}
+    with mock.patch("mu.interface.panes.settings.settings", mock_settings):
+        pp = mu.interface.panes.PlotterPane()
+    assert pp.max_x == 1000
+    assert pp.lookback == 1000
+    pp.process_tty_data(b"(10, 1, 2)\r\n(7,)\r\n(12, 3, 4)\r\n")
+    # A time with nothing to plot against it is ignored.
+    assert list(pp.raw_data) == [(10, 1, 2), (12, 3, 4)]
+    assert len(pp.series) == 2
+    pp.redraw()
+    assert pp.axis_x.min() == 10
+    assert pp.axis_x.max() == 12
+    assert [p.x() for p in pp.series[1].pointsVector()] == [10, 12]
+    assert [p.y() for p in pp.series[1].pointsVector()] == [2, 4]
+    # History mode plots the values, not the time.
+    pp.set_history_mode(True)
+    assert [p.y() for p in pp.series[0].pointsVector()] == [1, 3]
+    pp.set_history_mode(False)
+    assert pp.axis_x.labelFormat() == "%.2f"
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_separate_axes():
+    """
+    Each series can have its own y axis, scaled to its own data.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.process_tty_data(b"(1, 1000)\r\n(2, 2000)\r\n")
+    pp.set_separate_axes(True)
+    assert len(pp.series_axes) == 2
+    assert not pp.axis_y.isVisible()
+    small, large = pp.series_axes
+    assert pp.series[0].attachedAxes()[-1] is small
+    assert small.min() < 1 and 2 <= small.max() < 10
+    assert large.min() < 1000 and 2000 <= large.max() < 3000
+    # A new series gets its own axis too, and loses it when it's removed.
+    pp.process_tty_data(b"(1, 2, 3)\r\n")
+    assert len(pp.series_axes) == 3
+    pp.process_tty_data(b"(1,)\r\n")
+    assert len(pp.series_axes) == 1
+    assert len(pp.chart.axes(Qt.Vertical)) == 2
+    # Nothing changes when the axes are already separate.
+    pp.set_separate_axes(True)
+    assert len(pp.series_axes) == 1
+    pp.set_separate_axes(False)
+    assert pp.series_axes == []
+    assert pp.axis_y.isVisible()
+    assert pp.chart.axes(Qt.Vertical) == [pp.axis_y]
+    assert pp.series[0].attachedAxes()[-1] is pp.axis_y
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_rescale_axis():
+    """
+    A series' own y axis grows as soon as the data falls outside it, but only
+    shrinks once the data spans much less of it.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    axis = mu.interface.panes.QValueAxis()
+    axis.setRange(0, 100)
+    pp.rescale_axis(axis, 10, 90)
+    assert (axis.min(), axis.max()) == (0, 100)
+    pp.rescale_axis(axis, 40, 70)
+    assert (axis.min(), axis.max()) == (0, 100)
+    pp.rescale_axis(axis, 50, 150)
+    assert (axis.min(), axis.max()) == (40, 160)
+    assert axis.labelFormat() == "%d"
+    pp.rescale_axis(axis, 1, 2)
+    assert (axis.min(), axis.max()) == pytest.approx((0.9, 2.1))
+    assert axis.labelFormat() == "%2.2f"
+    # Constant data still gets an axis with a span.
+    pp.rescale_axis(axis, 0, 0)
+    assert (axis.min(), axis.max()) == (-1, 1)
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_line_points():
+    """
+    More than two values for each pixel across the chart are decimated to
+    the minimum and maximum for each pixel.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.chart.plotArea = mock.MagicMock(return_value=QRectF(0, 0, 10, 10))
+    points = pp.line_points(range(20), list(range(20)))
+    assert len(points) == 20
+    points = pp.line_points(range(100), [i % 10 for i in range(100)])
+    assert len(points) == 20
+    assert [(p.x(), p.y()) for p in points[:4]] == [
+        (0, 0),
+        (0, 9),
+        (10, 0),
+        (10, 9),
+    ]
+
+
+@pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
+def test_PlotterPane_opengl():
+    """
+    Series are drawn with OpenGL, unless the plotter_opengl setting is off or
+    the platform can't.
+    """
+    with mock.patch(
+        "mu.interface.panes.QGuiApplication.platformName",
+        return_value="xcb",
+    ):
+        pp = mu.interface.panes.PlotterPane()
+        assert pp.use_opengl is True
+        with mock.patch(
+            "mu.interface.panes.settings.settings", {"plotter_opengl": False}
+        ):
+            assert mu.interface.panes.PlotterPane().use_opengl is False
+    assert mu.interface.panes.PlotterPane().use_opengl is False
+
+
 @pytest.mark.skipif(not CHARTS, reason="QtChart unavailable")
 def test_PlotterPane_set_theme():
     """
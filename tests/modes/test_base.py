@@ -2,16 +2,27 @@
 """
 Tests for the BaseMode class.
 """
+import hashlib
 import os
 import mu
 import pytest
 import mu.config
+from mu.contrib import microfs
 from mu.logic import Device
 from mu.modes.base import (
     BaseMode,
     MicroPythonMode,
     FileManager,
     REPLConnection,
+    SerialWorker,
+    CSVRecorder,
+    SessionRecorder,
+    SessionReplay,
+    read_capture,
+    CAPTURE_MAGIC,
+    CAPTURE_RECORD,
+    CAPTURE_RECEIVED,
+    CAPTURE_SENT,
 )
 import mu.settings
 from PyQt5.QtCore import QIODevice
@@ -213,17 +224,135 @@ def test_base_mode_write_csv(tmp_path):
     assert output == expected_output
 
 
-def test_base_on_data_flood():
+def test_base_mode_remove_plotter_recorder():
     """
-    Ensure the plotter is removed and a helpful message is displayed to the
-    user.
+    If the plotter's data has been streamed to CSV, removing the plotter
+    closes the recorder rather than writing the data again.
     """
-    editor = mock.MagicMock()
     view = mock.MagicMock()
-    bm = BaseMode(editor, view)
-    bm.on_data_flood()
+    bm = BaseMode(mock.MagicMock(), view)
+    recorder = mock.MagicMock()
+    bm.plotter_recorder = recorder
+    bm.write_plotter_data_to_csv = mock.MagicMock()
+    bm.remove_plotter()
+    recorder.close.assert_called_once_with()
+    assert bm.plotter_recorder is None
+    assert bm.write_plotter_data_to_csv.call_count == 0
     view.remove_plotter.assert_called_once_with()
-    assert view.show_message.call_count == 1
+
+
+def test_base_mode_remove_plotter_no_history():
+    """
+    If the plotter kept no history (and nothing was streamed) there's no
+    data to save.
+    """
+    view = mock.MagicMock()
+    view.plotter_pane.raw_data = None
+    bm = BaseMode(mock.MagicMock(), view)
+    bm.write_plotter_data_to_csv = mock.MagicMock()
+    bm.remove_plotter()
+    assert bm.write_plotter_data_to_csv.call_count == 0
+    view.remove_plotter.assert_called_once_with()
+
+
+def test_base_mode_record_plotter_data(tmp_path):
+    """
+    The plotter's data is streamed to CSV files in the data capture
+    directory, rotated at the size in the settings.
+    """
+    view = mock.MagicMock()
+    bm = BaseMode(mock.MagicMock(), view)
+    mocked_settings = mu.settings.UserSettings()
+    mocked_settings["data_capture_max_size"] = 0.5
+    with mock.patch.object(
+        bm, "workspace_dir", return_value=str(tmp_path)
+    ), mock.patch.object(mu.settings, "settings", mocked_settings):
+        bm.record_plotter_data()
+    recorder = bm.plotter_recorder
+    assert recorder.directory == str(tmp_path / "data_capture")
+    assert recorder.max_size == 512 * 1024
+    view.plotter_pane.data_recorded.connect.assert_called_once_with(
+        recorder.write_rows
+    )
+    recorder.close()
+
+
+def test_base_mode_record_plotter_data_fails():
+    """
+    If the CSV file can't be created the problem is logged.
+    """
+    view = mock.MagicMock()
+    bm = BaseMode(mock.MagicMock(), view)
+    bm.data_capture_dir = mock.MagicMock(return_value="foo")
+    with mock.patch(
+        "mu.modes.base.CSVRecorder", side_effect=OSError("Boom")
+    ), mock.patch("mu.modes.base.logger.error") as mock_error:
+        bm.record_plotter_data()
+    assert bm.plotter_recorder is None
+    assert mock_error.call_count == 1
+    assert view.plotter_pane.data_recorded.connect.call_count == 0
+
+
+def test_CSVRecorder(tmp_path):
+    """
+    Rows are written to a file named with the time they started, in
+    batches.
+    """
+    with mock.patch(
+        "mu.modes.base.time.strftime",
+        side_effect=lambda f: "20240101" if f == "%Y%m%d" else "20240101-1200",
+    ):
+        recorder = CSVRecorder(str(tmp_path))
+        recorder.flush_timer = mock.MagicMock()
+        recorder.flush_timer.isActive.return_value = False
+        recorder.write_rows([(1, 2.5), (3,)])
+        recorder.flush_timer.start.assert_called_once_with()
+        assert recorder.pending == [(1, 2.5), (3,)]
+        recorder.flush_timer.isActive.return_value = True
+        recorder.batch_size = 3
+        recorder.write_rows([(4, 5)])
+        assert recorder.pending == []
+        recorder.write_rows([(6,)])
+        recorder.close()
+        recorder.flush()
+    assert recorder.path == str(tmp_path / "20240101-1200.csv")
+    with open(recorder.path) as f:
+        assert f.read().splitlines() == ["1,2.5", "3", "4,5", "6"]
+
+
+def test_CSVRecorder_rotate(tmp_path):
+    """
+    A new file is started each day, and when the current file is bigger
+    than max_size. Files started in the same second are numbered.
+    """
+    day = "20240101"
+
+    def strftime(f):
+        return day if f == "%Y%m%d" else day + "-1200"
+
+    with mock.patch("mu.modes.base.time.strftime", side_effect=strftime):
+        recorder = CSVRecorder(str(tmp_path), max_size=10)
+        recorder.write_rows([(1, 2, 3)])
+        recorder.flush()
+        recorder.write_rows([(4, 5, 6, 7, 8)])
+        recorder.flush()
+        # Over max_size.
+        recorder.write_rows([(9,)])
+        recorder.flush()
+        day = "20240102"
+        recorder.write_rows([(10,)])
+        recorder.close()
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "20240101-1200-1.csv",
+        "20240101-1200.csv",
+        "20240102-1200.csv",
+    ]
+    with open(str(tmp_path / "20240101-1200.csv")) as f:
+        assert f.read().splitlines() == ["1,2,3", "4,5,6,7,8"]
+    with open(str(tmp_path / "20240101-1200-1.csv")) as f:
+        assert f.read().splitlines() == ["9"]
+    with open(str(tmp_path / "20240102-1200.csv")) as f:
+        assert f.read().splitlines() == ["10"]
 
 
 def test_base_mode_open_file():
@@ -395,6 +524,37 @@ def test_micropython_mode_port_path_unknown():
             mm.port_path("bar")
 
 
+def test_micropython_mode_stop():
+    """
+    Stopping the mode closes any connection to the device.
+    """
+    mm = MicroPythonMode(mock.MagicMock(), mock.MagicMock())
+    connection = mock.MagicMock()
+    mm.connection = connection
+    mm.stop()
+    connection.close.assert_called_once_with()
+    assert mm.connection is None
+    # Stopping again is harmless.
+    mm.stop()
+    assert connection.close.call_count == 1
+
+
+def test_micropython_mode_stop_closes_plotter_recorder(tmp_path):
+    """
+    Stopping the mode writes out the plotter data still being gathered, and
+    closes the CSV file, so no rows are lost when Mu quits.
+    """
+    mm = MicroPythonMode(mock.MagicMock(), mock.MagicMock())
+    recorder = CSVRecorder(str(tmp_path))
+    recorder.write_rows([(1, 2), (3, 4)])
+    mm.plotter_recorder = recorder
+    mm.stop()
+    assert mm.plotter_recorder is None
+    assert recorder.file is None
+    with open(recorder.path) as csv_file:
+        assert csv_file.read().splitlines() == ["1,2", "3,4"]
+
+
 def test_micropython_mode_add_repl_no_port():
     """
     If it's not possible to find a connected micro:bit then ensure a helpful
@@ -686,6 +846,7 @@ def test_micropython_mode_add_plotter(microbit):
     view.show_message = mock.MagicMock()
     view.add_micropython_plotter = mock.MagicMock()
     mm = MicroPythonMode(editor, view)
+    mm.record_plotter_data = mock.MagicMock()
     mock_repl_connection = mock.MagicMock()
     mock_connection_class = mock.MagicMock(return_value=mock_repl_connection)
     with mock.patch("mu.modes.base.REPLConnection", mock_connection_class):
@@ -693,21 +854,7 @@ def test_micropython_mode_add_plotter(microbit):
     view.show_message.assert_not_called()
     assert view.add_micropython_plotter.call_args[0][1] == mock_repl_connection
     mock_repl_connection.open.assert_called_once_with()
-
-
-def test_micropython_on_data_flood():
-    """
-    Ensure that the REPL is removed before calling the base on_data_flood
-    method.
-    """
-    editor = mock.MagicMock()
-    view = mock.MagicMock()
-    mm = MicroPythonMode(editor, view)
-    mm.remove_repl = mock.MagicMock()
-    with mock.patch("builtins.super") as mock_super:
-        mm.on_data_flood()
-        mm.remove_repl.assert_called_once_with()
-        mock_super().on_data_flood.assert_called_once_with()
+    mm.record_plotter_data.assert_called_once_with()
 
 
 def test_micropython_activate():
@@ -803,18 +950,52 @@ def test_FileManager_on_start_fails():
     fm.on_list_fail.emit.assert_called_once_with()
 
 
+def test_FileManager_on_start_session_timer():
+    """
+    When the thread starts, a timer to end the raw REPL session when idle is
+    set up in it.
+    """
+    fm = FileManager("/dev/ttyUSB0")
+    fm.ls = mock.MagicMock()
+    with mock.patch("mu.modes.base.Serial"):
+        fm.on_start()
+    assert fm.session_timer.isSingleShot()
+    assert fm.session_timer.interval() == fm.session_timeout
+
+
+def test_FileManager_session():
+    """
+    Operations share a raw REPL session, which is only ended once there are
+    no further operations for a while.
+    """
+    fm = FileManager("/dev/ttyUSB0")
+    fm.serial = mock.MagicMock()
+    fm.session_timer = mock.MagicMock()
+    with mock.patch("mu.modes.base.microfs") as mock_microfs:
+        mock_microfs.ls_tree.return_value = []
+        fm.ls()
+        mock_microfs.start_session.assert_called_once_with(fm.serial)
+        fm.session_timer.stop.assert_called_once_with()
+        fm.session_timer.start.assert_called_once_with()
+        assert mock_microfs.end_session.call_count == 0
+        fm.end_session()
+        mock_microfs.end_session.assert_called_once_with(fm.serial)
+
+
 def test_FileManager_ls():
     """
-    The on_list_files signal is emitted with a tuple of files when microfs.ls
-    completes successfully.
+    The on_list_files signal is emitted with a tuple of the entries in the
+    device's file system when microfs.ls_tree completes successfully.
     """
     fm = FileManager("/dev/ttyUSB0")
     fm.serial = mock.MagicMock()
     fm.on_list_files = mock.MagicMock()
-    mock_ls = mock.MagicMock(return_value=["foo.py", "bar.py"])
-    with mock.patch("mu.modes.base.microfs.ls", mock_ls):
+    entries = [("lib", True, 0), ("lib/foo.py", False, 12)]
+    mock_ls = mock.MagicMock(return_value=entries)
+    with mock.patch("mu.modes.base.microfs.ls_tree", mock_ls):
         fm.ls()
-    fm.on_list_files.emit.assert_called_once_with(("foo.py", "bar.py"))
+    mock_ls.assert_called_once_with(fm.serial)
+    fm.on_list_files.emit.assert_called_once_with(tuple(entries))
 
 
 def test_FileManager_ls_fail():
@@ -823,7 +1004,9 @@ def test_FileManager_ls_fail():
     """
     fm = FileManager("/dev/ttyUSB0")
     fm.on_list_fail = mock.MagicMock()
-    with mock.patch("mu.modes.base.microfs.ls", side_effect=Exception("boom")):
+    with mock.patch(
+        "mu.modes.base.microfs.ls_tree", side_effect=Exception("boom")
+    ):
         fm.ls()
     fm.on_list_fail.emit.assert_called_once_with()
 
@@ -839,10 +1022,27 @@ def test_fileManager_get():
     mock_get = mock.MagicMock()
     with mock.patch("mu.modes.base.microfs.get", mock_get):
         fm.get("foo.py", "bar.py")
-    mock_get.assert_called_once_with("foo.py", "bar.py", serial=fm.serial)
+    assert mock_get.call_args[0] == ("foo.py", "bar.py")
+    assert mock_get.call_args[1]["serial"] == fm.serial
     fm.on_get_file.emit.assert_called_once_with("foo.py")
 
 
+def test_FileManager_get_progress():
+    """
+    The on_get_progress signal is emitted as the file is got from the device.
+    """
+    fm = FileManager("/dev/ttyUSB0")
+    fm.serial = mock.MagicMock()
+    fm.on_get_progress = mock.MagicMock()
+
+    def get(device_filename, local_filename, serial, callback):
+        callback(256, 512)
+
+    with mock.patch("mu.modes.base.microfs.get", side_effect=get):
+        fm.get("foo.py", "bar.py")
+    fm.on_get_progress.emit.assert_called_once_with("foo.py", 256, 512)
+
+
 def test_FileManager_get_fail():
     """
     The on_get_fail signal is emitted when a problem is encountered.
@@ -872,6 +1072,20 @@ def test_FileManager_put():
     fm.on_put_file.emit.assert_called_once_with("foo.py")
 
 
+def test_FileManager_put_target():
+    """
+    The on_put_file signal is emitted with the name of the file on the device
+    when a target is given.
+    """
+    fm = FileManager("/dev/ttyUSB0")
+    fm.serial = mock.MagicMock()
+    fm.on_put_file = mock.MagicMock()
+    path = os.path.join("directory", "foo.py")
+    with mock.patch("mu.modes.base.microfs.put"):
+        fm.put(path, "main.py")
+    fm.on_put_file.emit.assert_called_once_with("main.py")
+
+
 def test_FileManager_put_fail():
     """
     The on_put_fail signal is emitted when a problem is encountered.
@@ -940,7 +1154,34 @@ def test_REPLConnection_open():
     mock_serial.setPortName.assert_called_once_with("COM0")
     mock_serial.setBaudRate.assert_called_once_with(9600)
     mock_serial.open.assert_called_once_with(QIODevice.ReadWrite)
+    # The serial port is handed over to a worker in its own thread.
+    worker = conn.worker
+    assert conn.worker_thread.isRunning()
+    assert worker.thread() == conn.worker_thread
+    mock_serial.moveToThread.assert_called_once_with(conn.worker_thread)
+    conn.close()
+    mock_serial.readyRead.connect.assert_called_once_with(worker.on_read)
+    assert conn.worker is None
+    assert conn.worker_thread is None
+
+
+def test_REPLConnection_open_not_threaded():
+    """
+    If the connection isn't threaded, the serial port is read in the GUI
+    thread.
+    """
+    mock_serial = mock.MagicMock()
+    mock_serial_class = mock.MagicMock(return_value=mock_serial)
+    with mock.patch("mu.modes.base.QSerialPort", mock_serial_class):
+        conn = REPLConnection("COM0", baudrate=9600)
+        conn.threaded = False
+        conn.open()
+        conn.write(b"Hello")
+    assert conn.worker is None
     mock_serial.readyRead.connect.assert_called_once_with(conn._on_serial_read)
+    mock_serial.write.assert_called_once_with(b"Hello")
+    conn.close()
+    mock_serial.close.assert_called_once_with()
 
 
 def test_REPLConnection_open_unable_to_connect():
@@ -983,6 +1224,7 @@ def test_REPLConnection_open_DTR_unset():
     # Check that DTR is set true with PySerial
     assert mock_Serial.dtr is True
     mock_Serial.close.assert_called_once_with()
+    conn.close()
 
 
 def test_REPLConnection_close():
@@ -1015,8 +1257,54 @@ def test_REPLConnection_on_serial_read():
         conn = REPLConnection("COM0")
 
     conn.data_received = mock.MagicMock()
+    conn.flush_timer = mock.MagicMock()
+    conn.flush_timer.isActive.return_value = False
     conn._on_serial_read()
-    conn.data_received.emit.assert_called_once_with(b"Hello")
+    assert conn.data_received.emit.call_count == 0
+    conn.flush_timer.start.assert_called_once_with()
+    conn.flush_timer.isActive.return_value = True
+    conn._on_serial_read()
+    assert conn.flush_timer.start.call_count == 1
+    conn.flush()
+    conn.data_received.emit.assert_called_once_with(b"HelloHello")
+    conn.flush()
+    assert conn.data_received.emit.call_count == 1
+
+
+def test_REPLConnection_on_serial_read_threshold():
+    """
+    Once more than flush_threshold bytes have been gathered they're delivered
+    without waiting for the timer.
+    """
+    mock_serial = mock.MagicMock()
+    mock_serial.readAll.return_value = b"X" * 4096
+    mock_serial_class = mock.MagicMock(return_value=mock_serial)
+
+    with mock.patch("mu.modes.base.QSerialPort", mock_serial_class):
+        conn = REPLConnection("COM0")
+
+    conn.data_received = mock.MagicMock()
+    conn._on_serial_read()
+    conn.data_received.emit.assert_called_once_with(b"X" * 4096)
+    assert not conn.flush_timer.isActive()
+
+
+def test_REPLConnection_close_flushes():
+    """
+    Data gathered but not yet delivered is delivered when the connection is
+    closed.
+    """
+    mock_serial = mock.MagicMock()
+    mock_serial.readAll.return_value = b"bye"
+    mock_serial_class = mock.MagicMock(return_value=mock_serial)
+
+    with mock.patch("mu.modes.base.QSerialPort", mock_serial_class):
+        conn = REPLConnection("COM0")
+
+    conn.data_received = mock.MagicMock()
+    conn._on_serial_read()
+    conn.close()
+    conn.data_received.emit.assert_called_once_with(b"bye")
 
 
 def test_REPLConnection_write():
@@ -1027,8 +1315,14 @@ def test_REPLConnection_write():
         conn = REPLConnection("COM0")
         conn.open()
         conn.write(b"Hello")
+        conn.write(b"World")
+        # Closing waits for the worker to write everything.
+        conn.close()
 
-    mock_serial.write.assert_called_once_with(b"Hello")
+    assert mock_serial.write.call_args_list == [
+        mock.call(b"Hello"),
+        mock.call(b"World"),
+    ]
 
 
 def test_REPLConnection_send_interrupt():
@@ -1039,9 +1333,205 @@ def test_REPLConnection_send_interrupt():
         conn = REPLConnection("COM0")
         conn.open()
         conn.send_interrupt()
+        conn.close()
+
+    assert mock_serial.write.call_args_list == [
+        mock.call(b"\x02"),  # CTRL-B
+        mock.call(b"\x03"),  # CTRL-C
+    ]
+
+
+def test_REPLConnection_worker_read():
+    """
+    Data read by the worker is gathered by the connection, which is only
+    signalled once until it has read the data.
+    """
+    mock_serial = mock.MagicMock()
+    mock_serial_class = mock.MagicMock(return_value=mock_serial)
+    with mock.patch("mu.modes.base.QSerialPort", mock_serial_class):
+        conn = REPLConnection("COM0")
+    worker = SerialWorker(mock_serial)
+    worker.data_ready = mock.MagicMock()
+    conn.worker = worker
+    conn.flush_timer = mock.MagicMock()
+    conn.flush_timer.isActive.return_value = False
+    conn.data_received = mock.MagicMock()
+    mock_serial.readAll.side_effect = [b"Hello", b"World", b"!"]
+    worker.on_read()
+    worker.on_read()
+    worker.data_ready.emit.assert_called_once_with()
+    conn._on_serial_read()
+    worker.on_read()
+    assert worker.data_ready.emit.call_count == 2
+    conn._on_serial_read()
+    conn.flush()
+    conn.data_received.emit.assert_called_once_with(b"HelloWorld!")
 
-    mock_serial.write.assert_any_call(b"\x02")  # CTRL-B
-    mock_serial.write.assert_any_call(b"\x03")  # CTRL-C
+
+def test_REPLConnection_recording(tmp_path):
+    """
+    When recording, the data delivered from and written to the device is
+    saved to a session capture.
+    """
+    path = str(tmp_path / "session.mucap")
+    mock_serial = mock.MagicMock()
+    mock_serial_class = mock.MagicMock(return_value=mock_serial)
+    with mock.patch("mu.modes.base.QSerialPort", mock_serial_class):
+        conn = REPLConnection("COM0")
+        conn.threaded = False
+        conn.open()
+        conn.start_recording(path)
+        conn.write(b"print(1)\r")
+        mock_serial.readAll.return_value = b"1\r\n>>> "
+        conn._on_serial_read()
+        conn.close()
+    assert conn.recorder is None
+    records = list(read_capture(path))
+    assert [(d, data) for _, d, data in records] == [
+        (CAPTURE_SENT, b"print(1)\r"),
+        (CAPTURE_RECEIVED, b"1\r\n>>> "),
+    ]
+    assert records[0][0] <= records[1][0]
+
+
+def test_REPLConnection_open_record_sessions(tmp_path):
+    """
+    If the record_sessions setting is on, sessions are recorded to the log
+    directory.
+    """
+    mock_serial = mock.MagicMock()
+    mock_serial_class = mock.MagicMock(return_value=mock_serial)
+    mocked_settings = mu.settings.UserSettings()
+    mocked_settings["record_sessions"] = True
+    with mock.patch(
+        "mu.modes.base.QSerialPort", mock_serial_class
+    ), mock.patch.object(mu.settings, "settings", mocked_settings), mock.patch(
+        "mu.modes.base.LOG_DIR", str(tmp_path)
+    ):
+        conn = REPLConnection("COM0")
+        conn.threaded = False
+        conn.open()
+        path = conn.recorder.path
+        conn.close()
+    assert os.path.dirname(path) == str(tmp_path)
+    assert path.endswith(".mucap")
+    assert list(read_capture(path)) == []
+
+
+def test_REPLConnection_start_recording_fails():
+    """
+    If the capture can't be created the problem is logged and nothing is
+    recorded.
+    """
+    conn = REPLConnection("COM0")
+    with mock.patch(
+        "mu.modes.base.SessionRecorder", side_effect=OSError("Boom")
+    ), mock.patch("mu.modes.base.logger.error") as mock_error:
+        conn.start_recording("foo.mucap")
+    assert conn.recorder is None
+    assert mock_error.call_count == 1
+
+
+def test_read_capture_not_a_capture(tmp_path):
+    """
+    A ValueError is raised if the file isn't a session capture.
+    """
+    path = tmp_path / "capture.bin"
+    path.write_bytes(b"Hello")
+    with pytest.raises(ValueError):
+        list(read_capture(str(path)))
+
+
+def test_read_capture_truncated(tmp_path):
+    """
+    A capture cut short part way through a record yields the complete
+    records.
+    """
+    path = str(tmp_path / "session.mucap")
+    recorder = SessionRecorder(path)
+    recorder.record(CAPTURE_RECEIVED, b"Hello")
+    recorder.record(CAPTURE_RECEIVED, b"World")
+    recorder.close()
+    recorder.record(CAPTURE_RECEIVED, b"Ignored")
+    with open(path, "rb") as capture:
+        data = capture.read()
+    with open(path, "wb") as capture:
+        capture.write(data[:-2])
+    records = list(read_capture(path))
+    assert [data for _, _, data in records] == [b"Hello"]
+    with open(path, "wb") as capture:
+        capture.write(data[:-7])
+    assert list(read_capture(path)) == records
+
+
+def make_capture(path, records):
+    """
+    Write a session capture of the given (timestamp, direction, data)
+    records.
+    """
+    with open(path, "wb") as capture:
+        capture.write(CAPTURE_MAGIC)
+        for timestamp, direction, data in records:
+            capture.write(CAPTURE_RECORD.pack(timestamp, direction, len(data)))
+            capture.write(data)
+
+
+def test_SessionReplay_full_speed(tmp_path):
+    """
+    At full speed all the data received in the session is played back at
+    once. Data sent to the device isn't.
+    """
+    path = str(tmp_path / "session.mucap")
+    make_capture(
+        path,
+        [
+            (0.0, CAPTURE_RECEIVED, b"Hello"),
+            (1.0, CAPTURE_SENT, b"\x03"),
+            (2.0, CAPTURE_RECEIVED, b"World"),
+        ],
+    )
+    replay = SessionReplay(path, speed=0)
+    replay.data_received = mock.MagicMock()
+    replay.finished = mock.MagicMock()
+    replay.open()
+    assert replay.data_received.emit.call_args_list == [
+        mock.call(b"Hello"),
+        mock.call(b"World"),
+    ]
+    replay.finished.emit.assert_called_once_with()
+    # Writing to the device is ignored.
+    replay.write(b"Hello")
+    replay.send_interrupt()
+    replay.send_commands(["print(1)"])
+
+
+def test_SessionReplay_timed(tmp_path):
+    """
+    At other speeds the data is played back at the time it was received,
+    scaled by the speed.
+    """
+    path = str(tmp_path / "session.mucap")
+    make_capture(
+        path,
+        [
+            (0.0, CAPTURE_RECEIVED, b"Hello"),
+            (2.0, CAPTURE_RECEIVED, b"World"),
+        ],
+    )
+    replay = SessionReplay(path, speed=2.0)
+    replay.data_received = mock.MagicMock()
+    replay.finished = mock.MagicMock()
+    replay.timer = mock.MagicMock()
+    with mock.patch("mu.modes.base.time.monotonic", return_value=10.0):
+        replay.open()
+    replay.data_received.emit.assert_called_once_with(b"Hello")
+    replay.timer.start.assert_called_once_with(1000)
+    with mock.patch("mu.modes.base.time.monotonic", return_value=11.0):
+        replay.play()
+    replay.data_received.emit.assert_called_with(b"World")
+    replay.finished.emit.assert_called_once_with()
+    replay.close()
+    replay.timer.stop.assert_called_once_with()
 
 
 def test_REPLConnection_execute():
@@ -1062,6 +1552,54 @@ def test_REPLConnection_execute():
         assert mock_timer.singleShot.call_count == 1
 
 
+def test_REPLConnection_execute_threaded():
+    """
+    Ensure all the commands are handed to the worker at once, to be written
+    in order, rather than scheduled one at a time in the GUI thread.
+    """
+    mock_serial = mock.MagicMock()
+    mock_serial_class = mock.MagicMock(return_value=mock_serial)
+    with mock.patch("mu.modes.base.QSerialPort", mock_serial_class):
+        conn = REPLConnection("COM0")
+        conn.open()
+        with mock.patch("mu.modes.base.QTimer") as mock_timer:
+            conn.execute([b"A", b"B", b"C"])
+        conn.close()
+    assert mock_timer.singleShot.call_count == 0
+    assert mock_serial.write.call_args_list == [
+        mock.call(b"A"),
+        mock.call(b"B"),
+        mock.call(b"C"),
+    ]
+
+
+def test_REPLConnection_close_from_worker_thread():
+    """
+    Ensure closing the connection from the worker's own thread closes the
+    serial port directly, rather than blocking on (and waiting for) itself.
+    """
+    mock_serial = mock.MagicMock()
+    mock_serial_class = mock.MagicMock(return_value=mock_serial)
+    with mock.patch("mu.modes.base.QSerialPort", mock_serial_class):
+        conn = REPLConnection("COM0")
+    conn.data_received = mock.MagicMock()
+    conn.close_requested = mock.MagicMock()
+    worker = mock.MagicMock()
+    worker.read.return_value = [b"bye"]
+    worker_thread = mock.MagicMock()
+    conn.worker = worker
+    conn.worker_thread = worker_thread
+    with mock.patch("mu.modes.base.QThread") as mock_qthread:
+        mock_qthread.currentThread.return_value = worker_thread
+        conn.close()
+    worker.close.assert_called_once_with()
+    worker_thread.quit.assert_called_once_with()
+    assert worker_thread.wait.call_count == 0
+    assert conn.close_requested.emit.call_count == 0
+    conn.data_received.emit.assert_called_once_with(b"bye")
+    assert conn.worker is None
+
+
 def test_REPLConnection_send_commands():
     """
     Ensure the list of commands is correctly encoded and bound by control
@@ -1089,3 +1627,166 @@ def test_REPLConnection_send_commands():
         b"\x02",  # Leave raw mode.
     ]
     conn.execute.assert_called_once_with(expected)
+
+
+def test_FileManager_put_files(tmp_path):
+    """
+    A batch of files is put onto the device reporting the status of each
+    file and the progress, and then the files on the device are listed.
+    """
+    foo = tmp_path / "foo.py"
+    foo.write_bytes(b"x" * 100)
+    bar = tmp_path / "bar.py"
+    bar.write_bytes(b"x" * 50)
+    fm = FileManager("/dev/ttyUSB0")
+    fm.serial = mock.MagicMock()
+    fm.ls = mock.MagicMock()
+    fm.on_transfer_file = mock.MagicMock()
+    fm.on_transfer_progress = mock.MagicMock()
+    fm.on_put_fail = mock.MagicMock()
+    files = [(str(foo), "foo.py"), (str(bar), "lib/bar.py")]
+    with mock.patch(
+        "mu.modes.base.microfs.put", side_effect=[True, IOError("boom")]
+    ) as mock_put:
+        fm.put_files(files)
+    assert mock_put.call_count == 2
+    fm.on_transfer_file.emit.assert_called_once_with("foo.py")
+    fm.on_put_fail.emit.assert_called_once_with(str(bar))
+    progress = fm.on_transfer_progress.emit.call_args_list
+    assert [call[0][:2] for call in progress] == [(100, 150), (150, 150)]
+    fm.ls.assert_called_once_with()
+
+
+def test_FileManager_put_files_recovers_from_failure(tmp_path):
+    """
+    If putting a file fails part way, the session is reset so the device is
+    put into raw mode again (and its leftover output dropped) before the
+    next file is put.
+    """
+    foo = tmp_path / "foo.py"
+    foo.write_bytes(b"x" * 100)
+    bar = tmp_path / "bar.py"
+    bar.write_bytes(b"x" * 50)
+    fm = FileManager("/dev/ttyUSB0")
+    fm.serial = mock.MagicMock()
+    fm.ls = mock.MagicMock()
+    fm.on_transfer_file = mock.MagicMock()
+    fm.on_put_fail = mock.MagicMock()
+    raw_states = []
+
+    def put(local_filename, target, serial):
+        microfs._enter_raw(serial)
+        raw_states.append(microfs._SESSIONS[serial])
+        if local_filename == str(foo):
+            raise IOError("boom")
+        return True
+
+    files = [(str(foo), "foo.py"), (str(bar), "bar.py")]
+    with mock.patch("mu.modes.base.microfs.put", side_effect=put), mock.patch(
+        "mu.contrib.microfs.raw_on"
+    ) as mock_raw_on:
+        fm.put_files(files)
+        fm.end_session()
+    fm.on_put_fail.emit.assert_called_once_with(str(foo))
+    fm.on_transfer_file.emit.assert_called_once_with("bar.py")
+    fm.serial.reset_input_buffer.assert_called_once_with()
+    # Raw mode was entered afresh for the second file.
+    assert mock_raw_on.call_count == 2
+    assert raw_states == [True, True]
+    assert fm.serial not in microfs._SESSIONS
+
+
+def test_FileManager_reset_session_fail():
+    """
+    A problem resetting the session is logged rather than raised.
+    """
+    fm = FileManager("/dev/ttyUSB0")
+    with mock.patch("mu.modes.base.logger.error") as mock_error:
+        fm.reset_session()
+    assert mock_error.call_count == 1
+
+
+def test_FileManager_get_files(tmp_path):
+    """
+    A batch of files is got from the device reporting the status of each
+    file and the progress, and then the files are listed.
+    """
+    fm = FileManager("/dev/ttyUSB0")
+    fm.serial = mock.MagicMock()
+    fm.ls = mock.MagicMock()
+    fm.on_transfer_file = mock.MagicMock()
+    fm.on_transfer_progress = mock.MagicMock()
+
+    def get(device_filename, local_filename, serial, callback):
+        with open(local_filename, "wb") as local:
+            local.write(b"x" * 10)
+        callback(10, 10)
+
+    files = [
+        ("foo.py", str(tmp_path / "foo.py")),
+        ("bar.py", str(tmp_path / "bar.py")),
+    ]
+    with mock.patch("mu.modes.base.microfs.get", side_effect=get):
+        fm.get_files(files)
+    assert fm.on_transfer_file.emit.call_count == 2
+    progress = fm.on_transfer_progress.emit.call_args_list
+    assert [call[0][:2] for call in progress] == [(10, 10), (20, 20)]
+    fm.ls.assert_called_once_with()
+
+
+def test_FileManager_sync_files(tmp_path):
+    """
+    Only the local files whose hash is different on the device are put onto
+    it.
+    """
+    foo = tmp_path / "foo.py"
+    foo.write_bytes(b"foo")
+    bar = tmp_path / "bar.py"
+    bar.write_bytes(b"bar")
+    fm = FileManager("/dev/ttyUSB0")
+    fm.serial = mock.MagicMock()
+    fm.put_files = mock.MagicMock()
+    fm.on_sync_files = mock.MagicMock()
+    device_hashes = {
+        "foo.py": hashlib.sha256(b"foo").hexdigest(),
+        "bar.py": hashlib.sha256(b"old").hexdigest(),
+    }
+    files = [(str(foo), "foo.py"), (str(bar), "bar.py")]
+    with mock.patch(
+        "mu.modes.base.microfs.hashes", return_value=device_hashes
+    ):
+        fm.sync_files(files)
+    fm.put_files.assert_called_once_with([(str(bar), "bar.py")])
+    fm.on_sync_files.emit.assert_called_once_with(1, 2)
+
+
+def test_FileManager_sync_files_unreadable(tmp_path):
+    """
+    A local file that can't be read is put anyway (so the failure is
+    reported), even if the device has no such file either.
+    """
+    missing = str(tmp_path / "missing.py")
+    fm = FileManager("/dev/ttyUSB0")
+    fm.serial = mock.MagicMock()
+    fm.put_files = mock.MagicMock()
+    with mock.patch(
+        "mu.modes.base.microfs.hashes", return_value={"missing.py": None}
+    ):
+        fm.sync_files([(missing, "missing.py")])
+    fm.put_files.assert_called_once_with([(missing, "missing.py")])
+
+
+def test_FileManager_sync_files_no_device_hashes(tmp_path):
+    """
+    If the files can't be hashed on the device, all of them are put.
+    """
+    foo = tmp_path / "foo.py"
+    foo.write_bytes(b"foo")
+    fm = FileManager("/dev/ttyUSB0")
+    fm.serial = mock.MagicMock()
+    fm.put_files = mock.MagicMock()
+    with mock.patch(
+        "mu.modes.base.microfs.hashes", side_effect=IOError("no hashlib")
+    ):
+        fm.sync_files([(str(foo), "foo.py")])
+    fm.put_files.assert_called_once_with([(str(foo), "foo.py")])
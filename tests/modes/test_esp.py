@@ -273,17 +273,6 @@ def test_run(esp_mode):
     esp_mode.set_buttons.assert_called_once_with(files=False)
 
 
-def test_on_data_flood(esp_mode):
-    """
-    Ensure the "Files" button is re-enabled before calling the base method.
-    """
-    esp_mode.set_buttons = mock.MagicMock()
-    with mock.patch("builtins.super") as mock_super:
-        esp_mode.on_data_flood()
-        esp_mode.set_buttons.assert_called_once_with(files=True)
-        mock_super().on_data_flood.assert_called_once_with()
-
-
 def test_toggle_plotter(esp_mode):
     """
     Ensure the plotter is toggled on if the file system pane is absent.
@@ -2,12 +2,18 @@
 """
 Tests for the micro:bit mode.
 """
+import hashlib
 import os
 import os.path
 import pytest
 from mu.config import HOME_DIRECTORY
 from mu.logic import Device
-from mu.modes.microbit import MicrobitMode, DeviceFlasher, can_minify
+from mu.modes.microbit import (
+    MicrobitMode,
+    DeviceFlasher,
+    AutoFlashWatcher,
+    can_minify,
+)
 from mu.modes.api import MICROBIT_APIS, SHARED_APIS
 from mu.contrib import uflash
 from unittest import mock
@@ -17,6 +23,16 @@ from tokenize import TokenError
 TEST_ROOT = os.path.split(os.path.dirname(__file__))[0]
 
 
+@pytest.fixture(autouse=True)
+def autoflash_watcher():
+    """
+    Ensure flashing with a mocked editor (where auto-flashing looks enabled)
+    doesn't start watching files for real.
+    """
+    with mock.patch("mu.modes.microbit.AutoFlashWatcher") as watcher:
+        yield watcher
+
+
 @pytest.fixture()
 def microbit():
     # Board ID in Serial Number for micro:bit v1.3 and v1.3B
@@ -76,6 +92,153 @@ def test_DeviceFlasher_run_fail():
     df.on_flash_fail.emit.assert_called_once_with(str(Exception("Boom")))
 
 
+def test_DeviceFlasher_run_parallel():
+    """
+    Ensure several micro:bits are flashed in parallel, reporting the progress
+    of each one via the per-device signals.
+    """
+    df = DeviceFlasher(["path1", "path2"], "script", None)
+    df.on_device_flashed = mock.MagicMock()
+    df.on_device_fail = mock.MagicMock()
+    mock_flash = mock.MagicMock()
+
+    def flash(**kwargs):
+        kwargs["callback"](os.path.join("path1", "micropython.hex"), None)
+        kwargs["callback"](
+            os.path.join("path2", "micropython.hex"), IOError("Boom")
+        )
+
+    mock_flash.flash.side_effect = flash
+    mock_flash._PARALLEL_FLASH_WORKERS = 8
+    with mock.patch("mu.modes.microbit.uflash", mock_flash):
+        df.run()
+    assert mock_flash.flash.call_args[1]["paths_to_microbits"] == [
+        "path1",
+        "path2",
+    ]
+    assert mock_flash.flash.call_args[1]["parallel"] == 2
+    df.on_device_flashed.emit.assert_called_once_with("path1")
+    df.on_device_fail.emit.assert_called_once_with("path2", "Boom")
+
+
+def test_DeviceFlasher_run_parallel_bounded():
+    """
+    Ensure no more micro:bits are flashed at the same time than uflash's
+    pool of workers allows, however many are attached.
+    """
+    paths = ["path{}".format(i) for i in range(20)]
+    df = DeviceFlasher(paths, "script", None)
+    with mock.patch("mu.modes.microbit.uflash.flash") as mock_flash:
+        df.run()
+    assert mock_flash.call_args[1]["paths_to_microbits"] == paths
+    assert mock_flash.call_args[1]["parallel"] == 8
+    assert uflash._PARALLEL_FLASH_WORKERS == 8
+
+
+def test_DeviceFlasher_run_parallel_runtime(tmp_path):
+    """
+    Ensure a custom runtime is written to all the micro:bits at once, and
+    failing devices cause the on_flash_fail signal to be emitted.
+    """
+    runtime = tmp_path / "runtime.hex"
+    runtime.write_text(":00000001FF\n")
+    paths = [str(tmp_path / "MICROBIT"), str(tmp_path / "MICROBIT1")]
+    os.mkdir(paths[0])
+    df = DeviceFlasher(paths, None, str(runtime))
+    df.on_device_flashed = mock.MagicMock()
+    df.on_device_fail = mock.MagicMock()
+    df.on_flash_fail = mock.MagicMock()
+    df.run()
+    with open(os.path.join(paths[0], "micropython.hex")) as hex_file:
+        assert hex_file.read() == ":00000001FF\n"
+    df.on_device_flashed.emit.assert_called_once_with(paths[0])
+    assert df.on_device_fail.emit.call_args[0][0] == paths[1]
+    assert df.on_flash_fail.emit.call_count == 1
+
+
+def test_AutoFlashWatcher_run():
+    """
+    Ensure the on_file_changed signal is emitted when the watched file
+    changes, until the thread is asked to stop.
+    """
+    afw = AutoFlashWatcher("foo.py")
+    afw.on_file_changed = mock.MagicMock()
+    afw.isInterruptionRequested = mock.MagicMock(
+        side_effect=[False, False, True]
+    )
+    mock_watcher = mock.MagicMock()
+    mock_watcher.wait.side_effect = [True, False]
+    with mock.patch(
+        "mu.modes.microbit.uflash.FileWatcher", return_value=mock_watcher
+    ):
+        afw.run()
+    afw.on_file_changed.emit.assert_called_once_with("foo.py")
+    mock_watcher.close.assert_called_once_with()
+
+
+def test_autoflash():
+    """
+    Ensure a saved file is only auto-flashed if it's in the current tab and
+    the micro:bit isn't already being flashed.
+    """
+    view = mock.MagicMock()
+    view.current_tab.path = "foo.py"
+    mm = MicrobitMode(mock.MagicMock(), view)
+    mm.flash = mock.MagicMock()
+    mm.autoflash("bar.py")
+    mm.flash_thread = mock.MagicMock()
+    mm.autoflash("foo.py")
+    assert mm.flash.call_count == 0
+    mm.flash_thread = None
+    mm.autoflash("foo.py")
+    mm.flash.assert_called_once_with()
+
+
+def test_start_and_stop_autoflash():
+    """
+    Ensure the watcher thread is only replaced when watching another file,
+    and stopped when no longer needed.
+    """
+    mm = MicrobitMode(mock.MagicMock(), mock.MagicMock())
+    mock_watcher_class = mock.MagicMock()
+    with mock.patch("mu.modes.microbit.AutoFlashWatcher", mock_watcher_class):
+        mm.start_autoflash("foo.py")
+        watcher = mm.autoflash_thread
+        watcher.path = "foo.py"
+        mm.start_autoflash("foo.py")
+        assert mock_watcher_class.call_count == 1
+        mock_watcher_class.assert_called_once_with("foo.py", mm)
+        watcher.on_file_changed.connect.assert_called_once_with(mm.autoflash)
+        watcher.finished.connect.assert_called_once_with(watcher.deleteLater)
+        watcher.start.assert_called_once_with()
+        mm.stop_autoflash()
+    watcher.on_file_changed.disconnect.assert_called_once_with(mm.autoflash)
+    watcher.requestInterruption.assert_called_once_with()
+    # The UI isn't blocked waiting for the watcher to stop.
+    watcher.wait.assert_called_once_with(mm.autoflash_stop_timeout)
+    assert mm.autoflash_thread is None
+
+
+def test_flash_starts_and_stops_autoflash(microbit):
+    """
+    If auto-flashing is enabled, flashing a saved file starts watching it,
+    otherwise any watcher is stopped.
+    """
+    view = mock.MagicMock()
+    view.current_tab.path = "foo.py"
+    editor = mock.MagicMock()
+    editor.microbit_autoflash = True
+    mm = MicrobitMode(editor, view)
+    mm.start_autoflash = mock.MagicMock()
+    mm.stop_autoflash = mock.MagicMock()
+    mm.minify_if_needed = mock.MagicMock(side_effect=Exception("Stop"))
+    mm.flash()
+    mm.start_autoflash.assert_called_once_with("foo.py")
+    editor.microbit_autoflash = False
+    mm.flash()
+    mm.stop_autoflash.assert_called_once_with()
+
+
 def test_microbit_mode():
     """
     Sanity check for setting up the mode.
@@ -169,6 +332,206 @@ def test_flash_with_attached_device_has_latest_firmware_v1(microbit):
         mm.copy_main.assert_called_once_with(b"foo")
 
 
+def test_flash_with_attached_device_has_recorded_runtime(microbit):
+    """
+    If Mu already flashed its runtime onto the board there's no need to check
+    the version of MicroPython on it, just call copy_main and record it.
+    """
+    runtime_hash = uflash.get_runtime_image().digest
+    with mock.patch(
+        "mu.modes.microbit.uflash.find_microbit", return_value="/path/microbit"
+    ), mock.patch("mu.modes.microbit.microfs.version") as version, mock.patch(
+        "mu.modes.microbit.microfs.execute", return_value=(b"-1\r\n", b"")
+    ), mock.patch(
+        "mu.modes.microbit.os.path.exists", return_value=True
+    ):
+        view = mock.MagicMock()
+        view.current_tab.text = mock.MagicMock(return_value="foo")
+        editor = mock.MagicMock()
+        editor.minify = False
+        editor.microbit_runtime = ""
+        editor.current_device = microbit
+        mm = MicrobitMode(editor, view)
+        mm.flashed = {
+            microbit.serial_number: {"runtime": runtime_hash, "filesystem": ""}
+        }
+        mm.copy_main = mock.MagicMock()
+        mm.set_buttons = mock.MagicMock()
+        mm.flash()
+    assert version.call_count == 0
+    mm.copy_main.assert_called_once_with(b"foo")
+    assert mm.flashed[microbit.serial_number] == {
+        "runtime": runtime_hash,
+        "filesystem": hashlib.sha256(b"foo").hexdigest(),
+    }
+
+
+def test_flash_with_attached_device_has_recorded_script(microbit):
+    """
+    If Mu already flashed its runtime and the same script onto the board,
+    there's no need to copy main.py again, the device is just restarted.
+    """
+    runtime_hash = uflash.get_runtime_image().digest
+    with mock.patch(
+        "mu.modes.microbit.uflash.find_microbit", return_value="/path/microbit"
+    ), mock.patch(
+        "mu.modes.microbit.microfs.execute", return_value=(b"3\r\n", b"")
+    ), mock.patch(
+        "mu.modes.microbit.os.path.exists", return_value=True
+    ):
+        view = mock.MagicMock()
+        view.current_tab.text = mock.MagicMock(return_value="foo")
+        editor = mock.MagicMock()
+        editor.minify = False
+        editor.microbit_runtime = ""
+        editor.current_device = microbit
+        mm = MicrobitMode(editor, view)
+        mm.flashed = {
+            microbit.serial_number: {
+                "runtime": runtime_hash,
+                "filesystem": hashlib.sha256(b"foo").hexdigest(),
+            }
+        }
+        mm.copy_main = mock.MagicMock()
+        mm.reset_device = mock.MagicMock()
+        mm.flash()
+        assert mm.copy_main.call_count == 0
+        mm.reset_device.assert_called_once_with()
+        # If the device can't be restarted, what's on it is checked next time.
+        mm.reset_device.side_effect = IOError("Boom")
+        mm.flash_failed = mock.MagicMock()
+        mm.flash()
+    assert mm.flash_failed.call_count == 1
+    assert mm.flashed == {}
+
+
+def test_flash_with_attached_device_recorded_script_replaced(microbit):
+    """
+    If the record says the script is on the board but the board has a
+    different main.py (it was flashed elsewhere), the script is copied again.
+    """
+    runtime_hash = uflash.get_runtime_image().digest
+    with mock.patch(
+        "mu.modes.microbit.uflash.find_microbit", return_value="/path/microbit"
+    ), mock.patch("mu.modes.microbit.microfs.version") as version, mock.patch(
+        "mu.modes.microbit.microfs.execute", return_value=(b"1234\r\n", b"")
+    ), mock.patch(
+        "mu.modes.microbit.os.path.exists", return_value=True
+    ):
+        view = mock.MagicMock()
+        view.current_tab.text = mock.MagicMock(return_value="foo")
+        editor = mock.MagicMock()
+        editor.minify = False
+        editor.microbit_runtime = ""
+        editor.current_device = microbit
+        mm = MicrobitMode(editor, view)
+        mm.flashed = {
+            microbit.serial_number: {
+                "runtime": runtime_hash,
+                "filesystem": hashlib.sha256(b"foo").hexdigest(),
+            }
+        }
+        mm.copy_main = mock.MagicMock()
+        mm.reset_device = mock.MagicMock()
+        mm.set_buttons = mock.MagicMock()
+        mm.flash()
+    assert version.call_count == 0
+    assert mm.reset_device.call_count == 0
+    mm.copy_main.assert_called_once_with(b"foo")
+
+
+def test_flash_with_attached_device_recorded_but_erased(microbit):
+    """
+    If the record matches but the board no longer runs MicroPython (it was
+    erased or reflashed elsewhere), the record is dropped and the board gets
+    a full flash.
+    """
+    runtime_hash = uflash.get_runtime_image().digest
+    with mock.patch(
+        "mu.modes.microbit.uflash.find_microbit", return_value="/path/microbit"
+    ), mock.patch(
+        "mu.modes.microbit.microfs.execute", side_effect=IOError("No REPL")
+    ), mock.patch(
+        "mu.modes.microbit.microfs.version", side_effect=IOError("No REPL")
+    ), mock.patch(
+        "mu.modes.microbit.os.path.exists", return_value=True
+    ):
+        view = mock.MagicMock()
+        view.current_tab.text = mock.MagicMock(return_value="foo")
+        editor = mock.MagicMock()
+        editor.minify = False
+        editor.microbit_runtime = ""
+        editor.current_device = microbit
+        mm = MicrobitMode(editor, view)
+        mm.flashed = {
+            microbit.serial_number: {
+                "runtime": runtime_hash,
+                "filesystem": hashlib.sha256(b"foo").hexdigest(),
+            }
+        }
+        mm.copy_main = mock.MagicMock()
+        mm.reset_device = mock.MagicMock()
+        mm.set_buttons = mock.MagicMock()
+        mm.flash_and_send = mock.MagicMock()
+        mm.flash()
+    assert mm.copy_main.call_count == 0
+    assert mm.reset_device.call_count == 0
+    mm.flash_and_send.assert_called_once_with(b"foo", "/path/microbit")
+    assert mm.flashed == {}
+
+
+def test_get_device_main_size():
+    """
+    Ensure the size of main.py on the device is returned, or -1 if missing.
+    """
+    mm = MicrobitMode(mock.MagicMock(), mock.MagicMock())
+    with mock.patch(
+        "mu.modes.microbit.microfs.execute", return_value=(b"42\r\n", b"")
+    ):
+        assert mm.get_device_main_size() == 42
+    with mock.patch(
+        "mu.modes.microbit.microfs.execute", return_value=(b"-1\r\n", b"")
+    ):
+        assert mm.get_device_main_size() == -1
+    with mock.patch(
+        "mu.modes.microbit.microfs.execute", return_value=(b"", b"Boom")
+    ), pytest.raises(IOError):
+        mm.get_device_main_size()
+
+
+def test_forget_device_on_connect_and_disconnect(microbit):
+    """
+    Ensure whatever was recorded as flashed onto a device is forgotten when
+    it's unplugged or plugged in again.
+    """
+    editor = mock.MagicMock()
+    mm = MicrobitMode(editor, mock.MagicMock())
+    devices = editor.connected_devices
+    devices.device_connected.connect.assert_called_once_with(mm.forget_device)
+    devices.device_disconnected.connect.assert_called_once_with(
+        mm.forget_device
+    )
+    mm.flashed = {microbit.serial_number: {"runtime": "a", "filesystem": "b"}}
+    mm.forget_device(microbit)
+    assert mm.flashed == {}
+
+
+def test_reset_device():
+    """
+    Ensure the device is restarted over serial.
+    """
+    editor = mock.MagicMock()
+    mm = MicrobitMode(editor, mock.MagicMock())
+    mock_serial = mock.MagicMock()
+    with mock.patch(
+        "mu.modes.microbit.microfs.get_serial", return_value=mock_serial
+    ):
+        mm.reset_device()
+    mock_serial.write.assert_called_with(b"microbit.reset()\r\n")
+    mock_serial.close.assert_called_once_with()
+    assert editor.show_status_message.call_count == 1
+
+
 def test_flash_with_attached_device_has_latest_firmware_v2(microbit):
     """
     There's NO need to use the DeviceFlasher if the board already has the
@@ -845,6 +1208,39 @@ def test_flash_finished_copy_main():
     mm.copy_main.assert_called_once_with(b"foo")
 
 
+def test_flash_finished_records_flashed_device():
+    """
+    Ensure what was flashed onto the device is recorded once the flashing
+    thread is finished and the script copied.
+    """
+    mm = MicrobitMode(mock.MagicMock(), mock.MagicMock())
+    mm.python_script = b"foo"
+    mm.copy_main = mock.MagicMock()
+    mm.set_buttons = mock.MagicMock()
+    mm.flash_record = ("9900ABCD", "abc", b"")
+    mm.flash_finished()
+    assert mm.flashed["9900ABCD"] == {
+        "runtime": "abc",
+        "filesystem": hashlib.sha256(b"foo").hexdigest(),
+    }
+    assert mm.flash_record is None
+
+
+def test_flash_failed_forgets_flashed_device():
+    """
+    Ensure the record for a device is dropped if flashing it failed, since
+    it's unknown what's on it.
+    """
+    mm = MicrobitMode(mock.MagicMock(), mock.MagicMock())
+    mm.flashed = {"9900ABCD": {"runtime": "abc", "filesystem": "def"}}
+    mm.set_buttons = mock.MagicMock()
+    mm.flash_record = ("9900ABCD", "abc", b"")
+    mm.flash_failed("Boom")
+    assert mm.flashed == {}
+    assert not mm.is_runtime_flashed("9900ABCD", "abc")
+    assert mm.flash_record is None
+
+
 def test_flash_finished_copy_main_encounters_error():
     """
     If copy_main encounters an error, flash_failed is called.
@@ -958,6 +1354,113 @@ def test_flash_failed():
     assert mm.flash_thread is None
 
 
+def test_flash_all_attached_microbits(microbit):
+    """
+    If enabled in the settings and several micro:bits are attached, ensure
+    the script is flashed onto all of them at the same time, without checking
+    the version of MicroPython on them.
+    """
+    view = mock.MagicMock()
+    view.current_tab.text = mock.MagicMock(return_value="foo")
+    editor = mock.MagicMock()
+    editor.minify = False
+    editor.microbit_runtime = ""
+    editor.microbit_flash_all = True
+    editor.current_device = microbit
+    mm = MicrobitMode(editor, view)
+    editor.connected_devices = [microbit, microbit]
+    mm.flash_attached = mock.MagicMock()
+    mm.get_device_micropython_version = mock.MagicMock()
+    with mock.patch(
+        "mu.contrib.uflash.find_microbit", return_value="/MICROBIT"
+    ), mock.patch(
+        "mu.contrib.uflash.find_microbits",
+        return_value=["/MICROBIT", "/MICROBIT1"],
+    ), mock.patch(
+        "mu.modes.microbit.os.path.exists", return_value=True
+    ):
+        mm.flash()
+    mm.flash_attached.assert_called_once_with(
+        b"foo", ["/MICROBIT", "/MICROBIT1"]
+    )
+    assert mm.get_device_micropython_version.call_count == 0
+
+
+def test_flash_all_attached_microbits_unsupported(microbit):
+    """
+    If any of the attached micro:bits isn't supported by Mu's runtime, none
+    of them are flashed and the user is told why.
+    """
+    unsupported = Device(
+        0x0D28, 0x0204, "COM1", "99AAABCD", "ARM", "BBC micro:bit", "microbit"
+    )
+    view = mock.MagicMock()
+    view.current_tab.text = mock.MagicMock(return_value="foo")
+    editor = mock.MagicMock()
+    editor.minify = False
+    editor.microbit_runtime = ""
+    editor.microbit_flash_all = True
+    editor.current_device = microbit
+    mm = MicrobitMode(editor, view)
+    editor.connected_devices = [microbit, unsupported]
+    mm.flash_attached = mock.MagicMock()
+    with mock.patch(
+        "mu.contrib.uflash.find_microbit", return_value="/MICROBIT"
+    ), mock.patch(
+        "mu.contrib.uflash.find_microbits",
+        return_value=["/MICROBIT", "/MICROBIT1"],
+    ), mock.patch(
+        "mu.modes.microbit.os.path.exists", return_value=True
+    ):
+        mm.flash()
+    assert mm.flash_attached.call_count == 0
+    assert view.show_message.call_args[0][0] == "Unsupported BBC micro:bit."
+
+
+def test_flash_all_attached_microbits_custom_runtime(microbit):
+    """
+    A custom runtime is only flashed onto the current micro:bit, since the
+    script is sent over its serial port.
+    """
+    view = mock.MagicMock()
+    view.current_tab.text = mock.MagicMock(return_value="foo")
+    editor = mock.MagicMock()
+    editor.minify = False
+    editor.microbit_runtime = "/foo/bar.hex"
+    editor.microbit_flash_all = True
+    editor.current_device = microbit
+    mm = MicrobitMode(editor, view)
+    mm.flash_attached = mock.MagicMock()
+    mm.flash_and_send = mock.MagicMock()
+    with mock.patch(
+        "mu.contrib.uflash.find_microbit", return_value="/MICROBIT"
+    ), mock.patch(
+        "mu.contrib.uflash.find_microbits",
+        return_value=["/MICROBIT", "/MICROBIT1"],
+    ), mock.patch(
+        "mu.modes.microbit.os.path.exists", return_value=True
+    ), mock.patch(
+        "mu.modes.microbit.os.path.isfile", return_value=True
+    ):
+        mm.flash()
+    assert mm.flash_attached.call_count == 0
+    mm.flash_and_send.assert_called_once_with(
+        b"foo", "/MICROBIT", "/foo/bar.hex"
+    )
+
+
+def test_device_flashed_and_failed():
+    """
+    Ensure the progress of each micro:bit flashed at once is reported.
+    """
+    editor = mock.MagicMock()
+    mm = MicrobitMode(editor, mock.MagicMock())
+    mm.device_flashed("/MICROBIT")
+    assert "/MICROBIT" in editor.show_status_message.call_args[0][0]
+    mm.device_flash_failed("/MICROBIT1", "Boom")
+    assert "/MICROBIT1" in editor.show_status_message.call_args[0][0]
+
+
 def test_flash_minify(microbit_v1_5):
     view = mock.MagicMock()
     script = "#" + ("x" * 8193) + "\n"
@@ -1018,6 +1521,7 @@ def test_add_fs(microbit):
     editor = mock.MagicMock()
     editor.current_device = microbit
     mm = MicrobitMode(editor, view)
+    mm.forget_flashed = mock.MagicMock()
     with mock.patch("mu.modes.microbit.FileManager") as mock_fm, mock.patch(
         "mu.modes.microbit.QThread"
     ):
@@ -1027,6 +1531,7 @@ def test_add_fs(microbit):
             workspace, mock_fm(), "micro:bit"
         )
         assert mm.fs
+    mm.forget_flashed.assert_called_once_with(microbit.serial_number)
 
 
 def test_add_fs_no_device():
@@ -1260,20 +1765,6 @@ def test_api():
     assert api == SHARED_APIS + MICROBIT_APIS
 
 
-def test_on_data_flood():
-    """
-    Ensure the "Files" button is re-enabled before calling the base method.
-    """
-    view = mock.MagicMock()
-    editor = mock.MagicMock()
-    mm = MicrobitMode(editor, view)
-    mm.set_buttons = mock.MagicMock()
-    with mock.patch("builtins.super") as mock_super:
-        mm.on_data_flood()
-        mm.set_buttons.assert_called_once_with(files=True)
-        mock_super().on_data_flood.assert_called_once_with()
-
-
 def test_open_hex():
     """
     Tries to open hex files with uFlash.
@@ -1293,6 +1784,25 @@ def test_open_hex():
     assert mock_open.call_count == 1
 
 
+def test_open_hex_with_embedded_filesystem(tmp_path):
+    """
+    The main.py script embedded in the filesystem of a hex created by uFlash
+    is recovered when the hex is opened, whatever its newline convention.
+    """
+    view = mock.MagicMock()
+    editor = mock.MagicMock()
+    mm = MicrobitMode(editor, view)
+    script = "from microbit import *\n" + "display.scroll('Hi')\n" * 20
+    hex_str = uflash.embed_fs_uhex(
+        uflash.get_runtime(), script.encode("utf-8")
+    )
+    hex_path = tmp_path / "script.hex"
+    hex_path.write_bytes(hex_str.replace("\n", "\r\n").encode("ascii"))
+    text, newline = mm.open_file(str(hex_path))
+    assert text == script
+    assert newline == "\n"
+
+
 def test_open_ignore_non_hex():
     """
     Ignores any other than hex file types.
@@ -4,7 +4,7 @@ Tests for the Snek mode.
 """
 import pytest
 from mu.logic import Device
-from mu.modes.snek import SnekMode
+from mu.modes.snek import SnekMode, SnekREPLConnection
 from mu.modes.api import SNEK_APIS
 from PyQt5.QtWidgets import QMessageBox
 from unittest import mock
@@ -357,3 +357,28 @@ def test_device_changed(snek_device):
     mm.remove_plotter.assert_called_once_with()
     mm.add_plotter.assert_called_once_with()
     mm.connection.send_interrupt.assert_called_once_with()
+
+
+def test_SnekREPLConnection_on_serial_read():
+    """
+    Flow control characters are acted on as soon as they arrive, and the
+    rest of the data is gathered and delivered once per frame, like any
+    other REPL connection.
+    """
+    mock_serial = mock.MagicMock()
+    mock_serial.readAll.return_value = b"a\x06b\x14c"
+    mock_serial_class = mock.MagicMock(return_value=mock_serial)
+    with mock.patch("mu.modes.base.QSerialPort", mock_serial_class):
+        conn = SnekREPLConnection("COM0")
+    conn.ready = True
+    conn.recv_ack = mock.MagicMock()
+    conn.data_received = mock.MagicMock()
+    conn.flush_timer = mock.MagicMock()
+    conn.flush_timer.isActive.return_value = False
+    conn._on_serial_read()
+    conn.recv_ack.assert_called_once_with()
+    assert conn.got_dc4 is True
+    assert conn.data_received.emit.call_count == 0
+    conn.flush_timer.start.assert_called_once_with()
+    conn.flush()
+    conn.data_received.emit.assert_called_once_with(b"abc")
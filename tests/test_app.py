@@ -19,6 +19,7 @@ from mu.app import (
     check_only_running_once,
     _shared_memory,
 )
+from mu.config import CACHE_DIR
 from mu.debugger.config import DEBUGGER_PORT
 
 from mu.interface.themes import NIGHT_STYLE, DAY_STYLE, CONTRAST_STYLE
@@ -287,9 +288,14 @@ def test_run():
         "mu.app.StartupWorker"
     ) as mock_worker, mock.patch(
         "mu.app.setup_exception_handler"
-    ) as mock_set_except:
+    ) as mock_set_except, mock.patch(
+        "mu.app.uflash"
+    ) as mock_uflash:
         run()
         assert set_log.call_count == 1
+        assert mock_uflash.RUNTIME_CACHE_DIR == os.path.join(
+            CACHE_DIR, "microbit_runtimes"
+        )
         # foo.call_count is instantiating the class
         assert qa.call_count == 1
         # foo.mock_calls are method calls on the object
@@ -300,7 +306,8 @@ def test_run():
         assert qsp.call_count == 1
         assert len(qsp.mock_calls) == 4
         assert ed.call_count == 1
-        assert len(ed.mock_calls) == 4
+        # Includes the micro:bit mode listening for (dis)connections.
+        assert len(ed.mock_calls) == 6
         assert win.call_count == 1
         assert len(win.mock_calls) == 6
         assert ex.call_count == 1
@@ -883,6 +883,8 @@ def test_editor_restore_session_existing_runtime():
                     microbit_runtime="/foo",
                     zoom_level=5,
                     venv_path="foo",
+                    microbit_flash_all=True,
+                    microbit_autoflash=True,
                 ):
                     ed.restore_session()
 
@@ -892,6 +894,8 @@ def test_editor_restore_session_existing_runtime():
     assert ed.envars == {"name": "value"}
     assert ed.minify is False
     assert ed.microbit_runtime == "/foo"
+    assert ed.microbit_flash_all is True
+    assert ed.microbit_autoflash is True
     assert ed._view.zoom_position == 5
     venv_relocate.assert_called_with("foo")
 
@@ -2249,6 +2253,8 @@ def test_show_admin():
         "envars": "name=value",
         "minify": True,
         "microbit_runtime": "/foo/bar",
+        "microbit_flash_all": False,
+        "microbit_autoflash": False,
         "locale": "",
         "pa_instance": "www",
         "pa_token": "",
@@ -2330,6 +2336,8 @@ def test_show_admin_missing_microbit_runtime():
         "envars": "name=value",
         "minify": True,
         "microbit_runtime": "/foo/bar",
+        "microbit_flash_all": False,
+        "microbit_autoflash": False,
         "locale": "",
         "pa_instance": "www",
         "pa_token": "",
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Measures how quickly uflash encodes data as Intel Hex records and embeds a
+script into the bundled MicroPython runtime.
+
+Usage:
+
+    python utils/hex_benchmark.py [script] [--size BYTES] [--repeat N]
+
+The data encoded is the given script or, if no script is given, size bytes
+(1MB by default) of random data. The records are checked against a plain
+record-at-a-time encoder, which is also timed for comparison. Embedding uses
+at most the first 8KB of the data, as that's about what fits in the
+filesystem of a micro:bit.
+"""
+import argparse
+import binascii
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from mu.contrib import uflash  # noqa: E402
+
+
+DATA_SIZE = 1024 * 1024
+SCRIPT_SIZE = 8 * 1024
+
+
+def reference_ihex(addr, data):
+    """
+    Returns the same records as uflash.bytes_to_ihex, formatted one record
+    at a time.
+    """
+    output = []
+    current_ela = None
+    for i in range(0, len(data), 16):
+        if (addr >> 16) & 0xFFFF != current_ela:
+            current_ela = (addr >> 16) & 0xFFFF
+            output.append(uflash._ela_record(current_ela))
+        chunk = data[i : i + 16]
+        record = bytearray([len(chunk), (addr >> 8) & 0xFF, addr & 0xFF, 0x00])
+        record += chunk
+        record.append(-sum(record) & 0xFF)
+        output.append(":" + binascii.hexlify(record).decode("ascii").upper())
+        addr += len(chunk)
+    return "\n".join(output)
+
+
+def best_time(function, repeat):
+    """
+    Returns the result of calling function and the fastest of repeat runs.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("script", nargs="?", help="script to encode")
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=DATA_SIZE,
+        help="bytes of random data to encode (default 1MB)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="runs of each measurement, the fastest is kept (default 5)",
+    )
+    args = parser.parse_args(argv)
+    if args.script:
+        with open(args.script, "rb") as f:
+            data = f.read()
+    else:
+        data = os.urandom(args.size)
+    addr = uflash._FS_START_ADDR_V1
+    records, elapsed = best_time(
+        lambda: uflash.bytes_to_ihex(addr, data), args.repeat
+    )
+    expected, reference = best_time(
+        lambda: reference_ihex(addr, data), args.repeat
+    )
+    if records != expected:
+        sys.exit("The records don't match the reference encoder's.")
+    print(
+        "Encoded {} bytes in {:.1f}ms ({:.1f} MB/s), {:.1f}x the reference "
+        "encoder ({:.1f}ms).".format(
+            len(data),
+            elapsed * 1000,
+            len(data) / max(elapsed, 1e-9) / 1024 / 1024,
+            reference / max(elapsed, 1e-9),
+            reference * 1000,
+        )
+    )
+    image = uflash.get_runtime_image()
+    script = data[:SCRIPT_SIZE]
+    _, elapsed = best_time(lambda: image.embed(script), args.repeat)
+    print(
+        "Embedded a {} byte script in the runtime in {:.1f}ms.".format(
+            len(script), elapsed * 1000
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Replays a recorded serial capture through the REPL or plotter panes and
+reports how quickly it's rendered.
+
+Usage:
+
+    python utils/repl_benchmark.py [capture] [--chunk-size BYTES]
+        [--pane micropython|snek|plotter] [--speed SPEED]
+
+The capture is either a session capture recorded by Mu (with the
+"record_sessions" setting) or the raw bytes received from a device (e.g.
+saved with "cat /dev/ttyACM0 > capture.bin"). If no capture is given, 1MB of
+typical sensor telemetry, sprinkled with the VT100 sequences MicroPython's
+REPL uses for line editing, is generated instead.
+
+Session captures are delivered in the chunks Mu originally received them,
+as fast as possible unless a speed is given (1 plays back in real time).
+"""
+import argparse
+import builtins
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+builtins._ = lambda text: text  # Mu's translation function.
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+
+CAPTURE_SIZE = 1024 * 1024
+
+
+def generate_capture(size=CAPTURE_SIZE):
+    """
+    Returns size bytes of telemetry as a device would print it.
+    """
+    lines = []
+    length = 0
+    i = 0
+    while length < size:
+        if i % 100 == 0:
+            # Editing a line at the REPL prompt.
+            line = ">>> print(x)\x1b[K\x08\x08\x1b[2D(y)\x1b[2C\r\n"
+        else:
+            line = "({}, {:.3f}, {})\r\n".format(i, i / 7, i % 1024)
+        lines.append(line)
+        length += len(line)
+        i += 1
+    return "".join(lines).encode("utf-8")[:size]
+
+
+def make_pane(name):
+    """
+    Returns the method of the named pane that's fed data from the device.
+    """
+    from mu.interface.panes import (
+        MicroPythonREPLPane,
+        SnekREPLPane,
+        PlotterPane,
+    )
+
+    if name == "snek":
+        return SnekREPLPane(mock.MagicMock()).process_bytes
+    elif name == "plotter":
+        return PlotterPane().process_tty_data
+    return MicroPythonREPLPane(mock.MagicMock()).process_tty_data
+
+
+def replay(capture, chunk_size, pane="micropython"):
+    """
+    Feeds the capture to a pane in chunks of chunk_size bytes (as they would
+    arrive from the serial port) and returns the elapsed seconds.
+    """
+    process = make_pane(pane)
+    start = time.perf_counter()
+    for i in range(0, len(capture), chunk_size):
+        process(capture[i : i + chunk_size])
+    return time.perf_counter() - start
+
+
+def replay_session(path, pane="micropython", speed=0):
+    """
+    Plays a session capture back to a pane and returns the number of bytes
+    and elapsed seconds.
+    """
+    from PyQt5.QtCore import QEventLoop
+    from mu.modes.base import SessionReplay
+
+    process = make_pane(pane)
+    session = SessionReplay(path, speed)
+    session.data_received.connect(process)
+    loop = QEventLoop()
+    done = []
+
+    def on_finished():
+        done.append(True)
+        loop.quit()
+
+    session.finished.connect(on_finished)
+    start = time.perf_counter()
+    session.open()
+    if not done:
+        loop.exec_()
+    elapsed = time.perf_counter() - start
+    return sum(len(data) for _, data in session.records), elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("capture", nargs="?", help="raw serial capture file")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=64,
+        help="bytes delivered per read of a raw capture (default 64)",
+    )
+    parser.add_argument(
+        "--pane",
+        choices=["micropython", "snek", "plotter"],
+        default="micropython",
+        help="pane to render the capture (default micropython)",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=0,
+        help="session capture playback speed (default 0, as fast as possible)",
+    )
+    args = parser.parse_args(argv)
+    app = QApplication.instance() or QApplication(sys.argv)  # noqa: F841
+    from mu.modes.base import CAPTURE_MAGIC
+
+    capture = None
+    if args.capture:
+        with open(args.capture, "rb") as f:
+            capture = f.read()
+    if capture and capture.startswith(CAPTURE_MAGIC):
+        size, elapsed = replay_session(args.capture, args.pane, args.speed)
+    else:
+        capture = capture or generate_capture()
+        size = len(capture)
+        elapsed = replay(capture, args.chunk_size, args.pane)
+    print(
+        "Rendered {} bytes in {:.2f}s ({:.1f} KB/s).".format(
+            size, elapsed, size / max(elapsed, 1e-9) / 1024
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()